@@ -0,0 +1,73 @@
+'''
+Бенчмарк холодного старта функций: каждый замер - новый процесс Python,
+который импортирует index.py и обслуживает один OPTIONS. Режим eager
+заранее импортирует psycopg2, urllib.request, concurrent.futures и
+html.parser, как делали модули до общего ядра с ленивыми импортами.
+Запуск: python backend/bench/bench_cold_start.py [--runs 15]
+'''
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from common import BACKEND_DIR, emit
+
+FUNCTIONS = ['wmfl-teams', 'wmfl-sync', 'wmfl-import']
+EAGER_MODULES = ['psycopg2', 'psycopg2.extras', 'urllib.request', 'concurrent.futures', 'html.parser']
+
+CHILD_SCRIPT = '''
+import importlib.util, json, sys, time
+started = time.perf_counter()
+for name in {eager!r}:
+    importlib.import_module(name)
+sys.path.insert(0, {function_dir!r})
+spec = importlib.util.spec_from_file_location('index', {function_dir!r} + '/index.py')
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+response = module.handler({{'httpMethod': 'OPTIONS', 'headers': {{}}}}, None)
+handled = time.perf_counter()
+print(json.dumps({{
+    'status': response['statusCode'],
+    'import_ms': (imported - started) * 1000,
+    'handler_ms': (handled - imported) * 1000,
+    'modules': len(sys.modules)
+}}))
+'''
+
+def cold_start(function: str, eager: bool) -> Dict[str, Any]:
+    script = CHILD_SCRIPT.format(eager=EAGER_MODULES if eager else [], function_dir=str(BACKEND_DIR / function))
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    if result['status'] != 200:
+        sys.exit(f'{function} OPTIONS returned {result["status"]}')
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+    report: List[Dict[str, Any]] = []
+
+    for function in FUNCTIONS:
+        for eager in (True, False):
+            runs = [cold_start(function, eager) for _ in range(args.runs)]
+            report.append({
+                'function': function,
+                'mode': 'eager' if eager else 'lazy',
+                'import_ms_p50': round(statistics.median(run['import_ms'] for run in runs), 2),
+                'handler_ms_p50': round(statistics.median(run['handler_ms'] for run in runs), 2),
+                'process_ms_p50': round(statistics.median(run['process_ms'] for run in runs), 2),
+                'modules_loaded': runs[-1]['modules']
+            })
+
+    emit(report)
+
+if __name__ == '__main__':
+    main()
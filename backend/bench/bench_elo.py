@@ -0,0 +1,87 @@
+'''
+Бенчмарк рейтинга Эло на синтетических сезонах: последовательный
+apply_matches против векторного recompute_ratings, плюс инкрементальное
+применение одного тура к готовым рейтингам. Проверяет совпадение путей.
+Запуск: python backend/bench/bench_elo.py
+'''
+
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'wmfl-sync'))
+
+import elo
+from common import emit, load_function
+
+SEASONS = [(1, 20), (30, 20), (100, 24), (400, 24)]
+
+def round_robin(tournament_id: int, team_count: int, rng: random.Random) -> List[elo.Match]:
+    teams = list(range(team_count))
+    rounds = []
+    for _ in range(team_count - 1):
+        rounds.append([(teams[i], teams[-1 - i]) for i in range(team_count // 2)])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    rounds += [[(away, home) for home, away in fixtures] for fixtures in rounds]
+    return [
+        ((tournament_id, home), (tournament_id, away), rng.randint(0, 4), rng.randint(0, 3))
+        for fixtures in rounds
+        for home, away in fixtures
+    ]
+
+def main() -> None:
+    rng = random.Random(42)
+    sync = load_function('wmfl-sync')
+    elo.recompute_ratings([])
+    report = []
+    
+    for tournaments, team_count in SEASONS:
+        per_tournament = [round_robin(tid, team_count, rng) for tid in range(tournaments)]
+        matches = [match for season in zip(*per_tournament) for match in season]
+        
+        started = time.perf_counter()
+        sequential = elo.apply_matches({}, matches)
+        sequential_ms = (time.perf_counter() - started) * 1000
+        
+        started = time.perf_counter()
+        vectorized = elo.recompute_ratings(matches)
+        vectorized_ms = (time.perf_counter() - started) * 1000
+        
+        last_round = matches[-tournaments * (team_count // 2):]
+        history = matches[:-len(last_round)]
+        ratings = elo.recompute_ratings(history)
+        started = time.perf_counter()
+        elo.apply_matches(ratings, last_round)
+        incremental_ms = (time.perf_counter() - started) * 1000
+        
+        rows = [
+            {'tournament_id': home[0], 'home_team_id': home[1], 'away_team_id': away[1], 'home_goals': hg, 'away_goals': ag}
+            for home, away, hg, ag in matches
+        ]
+        started = time.perf_counter()
+        from_rows = sync.recompute_match_ratings(rows)
+        from_rows_ms = (time.perf_counter() - started) * 1000
+        
+        max_diff = max(
+            max(abs(sequential[key] - vectorized[key]), abs(sequential[key] - from_rows[key]))
+            for key in sequential
+        )
+        if max_diff > 1e-6:
+            sys.exit(f'Sequential and vectorized ratings differ by {max_diff}')
+        
+        report.append({
+            'tournaments': tournaments,
+            'matches': len(matches),
+            'sequential_ms': round(sequential_ms, 3),
+            'vectorized_ms': round(vectorized_ms, 3),
+            'vectorized_from_rows_ms': round(from_rows_ms, 3),
+            'incremental_round_ms': round(incremental_ms, 3),
+            'max_rating_diff': max_diff
+        })
+    
+    emit(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+'''
+Бенчмарк извлечения таблиц со страниц WMFL: один проход WMFLPageParser
+по всем таблицам против отдельного разбора страницы на каждую таблицу
+(как пришлось бы делать с парсером одной таблицы), буферный и потоковый
+путь. Меряет страниц/с и МБ/с по корпусу сохранённых страниц из fixtures/
+и проверяет, что оба пути извлекают одно и то же.
+Запуск: python backend/bench/bench_extract.py [pages.html ...]
+'''
+
+import importlib
+import io
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from common import emit, load_function
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+ROUNDS = 30
+
+def per_table_passes(module, html: str) -> Dict[str, List[Dict[str, Any]]]:
+    parser_module = importlib.import_module('page_parser')
+    tables = {}
+    for name in parser_module.TABLE_SPECS:
+        parser = parser_module.WMFLPageParser(tables=(name,))
+        parser.feed(html)
+        tables[name] = parser.tables[name]
+    return tables
+
+def single_pass_stream(module, payload: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    page = module.parse_standings_stream(io.BytesIO(payload))
+    return {name: page[name] for name in ('teams', 'matches', 'scorers')}
+
+def throughput(run, corpus: List[Any]) -> Dict[str, float]:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for page in corpus:
+            run(page)
+    elapsed = time.perf_counter() - started
+    pages = ROUNDS * len(corpus)
+    megabytes = ROUNDS * sum(len(page) for page in corpus) / 1024 / 1024
+    return {
+        'pages_per_sec': round(pages / elapsed, 1),
+        'mb_per_sec': round(megabytes / elapsed, 2),
+        'ms_per_page': round(elapsed * 1000 / pages, 3)
+    }
+
+def main() -> None:
+    module = load_function('wmfl-import')
+    paths = [Path(arg) for arg in sys.argv[1:]] or sorted(FIXTURES_DIR.glob('*.html'))
+    payloads = [path.read_bytes() for path in paths]
+    texts = [payload.decode('utf-8') for payload in payloads]
+
+    rows = {}
+    for path, payload, text in zip(paths, payloads, texts):
+        buffered = module.parse_page(text)
+        if single_pass_stream(module, payload) != buffered or per_table_passes(module, text) != buffered:
+            sys.exit(f'{path.name}: streaming, buffered and per-table extraction disagree')
+        rows[path.name] = {name: len(table) for name, table in buffered.items()}
+
+    report = [{'corpus': [path.name for path in paths], 'corpus_bytes': sum(len(p) for p in payloads), 'rows': rows}]
+    for name, run, corpus in (
+        ('per_table_passes', lambda text: per_table_passes(module, text), texts),
+        ('single_pass_buffered', module.parse_page, texts),
+        ('single_pass_stream', lambda payload: single_pass_stream(module, payload), payloads)
+    ):
+        report.append({'path': name, **throughput(run, corpus)})
+
+    emit(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+'''
+Бенчмарк всех трёх функций: handler(event, context) вызывается в процессе
+против одноразового Postgres со схемой из db_migrations, WMFL отдаёт
+локальный стаб со страницей из fixtures/ вместо сети. Для каждой лиги
+(10..100k команд) и эндпоинта пишет p50/p95 задержки, число SQL-запросов
+и пик памяти в JSON.
+Запуск: python backend/bench/bench_handlers.py [--sizes 10,1000] [--output run.json] [--compare prev.json]
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from common import CountingCursor, StubWMFLServer, bench_database_url, counting_connection, emit, load_function, reset_schema, seed_teams
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+TEAMS_PER_TOURNAMENT = 20
+
+def install_fixture_network() -> StubWMFLServer:
+    server = StubWMFLServer((FIXTURES_DIR / 'standings_sample.html').read_bytes())
+    os.environ['WMFL_BASE_URL'] = server.base_url
+    os.environ['WMFL_RATE_PER_SECOND'] = '0'
+    return server
+
+def event(method: str, body: Any = None, query: Dict[str, str] = None) -> Dict[str, Any]:
+    return {
+        'httpMethod': method,
+        'body': json.dumps(body) if body is not None else None,
+        'queryStringParameters': query,
+        'headers': {}
+    }
+
+def endpoints(size: int) -> List[Tuple[str, str, Callable[[int], Dict[str, Any]]]]:
+    last_tournament = str(max(1, size // TEAMS_PER_TOURNAMENT))
+    return [
+        ('teams.get_one', 'wmfl-teams', lambda i: event('GET', query={'team_id': str(1 + i % size)})),
+        ('teams.list_page', 'wmfl-teams', lambda i: event('GET', query={'tournament_id': last_tournament, 'limit': '20'})),
+        ('teams.list_all', 'wmfl-teams', lambda i: event('GET')),
+        ('teams.put', 'wmfl-teams', lambda i: event('PUT', {'team_id': 1 + i % size, 'wins': i % 30})),
+        ('teams.batch_update', 'wmfl-teams', lambda i: event('POST', {'items': [
+            {'op': 'update', 'team_id': 1 + (i * 100 + k) % size, 'draws': i % 5} for k in range(min(100, size))
+        ]})),
+        ('sync.post_one', 'wmfl-sync', lambda i: event('POST', {'tournament_id': int(last_tournament)})),
+        ('sync.post_all', 'wmfl-sync', lambda i: event('POST', {})),
+        ('sync.get_logs', 'wmfl-sync', lambda i: event('GET')),
+        ('import.post', 'wmfl-import', lambda i: event('POST', {'tournament_id': 1, 'force': True}))
+    ]
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def measure(module, make_event: Callable[[int], Dict[str, Any]], iterations: int) -> Dict[str, Any]:
+    latencies = []
+    statements = []
+    for i in range(iterations):
+        if hasattr(module, 'response_cache'):
+            module.response_cache.invalidate()
+        CountingCursor.round_trips = 0
+        started = time.perf_counter()
+        response = module.handler(make_event(i), None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(CountingCursor.round_trips)
+        if response['statusCode'] >= 400:
+            raise RuntimeError(f"{response['statusCode']}: {response['body'][:200]}")
+    
+    if hasattr(module, 'response_cache'):
+        module.response_cache.invalidate()
+    tracemalloc.start()
+    module.handler(make_event(iterations), None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'db_statements': round(sum(statements) / len(statements), 2),
+        'alloc_peak_kb': round(peak / 1024, 1)
+    }
+
+def compare(report: List[Dict[str, Any]], baseline_path: str, threshold: float) -> List[str]:
+    baseline = {(row['endpoint'], row['teams']): row for row in json.loads(Path(baseline_path).read_text())}
+    regressions = []
+    for row in report:
+        previous = baseline.get((row['endpoint'], row['teams']))
+        if previous and row['p50_ms'] > previous['p50_ms'] * (1 + threshold / 100):
+            regressions.append(f"{row['endpoint']} @ {row['teams']}: p50 {previous['p50_ms']} -> {row['p50_ms']} ms")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--only', default='', help='comma-separated endpoint name prefixes')
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('--threshold', type=float, default=20.0, help='allowed p50 regression, percent')
+    args = parser.parse_args()
+    
+    database_url = bench_database_url()
+    os.environ['DATABASE_URL'] = database_url
+    install_fixture_network()
+    modules = {name: load_function(name) for name in ('wmfl-teams', 'wmfl-sync', 'wmfl-import')}
+    for module in modules.values():
+        module.db_pool.connect = lambda: counting_connection(database_url)
+    
+    prefixes = [prefix for prefix in args.only.split(',') if prefix]
+    report = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        reset_schema(database_url)
+        conn = counting_connection(database_url)
+        seed_teams(conn, size, TEAMS_PER_TOURNAMENT)
+        conn.close()
+        
+        for name, function, make_event in endpoints(size):
+            if prefixes and not any(name.startswith(prefix) for prefix in prefixes):
+                continue
+            result = measure(modules[function], make_event, args.iterations)
+            result.update({'endpoint': name, 'teams': size})
+            report.append(result)
+            print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        emit(report)
+    
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
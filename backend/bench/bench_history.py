@@ -0,0 +1,102 @@
+'''
+Бенчмарк истории турнирных таблиц: объём wmfl_standings_snapshots (дельты
+в массивах + ключевые кадры) против наивной записи строки на команду за
+каждую синхронизацию, и время чтения ряда команды и таблицы на момент.
+Запуск: BENCH_DATABASE_URL=postgres://... python backend/bench/bench_history.py
+'''
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'wmfl-sync'))
+
+import standings_history
+from common import SCHEMA, bench_database_url, emit, reset_schema, seed_teams
+
+TOURNAMENTS = 50
+TEAMS_PER_TOURNAMENT = 20
+SYNCS = 200
+CHANGED_PER_SYNC = 4
+
+def table_bytes(cur, table: str) -> int:
+    cur.execute('SELECT pg_total_relation_size(%s) AS size', (f'{SCHEMA}.{table}',))
+    return cur.fetchone()['size']
+
+def main() -> None:
+    database_url = bench_database_url()
+    reset_schema(database_url)
+    rng = random.Random(42)
+    
+    conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+    cur = conn.cursor()
+    seed_teams(conn, TOURNAMENTS * TEAMS_PER_TOURNAMENT, TEAMS_PER_TOURNAMENT)
+    cur.execute(f'''
+        CREATE TABLE {SCHEMA}.bench_standings_rows AS
+        SELECT tournament_id, team_id, updated_at AS taken_at, position, points, goal_difference, rating, matches_played
+        FROM {SCHEMA}.wmfl_tournament_teams WHERE false
+    ''')
+    conn.commit()
+    tournament_ids = list(range(1, TOURNAMENTS + 1))
+    
+    write_ms = 0.0
+    for _ in range(SYNCS):
+        team_ids = rng.sample(range(1, TOURNAMENTS * TEAMS_PER_TOURNAMENT + 1), CHANGED_PER_SYNC * TOURNAMENTS // 2)
+        cur.execute(f'''
+            UPDATE {SCHEMA}.wmfl_tournament_teams
+            SET wins = wins + 1, rating = rating + 7, updated_at = CURRENT_TIMESTAMP
+            WHERE team_id = ANY(%s)
+        ''', (team_ids,))
+        cur.execute(f'''
+            INSERT INTO {SCHEMA}.bench_standings_rows
+            SELECT tournament_id, team_id, CURRENT_TIMESTAMP, position, points, goal_difference, rating, matches_played
+            FROM {SCHEMA}.wmfl_tournament_teams
+        ''')
+        conn.commit()
+        started = time.perf_counter()
+        standings_history.record_standings_snapshots(conn, tournament_ids)
+        write_ms += (time.perf_counter() - started) * 1000
+    
+    cur.execute(f'SELECT COUNT(*) AS snapshots FROM {SCHEMA}.wmfl_standings_snapshots')
+    snapshots = cur.fetchone()['snapshots']
+    cur.execute(f'SELECT taken_at FROM {SCHEMA}.wmfl_standings_snapshots ORDER BY id OFFSET %s LIMIT 1', (snapshots // 2,))
+    middle = cur.fetchone()['taken_at']
+    
+    started = time.perf_counter()
+    series = standings_history.team_series(cur, 1, 1)
+    series_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    _, table = standings_history.standings_as_of(cur, 1, middle)
+    as_of_ms = (time.perf_counter() - started) * 1000
+    cur.execute(f'''
+        SELECT rating FROM {SCHEMA}.bench_standings_rows WHERE team_id = 1
+        GROUP BY rating ORDER BY MIN(taken_at)
+    ''')
+    if [point['rating'] for point in series] != [row['rating'] for row in cur.fetchall()]:
+        sys.exit('Team series does not match the row-per-team history')
+    if len(table) != TEAMS_PER_TOURNAMENT:
+        sys.exit(f'Table as of {middle} has {len(table)} teams, expected {TEAMS_PER_TOURNAMENT}')
+    
+    snapshot_bytes = table_bytes(cur, 'wmfl_standings_snapshots')
+    row_bytes = table_bytes(cur, 'bench_standings_rows')
+    conn.close()
+    
+    emit([{
+        'tournaments': TOURNAMENTS,
+        'syncs': SYNCS,
+        'snapshots': snapshots,
+        'snapshot_bytes': snapshot_bytes,
+        'row_per_team_bytes': row_bytes,
+        'storage_ratio': round(row_bytes / snapshot_bytes, 1),
+        'record_ms_per_sync': round(write_ms / SYNCS, 3),
+        'team_series_points': len(series),
+        'team_series_ms': round(series_ms, 3),
+        'table_as_of_ms': round(as_of_ms, 3)
+    }])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+'''
+Бенчмарк и проверки исходящего клиента wmfl_http против локального стаба
+wmfl.ru: загрузка страниц через urlopen на каждую страницу (новое
+соединение, без сжатия - как было) против keep-alive клиента с gzip.
+Пауза на новом соединении имитирует TLS-рукопожатие. Затем проверяет
+повторы при 503, ETag/304, переподключение к закрытому сервером
+соединению, ведро токенов и распаковку deflate.
+Запуск: python backend/bench/bench_http_client.py [--pages 50] [--handshake-ms 30]
+'''
+
+import argparse
+import importlib
+import io
+import sys
+import time
+import urllib.request
+import zlib
+from pathlib import Path
+from typing import Any, Dict
+
+from common import StubWMFLServer, emit, load_function
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+def urlopen_per_page(server: StubWMFLServer, pages: int) -> Dict[str, Any]:
+    wire_bytes = 0
+    for tournament_id in range(pages):
+        request = urllib.request.Request(f'{server.base_url}/tournament/{tournament_id}/standings')
+        with urllib.request.urlopen(request, timeout=15) as response:
+            wire_bytes += len(response.read())
+    return {'wire_bytes': wire_bytes}
+
+def client_keepalive(client, pages: int) -> Dict[str, Any]:
+    for tournament_id in range(pages):
+        with client.get(f'/tournament/{tournament_id}/standings') as response:
+            while response.read(16384):
+                pass
+    return client.snapshot()
+
+def run_path(name: str, payload: bytes, handshake_seconds: float, run) -> Dict[str, Any]:
+    server = StubWMFLServer(payload, handshake_seconds=handshake_seconds)
+    try:
+        started = time.perf_counter()
+        result = run(server)
+        wall_ms = (time.perf_counter() - started) * 1000
+    finally:
+        server.stop()
+    return {
+        'path': name,
+        'requests': server.requests,
+        'connections': server.connections,
+        'wall_ms': round(wall_ms, 1),
+        'ms_per_page': round(wall_ms / server.requests, 2),
+        'wire_bytes': result['wire_bytes']
+    }
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        sys.exit(f'FAILED: {message}')
+
+def behaviour_checks(http, payload: bytes) -> Dict[str, Any]:
+    checks = {}
+    server = StubWMFLServer(payload, idle_timeout=0.2)
+    try:
+        client = http.WMFLClient(server.base_url, rate_per_second=0, backoff_base_seconds=0.01)
+        with client.get('/tournament/1/standings') as response:
+            check(response.read() == payload and response.stats['encoding'] == 'gzip', 'gzip body decodes to the page')
+
+        server.fail_next = 2
+        with client.get('/tournament/1/standings') as response:
+            check(response.status == 200 and response.stats['attempts'] == 3, f'two 503s are retried: {response.stats}')
+        server.fail_next = 5
+        with client.get('/tournament/1/standings') as response:
+            check(response.status == 503 and response.stats['attempts'] == 3, 'retries stop at max_retries')
+        server.fail_next = 0
+        checks['retries'] = client.snapshot()['retries']
+
+        with client.get('/tournament/1/standings', {'If-None-Match': server.etag}) as response:
+            check(response.status == 304 and response.read() == b'', 'ETag revalidation returns 304')
+
+        time.sleep(0.5)
+        connections = server.connections
+        with client.get('/tournament/1/standings') as response:
+            check(response.read() == payload, 'request after server-side idle close succeeds')
+        check(client.snapshot()['stale_reconnects'] == 1 and server.connections == connections + 1, 'stale keep-alive connection is replaced')
+        checks['stale_reconnects'] = client.snapshot()['stale_reconnects']
+
+        limited = http.WMFLClient(server.base_url, rate_per_second=20, rate_burst=2)
+        started = time.perf_counter()
+        for _ in range(12):
+            with limited.get('/tournament/1/standings') as response:
+                response.read()
+        elapsed = time.perf_counter() - started
+        check(0.45 <= elapsed < 1.0, f'12 requests at 20/s with burst 2 take ~0.5 s, took {elapsed:.3f}')
+        checks['rate_limited_12_requests_ms'] = round(elapsed * 1000, 1)
+
+        try:
+            http.WMFLClient(server.base_url, rate_per_second=0, max_retries=0).get('/x', deadline=time.monotonic() - 1)
+            check(False, 'expired deadline raises')
+        except Exception as e:
+            check('budget' in str(e), f'expired deadline raises: {e}')
+    finally:
+        server.stop()
+
+    for wbits in (zlib.MAX_WBITS, -zlib.MAX_WBITS):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, wbits)
+        encoded = compressor.compress(payload) + compressor.flush()
+        decoder = http.body_decoder('deflate')
+        decoded = b''.join(decoder.decompress(encoded[i:i + 1000]) for i in range(0, len(encoded), 1000)) + decoder.flush()
+        check(decoded == payload, f'deflate with wbits={wbits} decodes')
+    return checks
+
+def parse_through_client(module, payload: bytes) -> Dict[str, Any]:
+    server = StubWMFLServer(payload)
+    try:
+        http = importlib.import_module('wmfl_http')
+        http.client = http.WMFLClient(server.base_url, rate_per_second=0)
+        page = module.fetch_wmfl_page(1)
+        buffered = module.parse_page(payload.decode('utf-8'))
+        check(all(page[name] == buffered[name] for name in buffered), 'streamed gzip page parses like the buffered page')
+        check(page['body_hash'] == module.parse_standings_stream(io.BytesIO(payload))['body_hash'], 'body hash is taken over decoded bytes')
+        return page['http']
+    finally:
+        server.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--handshake-ms', type=float, default=30.0)
+    parser.add_argument('--page', default=str(FIXTURES_DIR / 'tournament_full.html'))
+    args = parser.parse_args()
+
+    module = load_function('wmfl-import')
+    http = importlib.import_module('wmfl_http')
+    payload = Path(args.page).read_bytes()
+    handshake = args.handshake_ms / 1000
+
+    report = [
+        run_path('urlopen_per_page', payload, handshake, lambda server: urlopen_per_page(server, args.pages)),
+        run_path('client_keepalive_gzip', payload, handshake, lambda server: client_keepalive(
+            http.WMFLClient(server.base_url, rate_per_second=0), args.pages
+        ))
+    ]
+    report.append({**parse_through_client(module, payload), 'path': 'fetch_wmfl_page'})
+    report.append({'path': 'behaviour_checks', **behaviour_checks(http, payload)})
+    emit(report)
+
+if __name__ == '__main__':
+    main()
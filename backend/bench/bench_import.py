@@ -0,0 +1,100 @@
+'''
+Бенчмарк записи импорта: построчный upsert (как было) против одного
+многострочного upsert в import_teams_to_db, плюс повторный импорт той же
+таблицы: безусловный upsert каждой строки против записи только разницы
+(время, объём WAL, строки с новым updated_at).
+Запуск: BENCH_DATABASE_URL=postgres://... python backend/bench/bench_import.py
+'''
+
+from typing import Any, Dict, List
+
+from psycopg2.extras import execute_values
+
+from common import SCHEMA, bench_database_url, counting_connection, emit, load_function, reset_schema, timed
+
+SIZES = [20, 200, 2000]
+
+def synthetic_teams(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            'position': i + 1,
+            'team_name': f'Команда {i}',
+            'games': 10,
+            'wins': i % 10,
+            'draws': (i // 10) % 3,
+            'losses': 10 - i % 10,
+            'goals_for': 20 + i % 7,
+            'goals_against': 15 + i % 5,
+            'points': (i % 10) * 3
+        }
+        for i in range(count)
+    ]
+
+def legacy_import(module, conn, teams: List[Dict[str, Any]], tournament_id: int) -> int:
+    cur = conn.cursor()
+    for team in teams:
+        execute_values(cur, module.TEAM_UPSERT_SQL, [module.build_team_row(team, tournament_id)])
+    conn.commit()
+    return len(teams)
+
+def wal_lsn(conn) -> str:
+    cur = conn.cursor()
+    cur.execute('SELECT pg_current_wal_lsn() AS lsn')
+    return cur.fetchone()['lsn']
+
+def reimport(module, database_url: str, teams: List[Dict[str, Any]], run) -> Dict[str, Any]:
+    reset_schema(database_url)
+    conn = counting_connection(database_url)
+    module.import_teams_to_db(conn, teams, 1)
+    teams = [dict(team, wins=team['wins'] + 1) if i % 10 == 0 else team for i, team in enumerate(teams)]
+    cur = conn.cursor()
+    cur.execute(f'SELECT MAX(updated_at) AS mark FROM {SCHEMA}.wmfl_tournament_teams')
+    mark = cur.fetchone()['mark']
+    before = wal_lsn(conn)
+    conn.commit()
+    measurement = timed(run, conn, teams)
+    cur.execute('SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s) AS wal_bytes', (before,))
+    wal_bytes = int(cur.fetchone()['wal_bytes'])
+    cur.execute(f'SELECT COUNT(*) AS touched FROM {SCHEMA}.wmfl_tournament_teams WHERE updated_at > %s', (mark,))
+    touched = cur.fetchone()['touched']
+    conn.close()
+    return {'wall_ms': measurement['wall_ms'], 'wal_bytes': wal_bytes, 'rows_touched': touched}
+
+def upsert_all(module, conn, teams: List[Dict[str, Any]]) -> None:
+    unconditional = module.TEAM_UPSERT_SQL[:module.TEAM_UPSERT_SQL.index('    WHERE (')]
+    execute_values(conn.cursor(), unconditional, [module.build_team_row(team, 1) for team in teams], page_size=len(teams))
+    conn.commit()
+
+def main() -> None:
+    database_url = bench_database_url()
+    module = load_function('wmfl-import')
+    report = []
+    
+    for size in SIZES:
+        teams = synthetic_teams(size)
+        for name, run in (
+            ('row_by_row', lambda conn: legacy_import(module, conn, teams, 1)),
+            ('bulk', lambda conn: module.import_teams_to_db(conn, teams, 1))
+        ):
+            reset_schema(database_url)
+            conn = counting_connection(database_url)
+            measurement = timed(run, conn)
+            conn.close()
+            report.append({
+                'path': name,
+                'teams': size,
+                'wall_ms': measurement['wall_ms'],
+                'round_trips': measurement['round_trips'],
+                'imported': measurement['result']
+            })
+    
+        for name, run in (
+            ('reimport_upsert_all', lambda conn, changed: upsert_all(module, conn, changed)),
+            ('reimport_diff', lambda conn, changed: module.import_teams_to_db(conn, changed, 1))
+        ):
+            report.append({'path': name, 'teams': size, 'changed': (size + 9) // 10, **reimport(module, database_url, teams, run)})
+    
+    emit(report)
+
+if __name__ == '__main__':
+    main()
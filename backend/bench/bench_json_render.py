@@ -0,0 +1,51 @@
+'''
+Бенчмарк сериализации списка команд: Python (RealDictCursor + json.dumps)
+против сборки JSON в Postgres (row_to_json + string_agg) при 100, 10k и 100k строк.
+Заодно проверяет, что оба пути отдают побайтно одинаковое тело.
+Запуск: BENCH_DATABASE_URL=postgres://... python backend/bench/bench_json_render.py
+'''
+
+import sys
+
+from common import bench_database_url, counting_connection, emit, load_function, reset_schema, seed_teams, timed
+
+SIZES = [100, 10000, 100000]
+REPEATS = 5
+
+def run_path(module, conn, threshold: int) -> str:
+    module.JSON_DB_RENDER_MIN_ROWS = threshold
+    cur = conn.cursor()
+    return module.list_teams(cur, {'tournament_id': '1'})['body']
+
+def main() -> None:
+    database_url = bench_database_url()
+    module = load_function('wmfl-teams')
+    report = []
+    
+    for size in SIZES:
+        reset_schema(database_url)
+        conn = counting_connection(database_url)
+        seed_teams(conn, size)
+        
+        bodies = {}
+        for name, threshold in (('python', sys.maxsize), ('database', 0)):
+            runs = [timed(run_path, module, conn, threshold) for _ in range(REPEATS)]
+            runs.sort(key=lambda run: run['wall_ms'])
+            median = runs[len(runs) // 2]
+            bodies[name] = median['result']
+            report.append({
+                'path': name,
+                'rows': size,
+                'wall_ms': median['wall_ms'],
+                'round_trips': median['round_trips'],
+                'body_bytes': len(median['result'].encode('utf-8'))
+            })
+        conn.close()
+        
+        if bodies['python'] != bodies['database']:
+            sys.exit(f'body bytes differ between paths at {size} rows')
+    
+    emit(report)
+
+if __name__ == '__main__':
+    main()
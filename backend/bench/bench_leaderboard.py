@@ -0,0 +1,135 @@
+'''
+Бенчмарк рейтинг-листа wmfl-teams на 10k..1M строк команда-сезон: место
+команды через RANK() по всей таблице и через COUNT(*) по индексу рейтинга
+(как пришлось бы без корзин) против корзин wmfl_rating_buckets, лидеры
+сезона и окно соседей через handler, цена записи рейтинга с триггером
+корзин. Сверяет места с RANK() на выборке команд.
+Запуск: BENCH_DATABASE_URL=postgres://... python backend/bench/bench_leaderboard.py [--sizes 10000,1000000]
+'''
+
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from common import SCHEMA, bench_database_url, counting_connection, emit, load_function, reset_schema, seed_teams
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+TEAMS_PER_TOURNAMENT = 20
+LOOKUPS = 50
+SLOW_LOOKUPS = 5
+
+RANK_WINDOW_SQL = f'''
+    SELECT rank FROM (
+        SELECT team_id, RANK() OVER (ORDER BY rating DESC) AS rank
+        FROM {SCHEMA}.wmfl_tournament_teams WHERE is_active = true
+    ) AS ranked
+    WHERE team_id = %s
+'''
+
+RANK_COUNT_SQL = f'''
+    SELECT 1 + COUNT(*) AS rank FROM {SCHEMA}.wmfl_tournament_teams
+    WHERE is_active = true
+      AND rating > (SELECT rating FROM {SCHEMA}.wmfl_tournament_teams WHERE team_id = %s)
+'''
+
+RANK_BUCKETS_SQL = f'''
+    SELECT {SCHEMA}.wmfl_rating_rank(NULL, rating) AS rank
+    FROM {SCHEMA}.wmfl_tournament_teams WHERE team_id = %s
+'''
+
+def latency(run: Callable[[int], Any], team_ids: List[int]) -> Dict[str, float]:
+    samples = []
+    for team_id in team_ids:
+        started = time.perf_counter()
+        run(team_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(statistics.median(samples), 3), 'max_ms': round(max(samples), 3)}
+
+def scalar(cur, sql: str, team_id: int) -> int:
+    cur.execute(sql, (team_id,))
+    return cur.fetchone()['rank']
+
+def prepare(database_url: str, size: int):
+    reset_schema(database_url)
+    conn = counting_connection(database_url)
+    started = time.perf_counter()
+    seed_teams(conn, size, TEAMS_PER_TOURNAMENT)
+    cur = conn.cursor()
+    cur.execute(f'ANALYZE {SCHEMA}.wmfl_tournament_teams')
+    cur.execute(f'ANALYZE {SCHEMA}.wmfl_rating_buckets')
+    conn.commit()
+    return conn, round(time.perf_counter() - started, 1)
+
+def handler_event(query: Dict[str, str]) -> Dict[str, Any]:
+    return {'httpMethod': 'GET', 'queryStringParameters': query, 'headers': {}}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    args = parser.parse_args()
+
+    database_url = bench_database_url()
+    os.environ['DATABASE_URL'] = database_url
+    module = load_function('wmfl-teams')
+    board = importlib.import_module('leaderboard')
+    module.db_pool.connect = lambda: counting_connection(database_url)
+    rng = random.Random(7)
+    report = []
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        conn, seed_seconds = prepare(database_url, size)
+        cur = conn.cursor()
+        team_ids = [rng.randint(1, size) for _ in range(LOOKUPS)]
+
+        for team_id in team_ids[:SLOW_LOOKUPS]:
+            expected = scalar(cur, RANK_WINDOW_SQL, team_id)
+            if scalar(cur, RANK_BUCKETS_SQL, team_id) != expected or scalar(cur, RANK_COUNT_SQL, team_id) != expected:
+                sys.exit(f'rank mismatch for team {team_id} at {size} rows')
+            if board.around(cur, team_id, None, 5)['team']['rank'] != expected:
+                sys.exit(f'leaderboard.around rank mismatch for team {team_id} at {size} rows')
+        conn.commit()
+
+        def handler_call(query: Dict[str, str]) -> None:
+            module.response_cache.invalidate()
+            response = module.handler(handler_event(query), None)
+            if response['statusCode'] != 200:
+                raise RuntimeError(response['body'][:200])
+
+        paths = [
+            ('rank_window_full_sort', lambda team_id: scalar(cur, RANK_WINDOW_SQL, team_id), team_ids[:SLOW_LOOKUPS]),
+            ('rank_count_rating_index', lambda team_id: scalar(cur, RANK_COUNT_SQL, team_id), team_ids),
+            ('rank_buckets', lambda team_id: scalar(cur, RANK_BUCKETS_SQL, team_id), team_ids),
+            ('around_window_5', lambda team_id: board.around(cur, team_id, None, 5), team_ids),
+            ('top_100', lambda team_id: board.top(cur, None, 100, None), team_ids),
+            ('top_100_season', lambda team_id: board.top(cur, '2024/2025', 100, None), team_ids),
+            ('handler_around', lambda team_id: handler_call({'leaderboard': 'around', 'team_id': str(team_id)}), team_ids),
+            ('handler_top_100', lambda team_id: handler_call({'leaderboard': 'top', 'limit': '100'}), team_ids)
+        ]
+        for name, run, sample in paths:
+            result = latency(run, sample)
+            conn.commit()
+            report.append({'rows': size, 'path': name, 'lookups': len(sample), **result})
+            print(json.dumps(report[-1]), file=sys.stderr)
+
+        def rate_team(team_id: int) -> None:
+            cur.execute(f'UPDATE {SCHEMA}.wmfl_tournament_teams SET rating = rating + 1 WHERE team_id = %s', (team_id,))
+            conn.commit()
+
+        report.append({'rows': size, 'path': 'rating_update_with_buckets', 'lookups': len(team_ids), 'seed_seconds': seed_seconds, **latency(rate_team, team_ids)})
+        cur.execute(f'SELECT SUM(teams) AS teams, COUNT(*) AS buckets FROM {SCHEMA}.wmfl_rating_buckets WHERE season = %s', ('*',))
+        buckets = cur.fetchone()
+        if buckets['teams'] != size:
+            sys.exit(f"buckets hold {buckets['teams']} teams, expected {size}")
+        report[-1]['buckets'] = buckets['buckets']
+        conn.close()
+
+    emit(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+'''
+Бенчмарк загрузки матчей: полный сезон (двухкруговые турниры) через COPY
+в match_ingest.ingest_matches против той же загрузки через многострочный
+INSERT ... VALUES в промежуточную таблицу, повторная загрузка без
+изменений (идемпотентность) и обновление результатов одного тура.
+Запуск: BENCH_DATABASE_URL=postgres://... python backend/bench/bench_matches.py
+'''
+
+import importlib
+import random
+import sys
+from typing import Any, Dict, List
+
+from psycopg2.extras import execute_values
+
+from common import SCHEMA, bench_database_url, counting_connection, emit, load_function, reset_schema, seed_teams, timed
+
+TOURNAMENTS = 100
+TEAMS_PER_TOURNAMENT = 20
+
+def season_matches(tournament_id: int, rng: random.Random) -> List[Dict[str, Any]]:
+    first = (tournament_id - 1) * TEAMS_PER_TOURNAMENT + 1
+    teams = list(range(first, first + TEAMS_PER_TOURNAMENT))
+    rounds = []
+    for _ in range(TEAMS_PER_TOURNAMENT - 1):
+        rounds.append([(teams[i], teams[-1 - i]) for i in range(TEAMS_PER_TOURNAMENT // 2)])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    rounds += [[(away, home) for home, away in fixtures] for fixtures in rounds]
+    return [
+        {
+            'round': number,
+            'played_at': f'2024-{8 + number // 8:02d}-{1 + number % 28:02d}T19:00:00',
+            'home_team': f'Команда {home}',
+            'away_team': f'Команда {away}',
+            'home_goals': rng.randint(0, 4),
+            'away_goals': rng.randint(0, 3)
+        }
+        for number, fixtures in enumerate(rounds, start=1)
+        for home, away in fixtures
+    ]
+
+def values_ingest(ingest, conn, rows) -> Dict[str, int]:
+    cur = conn.cursor()
+    cur.execute(ingest.CREATE_STAGE_SQL)
+    execute_values(cur, f"INSERT INTO wmfl_matches_stage ({', '.join(ingest.STAGE_COLUMNS)}) VALUES %s", rows, page_size=1000)
+    cur.execute(ingest.MERGE_MATCHES_SQL)
+    merged = cur.fetchone()
+    cur.execute(ingest.RECOMPUTE_TEAMS_SQL, (merged['affected_teams'],))
+    conn.commit()
+    return {'inserted': merged['inserted'], 'updated': merged['updated'], 'teams_updated': cur.rowcount}
+
+def prepare(database_url: str):
+    reset_schema(database_url)
+    conn = counting_connection(database_url)
+    seed_teams(conn, TOURNAMENTS * TEAMS_PER_TOURNAMENT, TEAMS_PER_TOURNAMENT)
+    conn.cursor().execute(f'UPDATE {SCHEMA}.wmfl_tournament_teams SET team_key = lower(team_name)')
+    conn.commit()
+    return conn
+
+def main() -> None:
+    database_url = bench_database_url()
+    module = load_function('wmfl-import')
+    ingest = importlib.import_module('match_ingest')
+    rng = random.Random(42)
+    matches = {tournament_id: season_matches(tournament_id, rng) for tournament_id in range(1, TOURNAMENTS + 1)}
+    rows = [row for tournament_id, season in matches.items() for row in module.build_match_rows(tournament_id, season)]
+    last_round = max(match['round'] for match in matches[1])
+    for season in matches.values():
+        for match in season:
+            if match['round'] == last_round:
+                match['home_goals'], match['away_goals'] = match['away_goals'], match['home_goals'] + 1
+    changed_rows = [row for tournament_id, season in matches.items() for row in module.build_match_rows(tournament_id, season)]
+    report = []
+
+    conn = prepare(database_url)
+    measurement = timed(values_ingest, ingest, conn, rows)
+    report.append({'path': 'values_full_season', 'matches': len(rows), 'wall_ms': measurement['wall_ms'], **measurement['result']})
+    conn.close()
+
+    conn = prepare(database_url)
+    for name, batch in (('copy_full_season', rows), ('copy_rerun_unchanged', rows), ('copy_last_round_changed', changed_rows)):
+        measurement = timed(ingest.ingest_matches, conn, batch)
+        result = measurement['result']
+        report.append({
+            'path': name,
+            'matches': len(batch),
+            'wall_ms': measurement['wall_ms'],
+            'matches_per_sec': round(len(batch) / measurement['wall_ms'] * 1000),
+            'round_trips': measurement['round_trips'],
+            **{key: result[key] for key in ('inserted', 'updated', 'unresolved', 'teams_updated')}
+        })
+
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT COUNT(*) AS teams,
+               COUNT(*) FILTER (WHERE matches_played = {2 * (TEAMS_PER_TOURNAMENT - 1)} AND length(form) = 5) AS complete
+        FROM {SCHEMA}.wmfl_tournament_teams
+    ''')
+    check = cur.fetchone()
+    conn.close()
+    if check['teams'] != check['complete'] or report[2]['inserted'] or report[2]['updated']:
+        sys.exit(f'Unexpected ingest state: {check}, rerun {report[2]}')
+
+    emit(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Бенчмарк разбора таблицы: буферный parse_standings против потокового
+parse_standings_stream на сохранённых страницах из fixtures/.
+Меряет время до первой строки, общее время, прочитанные байты и пик памяти.
+Запуск: python backend/bench/bench_stream_parse.py [pages.html ...]
+'''
+
+import importlib
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+from common import emit, load_function
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+REPEATS = 50
+
+class FirstRowProbe:
+    def __init__(self, parser_class):
+        self.first_row_at = None
+        probe = self
+        
+        class ProbedParser(parser_class):
+            def handle_endtag(self, tag):
+                super().handle_endtag(tag)
+                if probe.first_row_at is None and self.teams:
+                    probe.first_row_at = time.perf_counter()
+        
+        self.parser_class = ProbedParser
+
+def measure(module, payload: bytes, streaming: bool) -> Dict[str, Any]:
+    parser_module = importlib.import_module('page_parser')
+    original_parser = parser_module.WMFLPageParser
+    probe = FirstRowProbe(original_parser)
+    parser_module.WMFLPageParser = probe.parser_class
+    try:
+        tracemalloc.start()
+        started = time.perf_counter()
+        if streaming:
+            page = module.parse_standings_stream(io.BytesIO(payload))
+            teams, bytes_read = page['teams'], page['bytes_read']
+        else:
+            teams, bytes_read = module.parse_standings(io.BytesIO(payload).read().decode('utf-8')), len(payload)
+        finished = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        parser_module.WMFLPageParser = original_parser
+    
+    return {
+        'teams': len(teams),
+        'bytes_read': bytes_read,
+        'first_row_ms': round(((probe.first_row_at or finished) - started) * 1000, 3),
+        'total_ms': round((finished - started) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+def main() -> None:
+    module = load_function('wmfl-import')
+    pages = [Path(arg) for arg in sys.argv[1:]] or sorted(FIXTURES_DIR.glob('*.html'))
+    report = []
+    
+    for page in pages:
+        payload = page.read_bytes()
+        for streaming in (False, True):
+            runs = [measure(module, payload, streaming) for _ in range(REPEATS)]
+            runs.sort(key=lambda run: run['total_ms'])
+            median = runs[len(runs) // 2]
+            median.update({'page': page.name, 'path': 'stream' if streaming else 'buffered', 'page_bytes': len(payload)})
+            report.append(median)
+    
+    emit(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+'''
+Общие помощники для бенчмарков backend-функций: загрузка index.py функции
+по пути (каталог остаётся в sys.path для ленивых импортов соседних
+модулей), подготовка схемы из db_migrations, подсчёт обращений к БД и
+локальный стаб wmfl.ru (keep-alive, gzip, ETag, сбои по заказу).
+База берётся из BENCH_DATABASE_URL (одноразовая, схема пересоздаётся);
+без неё поднимается локальный Postgres из пакета pgserver, если он есть.
+'''
+
+import gzip
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = BACKEND_DIR.parent / 'db_migrations'
+SCHEMA = 't_p5773343_football_league_app'
+
+class CountingCursor(RealDictCursor):
+    round_trips = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.round_trips += 1
+        return super().execute(query, vars)
+
+def bench_database_url() -> str:
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if database_url:
+        return database_url
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit('Set BENCH_DATABASE_URL (throwaway database, schema is recreated) or pip install pgserver')
+    server = pgserver.get_server(tempfile.mkdtemp(prefix='wmfl-bench-'), cleanup_mode='stop')
+    os.environ['BENCH_DATABASE_URL'] = server.get_uri()
+    bench_database_url.server = server
+    return os.environ['BENCH_DATABASE_URL']
+
+def load_function(name: str):
+    function_dir = BACKEND_DIR / name
+    for sibling in function_dir.glob('*.py'):
+        sys.modules.pop(sibling.stem, None)
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), function_dir / 'index.py')
+    module = importlib.util.module_from_spec(spec)
+    if str(function_dir) in sys.path:
+        sys.path.remove(str(function_dir))
+    sys.path.insert(0, str(function_dir))
+    spec.loader.exec_module(module)
+    return module
+
+def counting_connection(database_url: str):
+    return psycopg2.connect(database_url, cursor_factory=CountingCursor)
+
+def reset_schema(database_url: str) -> None:
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    cur.execute(f'CREATE SCHEMA {SCHEMA}')
+    for migration in sorted(MIGRATIONS_DIR.glob('V*.sql')):
+        cur.execute(migration.read_text(encoding='utf-8'))
+    conn.close()
+
+def seed_teams(conn, count: int, teams_per_tournament: int = 0) -> None:
+    cur = conn.cursor()
+    cur.execute(f'''
+        INSERT INTO {SCHEMA}.wmfl_tournament_teams
+        (team_id, team_name, city, wins, draws, losses, goals_for, goals_against,
+         rating, position, form, tournament_id, season, is_active, updated_at)
+        SELECT n, 'Команда ' || n, 'Москва', n %% 20, n %% 7, n %% 11, n %% 50, n %% 37,
+               1500 + n %% 300, n, 'ВВНПВ',
+               CASE WHEN %s > 0 THEN 1 + (n - 1) / %s ELSE 1 END,
+               '2024/2025', true,
+               TIMESTAMP '2024-08-01 12:00:00' + n * INTERVAL '1.5 seconds'
+        FROM generate_series(1, %s) AS n
+    ''', (teams_per_tournament, max(teams_per_tournament, 1), count))
+    conn.commit()
+
+def timed(fn, *args, **kwargs) -> Dict[str, Any]:
+    CountingCursor.round_trips = 0
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return {
+        'wall_ms': round((time.perf_counter() - started) * 1000, 3),
+        'round_trips': CountingCursor.round_trips,
+        'result': result
+    }
+
+def emit(report: List[Dict[str, Any]]) -> None:
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+class StubWMFLServer(ThreadingHTTPServer):
+    '''
+    Стаб wmfl.ru на 127.0.0.1: HTTP/1.1 keep-alive, gzip по Accept-Encoding,
+    ETag/304, задержка ответа, а fail_next ближайших запросов получают 503.
+    handshake_seconds - пауза на каждом новом соединении (как TLS до
+    wmfl.ru), idle_timeout - через сколько сервер молча закрывает
+    простаивающее соединение. Считает принятые TCP-соединения и запросы.
+    '''
+    daemon_threads = True
+
+    def __init__(self, payload: bytes, delay_seconds: float = 0.0, handshake_seconds: float = 0.0, idle_timeout: float = None):
+        super().__init__(('127.0.0.1', 0), StubWMFLHandler)
+        self.payload = payload
+        self.gzipped = gzip.compress(payload, 6)
+        self.etag = '"stub-1"'
+        self.delay_seconds = delay_seconds
+        self.handshake_seconds = handshake_seconds
+        self.idle_timeout = idle_timeout
+        self.fail_next = 0
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+class StubWMFLHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        self.timeout = self.server.idle_timeout
+        super().setup()
+        if self.server.handshake_seconds:
+            time.sleep(self.server.handshake_seconds)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failing = server.fail_next > 0
+            server.fail_next -= 1 if failing else 0
+        if server.delay_seconds:
+            time.sleep(server.delay_seconds)
+        if failing:
+            self.reply(503, b'busy')
+            return
+        if self.headers.get('If-None-Match') == server.etag:
+            self.reply(304, b'')
+            return
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            self.reply(200, server.gzipped, {'Content-Encoding': 'gzip'})
+        else:
+            self.reply(200, server.payload)
+
+    def reply(self, status: int, body: bytes, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header('ETag', self.server.etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
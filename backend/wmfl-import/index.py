@@ -1,217 +1,715 @@
 '''
 Business: Импорт команд турнира из WMFL через парсинг HTML страницы
-Args: event - dict with httpMethod, body (tournament_id)
+Args: event - dict with httpMethod, body (tournament_id or tournament_ids, force, dry_run; tournament_id with matches - backfill of matches)
       context - object with attributes: request_id, function_name
-Returns: HTTP response with imported teams count
+Returns: HTTP response with imported teams count, the diff of written rows (inserted, updated, deactivated) and WMFL request stats (bytes, latency, retries)
 '''
 
+import codecs
+import hashlib
 import json
 import os
-import re
-from typing import Dict, Any, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import urllib.request
-import urllib.error
-from html.parser import HTMLParser
-
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception('DATABASE_URL not found in environment')
-    return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-
-class WMFLStandingsParser(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.teams = []
-        self.current_team = {}
-        self.in_standings = False
-        self.in_team_row = False
-        self.cell_index = 0
-        self.current_data = []
-        
-    def handle_starttag(self, tag, attrs):
-        attrs_dict = dict(attrs)
-        
-        if tag == 'tr' and any('team' in str(v).lower() for k, v in attrs):
-            self.in_team_row = True
-            self.current_team = {}
-            self.cell_index = 0
-            
-        if tag == 'td' and self.in_team_row:
-            self.current_data = []
-    
-    def handle_data(self, data):
-        if self.in_team_row and data.strip():
-            self.current_data.append(data.strip())
-    
-    def handle_endtag(self, tag):
-        if tag == 'td' and self.in_team_row and self.current_data:
-            value = ' '.join(self.current_data)
-            
-            if self.cell_index == 0 and value.isdigit():
-                self.current_team['position'] = int(value)
-            elif self.cell_index == 1:
-                self.current_team['team_name'] = value
-            elif 'games' not in self.current_team and value.isdigit():
-                self.current_team['games'] = int(value)
-            elif 'wins' not in self.current_team and value.isdigit():
-                self.current_team['wins'] = int(value)
-            elif 'draws' not in self.current_team and value.isdigit():
-                self.current_team['draws'] = int(value)
-            elif 'losses' not in self.current_team and value.isdigit():
-                self.current_team['losses'] = int(value)
-            elif ':' in value:
-                parts = value.split(':')
-                if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
-                    self.current_team['goals_for'] = int(parts[0])
-                    self.current_team['goals_against'] = int(parts[1])
-            elif 'points' not in self.current_team and value.isdigit():
-                self.current_team['points'] = int(value)
-                
-            self.cell_index += 1
-            
-        if tag == 'tr' and self.in_team_row:
-            if self.current_team and 'team_name' in self.current_team:
-                self.teams.append(self.current_team)
-            self.in_team_row = False
-
-def fetch_wmfl_page(tournament_id: int) -> str:
-    url = f'https://wmfl.ru/tournament/{tournament_id}/standings'
+import sys
+import threading
+import time
+from contextvars import copy_context
+from typing import Dict, Any, List, Optional, Tuple
+from wmfl_core import (
+    METHOD_NOT_ALLOWED_RESPONSE, LazyModule, bad_request, current_trace, db_pool, execute_values,
+    json_response, lock_standings, preflight_response, psycopg2, team_key, trace_phase, traced_handler
+)
+import match_ingest
+import standings_history
+
+concurrent_futures = LazyModule('concurrent.futures')
+page_parser = LazyModule('page_parser')
+wmfl_http = LazyModule('wmfl_http')
+
+FETCH_TIMEOUT_SECONDS = 15.0
+STREAM_CHUNK_SIZE = 16384
+MAX_CONCURRENCY_PER_HOST = int(os.environ.get('WMFL_MAX_CONCURRENCY_PER_HOST', '4'))
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get('IMPORT_TIME_BUDGET_SECONDS', '25'))
+MAX_BATCH_TOURNAMENTS = 100
+MAX_BACKFILL_MATCHES = 100000
+INITIAL_RATING = 1500
+POINTS_RATING_STEP = 10
+
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+fetch_stats = {'not_modified': 0, 'cache_hit': 0, 'unchanged': 0, 'changed': 0}
+_fetch_stats_lock = threading.Lock()
+
+def fetch_wmfl_page(tournament_id: int, timeout: float = FETCH_TIMEOUT_SECONDS, state: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+    client = wmfl_http.client
     
     try:
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        headers = {}
+        if state and state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state and state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
         
-        with urllib.request.urlopen(req, timeout=15) as response:
-            return response.read().decode('utf-8')
+        slot = host_slot(client.host)
+        # Ожидание слота хоста тоже ограничено дедлайном: поток не переживает обработчик
+        if not slot.acquire(timeout=client.request_timeout(timeout, deadline)):
+            raise Exception('Time budget exceeded waiting for a host slot')
+        try:
+            with trace_phase('fetch'):
+                response = client.get(f'/tournament/{tournament_id}/standings', headers, timeout=timeout, deadline=deadline)
+            with response:
+                if response.status == 304:
+                    page = {
+                        'not_modified': True,
+                        'teams': [],
+                        'etag': response.headers.get('ETag') or state.get('etag'),
+                        'last_modified': response.headers.get('Last-Modified') or state.get('last_modified')
+                    }
+                elif response.status != 200:
+                    raise Exception(f'HTTP Error {response.status}: {response.reason}')
+                else:
+                    page = parse_standings_stream(response)
+                    page['not_modified'] = False
+                    page['etag'] = response.headers.get('ETag')
+                    page['last_modified'] = response.headers.get('Last-Modified')
+        finally:
+            slot.release()
+        page['http'] = response.stats
+        return page
     except Exception as e:
         raise Exception(f'Failed to fetch WMFL page: {str(e)}')
 
-def parse_standings(html_content: str) -> List[Dict[str, Any]]:
-    parser = WMFLStandingsParser()
-    parser.feed(html_content)
-    return parser.teams
+def host_slot(host: str) -> threading.Semaphore:
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_CONCURRENCY_PER_HOST)
+        return _host_slots[host]
 
-def import_teams_to_db(conn, teams_data: List[Dict[str, Any]], tournament_id: int) -> int:
-    cur = conn.cursor()
-    imported_count = 0
+def content_hash(value: str) -> str:
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+def fetch_and_parse(tournament_id: int, deadline: float, state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise Exception('Import time budget exceeded')
+    page = fetch_wmfl_page(tournament_id, timeout=min(FETCH_TIMEOUT_SECONDS, remaining), state=state, deadline=deadline)
+    previous = state or {}
+    new_state = {
+        'tournament_id': tournament_id,
+        'etag': page['etag'],
+        'last_modified': page['last_modified'],
+        'body_hash': previous.get('body_hash'),
+        'standings_hash': previous.get('standings_hash')
+    }
+    
+    if page['not_modified']:
+        return {'fetch_status': 'not_modified', 'teams': [], 'state': new_state, 'http': page['http']}
     
-    for team in teams_data:
+    new_state['body_hash'] = page['body_hash']
+    if new_state['body_hash'] == previous.get('body_hash'):
+        return {'fetch_status': 'cache_hit', 'teams': [], 'state': new_state, 'http': page['http']}
+    
+    teams_data = page['teams']
+    tables = {'matches': page['matches'], 'scorers': page['scorers']}
+    new_state['standings_hash'] = content_hash(json.dumps([teams_data, page['matches']], sort_keys=True, ensure_ascii=False))
+    if new_state['standings_hash'] == previous.get('standings_hash'):
+        return {'fetch_status': 'unchanged', 'teams': teams_data, **tables, 'state': new_state, 'http': page['http']}
+    
+    return {'fetch_status': 'changed', 'teams': teams_data, **tables, 'state': new_state, 'http': page['http']}
+
+def fetch_tournaments(tournament_ids: List[int], time_budget: float, states: Dict[int, Dict[str, Any]]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, str]]:
+    deadline = time.monotonic() + time_budget
+    outcomes: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, str] = {}
+    
+    # Каждый шаг загрузки (слот хоста, ведро токенов, соединение, каждое чтение тела)
+    # ограничен дедлайном, поэтому выход из пула ждёт все потоки: после ответа
+    # обработчика ни одна загрузка не продолжается, а не начатые падают сразу
+    with concurrent_futures.ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY_PER_HOST, len(tournament_ids))) as executor:
+        futures = {
+            executor.submit(copy_context().run, fetch_and_parse, tid, deadline, states.get(tid)): tid
+            for tid in tournament_ids
+        }
+    
+    for future, tournament_id in futures.items():
         try:
-            team_id = hash(team['team_name']) % 1000000
-            rating = 1500 + (team.get('points', 0) * 10)
-            
-            cur.execute('''
-                INSERT INTO t_p5773343_football_league_app.wmfl_tournament_teams 
-                (team_id, team_name, matches_played, wins, draws, losses, 
-                 goals_for, goals_against, rating, position, tournament_id, 
-                 season, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (team_id) 
-                DO UPDATE SET
-                    team_name = EXCLUDED.team_name,
-                    matches_played = EXCLUDED.matches_played,
-                    wins = EXCLUDED.wins,
-                    draws = EXCLUDED.draws,
-                    losses = EXCLUDED.losses,
-                    goals_for = EXCLUDED.goals_for,
-                    goals_against = EXCLUDED.goals_against,
-                    rating = EXCLUDED.rating,
-                    position = EXCLUDED.position,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (
-                team_id,
-                team['team_name'],
-                team.get('games', 0),
-                team.get('wins', 0),
-                team.get('draws', 0),
-                team.get('losses', 0),
-                team.get('goals_for', 0),
-                team.get('goals_against', 0),
-                rating,
-                team.get('position'),
-                tournament_id,
-                '2024/2025',
-                True
-            ))
-            imported_count += 1
+            outcomes[tournament_id] = future.result()
         except Exception as e:
-            print(f"Failed to import team {team.get('team_name')}: {str(e)}")
+            errors[tournament_id] = str(e)
+    
+    record_fetch_outcomes(outcomes.values())
+    return outcomes, errors
+
+def record_fetch_outcomes(outcomes) -> None:
+    with _fetch_stats_lock:
+        for outcome in outcomes:
+            fetch_stats[outcome['fetch_status']] += 1
+
+def fetch_stats_snapshot() -> Dict[str, int]:
+    with _fetch_stats_lock:
+        stats = dict(fetch_stats)
+    stats['skipped'] = stats['not_modified'] + stats['cache_hit'] + stats['unchanged']
+    return stats
+
+def parse_page(html_content: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Dict[str, List[Dict[str, Any]]]:
+    parser = page_parser.WMFLPageParser()
+    for offset in range(0, len(html_content), chunk_size):
+        parser.feed(html_content[offset:offset + chunk_size])
+        if parser.finished:
+            break
+    else:
+        parser.close()
+    return parser.tables
+
+def parse_standings(html_content: str) -> List[Dict[str, Any]]:
+    return parse_page(html_content)['teams']
+
+def parse_standings_stream(stream, chunk_size: int = STREAM_CHUNK_SIZE) -> Dict[str, Any]:
+    parser = page_parser.WMFLPageParser()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    digest = hashlib.sha256()
+    bytes_read = 0
+    
+    while not parser.finished:
+        with trace_phase('fetch'):
+            chunk = stream.read(chunk_size)
+        if not chunk:
+            with trace_phase('parse'):
+                parser.feed(decoder.decode(b'', final=True))
+                parser.close()
+            break
+        bytes_read += len(chunk)
+        digest.update(chunk)
+        with trace_phase('parse'):
+            parser.feed(decoder.decode(chunk))
+    
+    return {
+        **parser.tables,
+        'body_hash': digest.hexdigest(),
+        'bytes_read': bytes_read,
+        'stopped_early': parser.finished
+    }
+
+TEAM_UPSERT_SQL = '''
+    INSERT INTO t_p5773343_football_league_app.wmfl_tournament_teams 
+    (tournament_id, team_key, wmfl_team_id, team_name, matches_played, 
+     wins, draws, losses, goals_for, goals_against, rating, position, 
+     season, is_active)
+    VALUES %s
+    ON CONFLICT (tournament_id, team_key) 
+    DO UPDATE SET
+        team_name = EXCLUDED.team_name,
+        wmfl_team_id = COALESCE(EXCLUDED.wmfl_team_id, wmfl_tournament_teams.wmfl_team_id),
+        matches_played = EXCLUDED.matches_played,
+        wins = EXCLUDED.wins,
+        draws = EXCLUDED.draws,
+        losses = EXCLUDED.losses,
+        goals_for = EXCLUDED.goals_for,
+        goals_against = EXCLUDED.goals_against,
+        rating = CASE WHEN wmfl_tournament_teams.elo_rating IS NULL THEN EXCLUDED.rating ELSE wmfl_tournament_teams.rating END,
+        position = EXCLUDED.position,
+        is_active = true,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (wmfl_tournament_teams.team_name, wmfl_tournament_teams.wmfl_team_id, wmfl_tournament_teams.matches_played,
+           wmfl_tournament_teams.wins, wmfl_tournament_teams.draws, wmfl_tournament_teams.losses,
+           wmfl_tournament_teams.goals_for, wmfl_tournament_teams.goals_against, wmfl_tournament_teams.is_active,
+           wmfl_tournament_teams.rating)
+          IS DISTINCT FROM
+          (EXCLUDED.team_name, COALESCE(EXCLUDED.wmfl_team_id, wmfl_tournament_teams.wmfl_team_id), EXCLUDED.matches_played,
+           EXCLUDED.wins, EXCLUDED.draws, EXCLUDED.losses,
+           EXCLUDED.goals_for, EXCLUDED.goals_against, true,
+           CASE WHEN wmfl_tournament_teams.elo_rating IS NULL THEN EXCLUDED.rating ELSE wmfl_tournament_teams.rating END)
+'''
+
+TEAM_ROW_FIELDS = (
+    'tournament_id', 'team_key', 'wmfl_team_id', 'team_name', 'matches_played', 'wins', 'draws',
+    'losses', 'goals_for', 'goals_against', 'rating', 'position', 'season', 'is_active'
+)
+DIFF_FIELDS = (
+    'team_key', 'wmfl_team_id', 'team_name', 'matches_played', 'wins', 'draws',
+    'losses', 'goals_for', 'goals_against', 'rating', 'is_active'
+)
+
+TEAM_UPDATE_SQL = '''
+    UPDATE t_p5773343_football_league_app.wmfl_tournament_teams AS t
+    SET team_key = v.team_key,
+        wmfl_team_id = v.wmfl_team_id,
+        team_name = v.team_name,
+        matches_played = v.matches_played,
+        wins = v.wins,
+        draws = v.draws,
+        losses = v.losses,
+        goals_for = v.goals_for,
+        goals_against = v.goals_against,
+        rating = CASE WHEN t.elo_rating IS NULL THEN v.rating ELSE t.rating END,
+        is_active = v.is_active,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (VALUES %s) AS v(id, team_key, wmfl_team_id, team_name, matches_played, wins, draws, losses, goals_for, goals_against, rating, is_active)
+    WHERE t.id = v.id
+'''
+TEAM_UPDATE_TEMPLATE = '(%s, %s, %s::int, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+
+def build_team_row(team: Dict[str, Any], tournament_id: int) -> Tuple:
+    # Рейтинг по очкам действует, пока у команды нет рейтинга Эло (elo_rating): его ведёт wmfl-sync по матчам
+    return (
+        tournament_id,
+        team_key(team['team_name']),
+        team.get('wmfl_team_id'),
+        team['team_name'],
+        team.get('games', 0),
+        team.get('wins', 0),
+        team.get('draws', 0),
+        team.get('losses', 0),
+        team.get('goals_for', 0),
+        team.get('goals_against', 0),
+        INITIAL_RATING + (team.get('points') or 0) * POINTS_RATING_STEP,
+        team.get('position'),
+        '2024/2025',
+        True
+    )
+
+def build_match_rows(tournament_id: int, matches: List[Dict[str, Any]]) -> List[Tuple]:
+    # leg - какая по счёту встреча этих хозяев с этими гостями на странице: часть естественного ключа матча
+    legs: Dict[Tuple[str, str], int] = {}
+    rows = []
+    for match in matches:
+        home_key, away_key = team_key(match['home_team']), team_key(match['away_team'])
+        leg = legs[(home_key, away_key)] = legs.get((home_key, away_key), 0) + 1
+        if not match.get('played_at'):
+            continue
+        rows.append((
+            tournament_id,
+            leg,
+            match.get('round'),
+            match['played_at'],
+            home_key,
+            match.get('home_wmfl_team_id'),
+            away_key,
+            match.get('away_wmfl_team_id'),
+            match.get('home_goals'),
+            match.get('away_goals')
+        ))
+    return rows
+
+def load_current_teams(cur, tournament_ids: List[int]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    cur.execute(f'''
+        SELECT id, team_id, {', '.join(DIFF_FIELDS)}, elo_rating, tournament_id
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams
+        WHERE tournament_id = ANY(%s)
+        FOR UPDATE
+    ''', (tournament_ids,))
+    current: Dict[int, Dict[str, Dict[str, Any]]] = {tournament_id: {} for tournament_id in tournament_ids}
+    for row in cur.fetchall():
+        current[row['tournament_id']][row['team_key']] = dict(row)
+    return current
+
+def diff_tournament(current: Dict[str, Dict[str, Any]], rows: List[Tuple]) -> Dict[str, Any]:
+    parsed = {row[1]: dict(zip(TEAM_ROW_FIELDS, row)) for row in rows}
+    by_wmfl_id = {team['wmfl_team_id']: team for team in current.values() if team['wmfl_team_id'] is not None}
+    matched_ids = set()
+    inserts: List[Tuple] = []
+    updates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    
+    for row in rows:
+        team = parsed[row[1]]
+        existing = current.get(team['team_key'])
+        if existing is None and team['wmfl_team_id'] is not None:
+            # Переименование: та же команда WMFL под новым названием, если старое название со страницы пропало
+            renamed = by_wmfl_id.get(team['wmfl_team_id'])
+            if renamed is not None and renamed['team_key'] not in parsed:
+                existing = renamed
+        if existing is None or existing['id'] in matched_ids:
+            inserts.append(row)
             continue
+        matched_ids.add(existing['id'])
+        target = dict(
+            team,
+            wmfl_team_id=team['wmfl_team_id'] if team['wmfl_team_id'] is not None else existing['wmfl_team_id'],
+            rating=team['rating'] if existing['elo_rating'] is None else existing['rating']
+        )
+        changes = {field: [existing[field], target[field]] for field in DIFF_FIELDS if existing[field] != target[field]}
+        if changes:
+            updates.append((existing, dict(target, changes=changes)))
+    
+    deactivated = [
+        team for team in current.values()
+        if team['is_active'] and team['id'] not in matched_ids
+    ]
+    return {'inserts': inserts, 'updates': updates, 'deactivated': deactivated, 'unchanged': len(rows) - len(inserts) - len(updates)}
+
+def describe_diff(diff: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'inserted': [row[3] for row in diff['inserts']],
+        'updated': [
+            {'team_id': existing['team_id'], 'team_name': target['team_name'], 'changes': target['changes']}
+            for existing, target in diff['updates']
+        ],
+        'deactivated': [{'team_id': team['team_id'], 'team_name': team['team_name']} for team in diff['deactivated']],
+        'unchanged': diff['unchanged']
+    }
+
+def write_diffs(cur, diffs: Dict[int, Dict[str, Any]]) -> None:
+    inserts = [row for diff in diffs.values() for row in diff['inserts']]
+    updates = [
+        (existing['id'],) + tuple(target[field] for field in DIFF_FIELDS)
+        for diff in diffs.values() for existing, target in diff['updates']
+    ]
+    deactivated = [team['id'] for diff in diffs.values() for team in diff['deactivated']]
+    
+    if updates:
+        execute_values(cur, TEAM_UPDATE_SQL, updates, template=TEAM_UPDATE_TEMPLATE, page_size=len(updates))
+    if deactivated:
+        cur.execute('''
+            UPDATE t_p5773343_football_league_app.wmfl_tournament_teams
+            SET is_active = false, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s)
+        ''', (deactivated,))
+    if inserts:
+        execute_values(cur, TEAM_UPSERT_SQL, inserts, page_size=len(inserts))
+
+def write_diffs_one_by_one(cur, diffs: Dict[int, Dict[str, Any]]) -> None:
+    # Каждая операция диффа (обновление, деактивация, вставка) пишется под своей точкой
+    # сохранения; не записавшиеся убираются из диффа, чтобы ответ описывал записанное
+    for diff in diffs.values():
+        for kind in ('updates', 'deactivated', 'inserts'):
+            written = []
+            for operation in diff[kind]:
+                cur.execute('SAVEPOINT team_row')
+                try:
+                    write_diffs(cur, {0: {'inserts': [], 'updates': [], 'deactivated': [], kind: [operation]}})
+                    cur.execute('RELEASE SAVEPOINT team_row')
+                    written.append(operation)
+                except psycopg2.Error as e:
+                    cur.execute('ROLLBACK TO SAVEPOINT team_row')
+                    print(f"Failed to import team {diff_team_name(kind, operation)}: {str(e)}")
+            diff[kind] = written
+
+def diff_team_name(kind: str, operation: Any) -> str:
+    if kind == 'inserts':
+        return operation[3]
+    if kind == 'updates':
+        return operation[1]['team_name']
+    return operation['team_name']
+
+def import_tournaments_to_db(conn, teams_by_tournament: Dict[int, List[Dict[str, Any]]], dry_run: bool = False) -> Tuple[Dict[int, int], Dict[int, Dict[str, Any]]]:
+    rows_by_key: Dict[Tuple[int, str], Tuple] = {}
+    
+    for tournament_id, teams_data in teams_by_tournament.items():
+        for team in teams_data:
+            try:
+                row = build_team_row(team, tournament_id)
+            except Exception as e:
+                print(f"Failed to import team {team.get('team_name')}: {str(e)}")
+                continue
+            rows_by_key[row[:2]] = row
+    
+    rows = list(rows_by_key.values())
+    if not rows:
+        return {}, {}
+    
+    rows_by_tournament: Dict[int, List[Tuple]] = {}
+    for row in rows:
+        rows_by_tournament.setdefault(row[0], []).append(row)
     
+    cur = conn.cursor()
+    lock_standings(cur, rows_by_tournament)
+    current = load_current_teams(cur, list(rows_by_tournament))
+    diffs = {
+        tournament_id: diff_tournament(current[tournament_id], tournament_rows)
+        for tournament_id, tournament_rows in rows_by_tournament.items()
+    }
+    
+    if not dry_run:
+        # Откат к точке сохранения оставляет блокировки и строки FOR UPDATE, поэтому
+        # тот же дифф повторяется по одной операции, включая деактивации
+        cur.execute('SAVEPOINT team_diffs')
+        try:
+            write_diffs(cur, diffs)
+        except psycopg2.Error as e:
+            cur.execute('ROLLBACK TO SAVEPOINT team_diffs')
+            print(f"Bulk import failed, retrying row by row: {str(e)}")
+            write_diffs_one_by_one(cur, diffs)
+    
+    described = {tournament_id: describe_diff(diff) for tournament_id, diff in diffs.items()}
+    imported_counts = {
+        tournament_id: diff['unchanged'] + len(diff['inserts']) + len(diff['updates'])
+        for tournament_id, diff in diffs.items()
+    }
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return imported_counts, described
+
+def import_teams_to_db(conn, teams_data: List[Dict[str, Any]], tournament_id: int) -> int:
+    return import_tournaments_to_db(conn, {tournament_id: teams_data})[0].get(tournament_id, 0)
+
+def load_import_state(conn, tournament_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT tournament_id, etag, last_modified, body_hash, standings_hash
+        FROM t_p5773343_football_league_app.wmfl_import_state
+        WHERE tournament_id = ANY(%s)
+    ''', (tournament_ids,))
+    states = {row['tournament_id']: dict(row) for row in cur.fetchall()}
+    conn.commit()
+    return states
+
+def save_import_state(conn, outcomes: List[Dict[str, Any]]) -> None:
+    if not outcomes:
+        return
+    
+    cur = conn.cursor()
+    execute_values(cur, '''
+        INSERT INTO t_p5773343_football_league_app.wmfl_import_state
+        (tournament_id, etag, last_modified, body_hash, standings_hash, 
+         skipped_count, last_checked_at, last_changed_at)
+        VALUES %s
+        ON CONFLICT (tournament_id)
+        DO UPDATE SET
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            body_hash = EXCLUDED.body_hash,
+            standings_hash = EXCLUDED.standings_hash,
+            skipped_count = wmfl_import_state.skipped_count + EXCLUDED.skipped_count,
+            last_checked_at = EXCLUDED.last_checked_at,
+            last_changed_at = COALESCE(EXCLUDED.last_changed_at, wmfl_import_state.last_changed_at)
+    ''', [
+        (
+            outcome['state']['tournament_id'],
+            outcome['state']['etag'],
+            outcome['state']['last_modified'],
+            outcome['state']['body_hash'],
+            outcome['state']['standings_hash'],
+            0 if outcome['fetch_status'] == 'changed' else 1,
+            outcome['fetch_status'] == 'changed'
+        )
+        for outcome in outcomes
+    ], template='(%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CASE WHEN %s THEN CURRENT_TIMESTAMP END)', page_size=len(outcomes))
     conn.commit()
-    return imported_count
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def log_import_runs(conn, outcomes: Dict[int, Dict[str, Any]], errors: Dict[int, str], imported_counts: Dict[int, int]) -> None:
+    trace = current_trace.get()
+    duration_ms = round(trace.total_ms()) if trace else None
+    phase_timings = json.dumps(trace.phase_timings()) if trace else None
+    
+    entries = []
+    for tournament_id, outcome in outcomes.items():
+        if outcome['fetch_status'] == 'changed':
+            count = imported_counts.get(tournament_id, 0)
+            entries.append((tournament_id, 'success', f'Импортировано команд: {count}', count))
+        else:
+            entries.append((tournament_id, 'success', 'Данные турнира не изменились с прошлого импорта', 0))
+    for tournament_id, error in errors.items():
+        entries.append((tournament_id, 'error', f'Ошибка импорта: {error}', 0))
+    if not entries:
+        return
+    
+    cur = conn.cursor()
+    execute_values(cur, '''
+        INSERT INTO t_p5773343_football_league_app.wmfl_sync_log 
+        (tournament_id, status, message, teams_updated, run_type, duration_ms, phase_timings)
+        VALUES %s
+    ''', [entry + (duration_ms, phase_timings) for entry in entries],
+        template="(%s, %s, %s, %s, 'import', %s, %s)", page_size=len(entries))
+    conn.commit()
+
+def run_import(tournament_ids: List[int], force: bool, dry_run: bool = False) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, str], Dict[int, int], Optional[Dict[str, int]]]:
+    with trace_phase('db_connect'):
+        conn = db_pool.acquire()
+    try:
+        states = {} if force else load_import_state(conn, tournament_ids)
+        outcomes, errors = fetch_tournaments(tournament_ids, IMPORT_TIME_BUDGET_SECONDS, states)
+        
+        changed = {
+            tournament_id: outcome
+            for tournament_id, outcome in outcomes.items()
+            if outcome['fetch_status'] == 'changed'
+        }
+        with trace_phase('write'):
+            teams_by_tournament = {tournament_id: outcome['teams'] for tournament_id, outcome in changed.items()}
+            imported_counts, diffs = import_tournaments_to_db(conn, teams_by_tournament, dry_run) if any(teams_by_tournament.values()) else ({}, {})
+        for tournament_id, diff in diffs.items():
+            outcomes[tournament_id]['diff'] = diff
+        if dry_run:
+            return outcomes, errors, imported_counts, None
+        
+        with trace_phase('matches'):
+            match_rows = [row for tournament_id, outcome in changed.items() for row in build_match_rows(tournament_id, outcome['matches'])]
+            match_counts = match_ingest.ingest_matches(conn, match_rows, list(imported_counts))
+        with trace_phase('snapshots'):
+            touched = set(imported_counts) | {tournament_id for tournament_id, outcome in changed.items() if outcome['matches']}
+            standings_history.record_standings_snapshots(conn, sorted(touched))
+        save_import_state(conn, list(outcomes.values()))
+        log_import_runs(conn, outcomes, errors, imported_counts)
+    finally:
+        db_pool.release(conn)
+    
+    return outcomes, errors, imported_counts, match_counts
+
+def tournament_id_value(raw: Any) -> Optional[int]:
+    if isinstance(raw, int) and not isinstance(raw, bool) and raw > 0:
+        return raw
+    if isinstance(raw, str) and raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    return None
+
+def backfill_matches(tournament_id: int, matches: Any) -> Dict[str, Any]:
+    if not isinstance(matches, list) or not matches or len(matches) > MAX_BACKFILL_MATCHES:
+        return json_response(400, {'error': f'matches must be a list of 1..{MAX_BACKFILL_MATCHES} matches'})
+    if not all(isinstance(match, dict) and match.get('home_team') and match.get('away_team') for match in matches):
+        return json_response(400, {'error': 'every match needs home_team and away_team'})
+    
+    started = time.monotonic()
+    rows = build_match_rows(tournament_id, matches)
+    with trace_phase('db_connect'):
+        conn = db_pool.acquire()
+    try:
+        with trace_phase('matches'):
+            match_counts = match_ingest.ingest_matches(conn, rows)
+        with trace_phase('snapshots'):
+            standings_history.record_standings_snapshots(conn, [tournament_id] if match_counts['teams_updated'] else [])
+    finally:
+        db_pool.release(conn)
+    
+    return json_response(200, {
+        'success': True,
+        'tournament_id': tournament_id,
+        'match_ingest': match_counts,
+        'skipped_undated': len(matches) - len(rows),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'message': f"Загружено матчей: {match_counts['inserted']}, обновлено: {match_counts['updated']}"
+    })
+
+def import_batch(raw_ids: Any, force: bool, dry_run: bool) -> Dict[str, Any]:
+    if not isinstance(raw_ids, list) or not raw_ids or len(raw_ids) > MAX_BATCH_TOURNAMENTS:
+        return json_response(400, {'error': f'tournament_ids must be a list of 1..{MAX_BATCH_TOURNAMENTS} ids'})
+    
+    parsed_ids = [tournament_id_value(tid) for tid in raw_ids]
+    if None in parsed_ids:
+        return bad_request('tournament_ids must be positive integers')
+    tournament_ids = list(dict.fromkeys(parsed_ids))
+    started = time.monotonic()
+    outcomes, errors, imported_counts, match_counts = run_import(tournament_ids, force, dry_run)
+    
+    results = []
+    for tournament_id in tournament_ids:
+        if tournament_id in errors:
+            results.append({'tournament_id': tournament_id, 'status': 'error', 'error': errors[tournament_id]})
+            continue
+        outcome = outcomes[tournament_id]
+        if outcome['fetch_status'] != 'changed':
+            status = 'skipped'
+        else:
+            status = 'imported' if outcome['teams'] else 'empty'
+        results.append({
+            'tournament_id': tournament_id,
+            'status': status,
+            'fetch_status': outcome['fetch_status'],
+            'total_teams': len(outcome['teams']),
+            'imported_count': imported_counts.get(tournament_id, 0),
+            'diff': outcome.get('diff'),
+            'http': outcome['http']
+        })
+    
+    imported_count = sum(imported_counts.values())
+    return json_response(200, {
+        'success': not errors,
+        'dry_run': dry_run,
+        'imported_count': imported_count,
+        'failed_count': len(errors),
+        'skipped_count': sum(1 for result in results if result['status'] == 'skipped'),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'fetch_stats': fetch_stats_snapshot(),
+        'match_ingest': match_counts,
+        'message': f'Импортировано команд: {imported_count}, турниров с ошибками: {len(errors)}',
+        'results': results
+    })
+
+PREFLIGHT_RESPONSE = preflight_response('POST, OPTIONS')
+
+def route(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'POST')
     
     if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+        return PREFLIGHT_RESPONSE
     
     if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+        return METHOD_NOT_ALLOWED_RESPONSE
     
     try:
         body_data = json.loads(event.get('body', '{}'))
-        tournament_id = body_data.get('tournament_id', 1056456)
         
-        html_content = fetch_wmfl_page(tournament_id)
-        teams_data = parse_standings(html_content)
+        force = bool(body_data.get('force', False))
+        dry_run = bool(body_data.get('dry_run', False))
         
-        if not teams_data:
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'success': True,
-                    'imported_count': 0,
-                    'message': 'Не удалось найти данные турнира. Возможно, турнир закрыт или ID неверный.'
-                }, ensure_ascii=False),
-                'isBase64Encoded': False
-            }
+        tournament_id = tournament_id_value(body_data.get('tournament_id', 1056456))
+        if tournament_id is None:
+            return bad_request('tournament_id must be a positive integer')
         
-        conn = get_db_connection()
-        imported_count = import_teams_to_db(conn, teams_data, tournament_id)
-        conn.close()
+        if 'matches' in body_data:
+            return backfill_matches(tournament_id, body_data['matches'])
         
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+        if 'tournament_ids' in body_data:
+            return import_batch(body_data['tournament_ids'], force, dry_run)
+        
+        outcomes, errors, imported_counts, match_counts = run_import([tournament_id], force, dry_run)
+        if tournament_id in errors:
+            raise Exception(errors[tournament_id])
+        
+        outcome = outcomes[tournament_id]
+        teams_data = outcome['teams']
+        
+        if outcome['fetch_status'] != 'changed':
+            return json_response(200, {
                 'success': True,
-                'imported_count': imported_count,
+                'imported_count': 0,
                 'total_teams': len(teams_data),
                 'tournament_id': tournament_id,
-                'message': f'Импортировано команд: {imported_count}',
-                'teams': teams_data
-            }, ensure_ascii=False),
-            'isBase64Encoded': False
-        }
+                'fetch_status': outcome['fetch_status'],
+                'fetch_stats': fetch_stats_snapshot(),
+                'http': outcome['http'],
+                'message': 'Данные турнира не изменились с прошлого импорта'
+            })
+        
+        if not teams_data:
+            return json_response(200, {
+                'success': True,
+                'imported_count': 0,
+                'fetch_status': outcome['fetch_status'],
+                'message': 'Не удалось найти данные турнира. Возможно, турнир закрыт или ID неверный.'
+            })
+        
+        imported_count = imported_counts.get(tournament_id, 0)
+        
+        return json_response(200, {
+            'success': True,
+            'dry_run': dry_run,
+            'imported_count': imported_count,
+            'total_teams': len(teams_data),
+            'total_matches': len(outcome['matches']),
+            'total_scorers': len(outcome['scorers']),
+            'tournament_id': tournament_id,
+            'fetch_status': outcome['fetch_status'],
+            'http': outcome['http'],
+            'message': f'Импортировано команд: {imported_count}' if not dry_run else 'Пробный импорт: изменения не записаны',
+            'diff': outcome.get('diff'),
+            'teams': teams_data,
+            'match_ingest': match_counts,
+            'matches': outcome['matches'],
+            'scorers': outcome['scorers']
+        })
     
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'error': str(e),
-                'message': 'Ошибка импорта данных из WMFL'
-            }, ensure_ascii=False),
-            'isBase64Encoded': False
-        }
+        return json_response(500, {
+            'error': str(e),
+            'message': 'Ошибка импорта данных из WMFL'
+        })
+
+def request_stats() -> Dict[str, Any]:
+    stats = {'db_pool': db_pool.snapshot(), 'fetch': fetch_stats_snapshot()}
+    if 'wmfl_http' in sys.modules:
+        stats['http'] = wmfl_http.client.snapshot()
+    return stats
+
+handler = traced_handler('wmfl-import', route, request_stats)
@@ -0,0 +1,217 @@
+'''
+Business: Загрузка календаря и результатов матчей WMFL через COPY и пересчёт статистики затронутых команд одним запросом
+Args: соединение psycopg2 (RealDictCursor), строки матчей (турнир, номер встречи, тур, дата, ключи и ID WMFL хозяев и гостей, счёт) и турниры, чью таблицу только что записал импорт
+Returns: число загруженных, изменённых и пропущенных матчей и обновлённых команд
+'''
+
+import io
+from typing import Any, Dict, List, Sequence, Tuple
+
+from wmfl_core import lock_standings
+
+FORM_LENGTH = 5
+
+STAGE_COLUMNS = (
+    'tournament_id', 'leg', 'round', 'played_at', 'home_key', 'home_wmfl_id',
+    'away_key', 'away_wmfl_id', 'home_goals', 'away_goals'
+)
+
+CREATE_STAGE_SQL = '''
+    CREATE TEMP TABLE IF NOT EXISTS wmfl_matches_stage (
+        tournament_id INTEGER NOT NULL,
+        leg SMALLINT NOT NULL,
+        round INTEGER,
+        played_at TIMESTAMP NOT NULL,
+        home_key TEXT NOT NULL,
+        home_wmfl_id INTEGER,
+        away_key TEXT NOT NULL,
+        away_wmfl_id INTEGER,
+        home_goals INTEGER,
+        away_goals INTEGER
+    ) ON COMMIT DELETE ROWS
+'''
+
+MERGE_MATCHES_SQL = '''
+    WITH teams AS (
+        SELECT t.tournament_id, t.team_id, t.team_key, t.wmfl_team_id
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.team_id IS NOT NULL
+          AND t.tournament_id IN (SELECT DISTINCT tournament_id FROM wmfl_matches_stage)
+    ),
+    by_wmfl_id AS (
+        SELECT DISTINCT ON (tournament_id, wmfl_team_id) tournament_id, wmfl_team_id, team_id
+        FROM teams WHERE wmfl_team_id IS NOT NULL
+        ORDER BY tournament_id, wmfl_team_id, team_id
+    ),
+    resolved AS (
+        SELECT s.tournament_id, s.leg, s.round, s.played_at, s.home_goals, s.away_goals,
+               COALESCE(hw.team_id, hk.team_id) AS home_team_id,
+               COALESCE(aw.team_id, ak.team_id) AS away_team_id
+        FROM wmfl_matches_stage s
+        LEFT JOIN by_wmfl_id hw ON hw.tournament_id = s.tournament_id AND hw.wmfl_team_id = s.home_wmfl_id
+        LEFT JOIN teams hk ON hk.tournament_id = s.tournament_id AND hk.team_key = s.home_key
+        LEFT JOIN by_wmfl_id aw ON aw.tournament_id = s.tournament_id AND aw.wmfl_team_id = s.away_wmfl_id
+        LEFT JOIN teams ak ON ak.tournament_id = s.tournament_id AND ak.team_key = s.away_key
+    ),
+    merged AS (
+        INSERT INTO t_p5773343_football_league_app.wmfl_matches AS m
+        (tournament_id, home_team_id, away_team_id, leg, round, played_at, home_goals, away_goals)
+        SELECT tournament_id, home_team_id, away_team_id, leg, round, played_at, home_goals, away_goals
+        FROM resolved
+        WHERE home_team_id IS NOT NULL AND away_team_id IS NOT NULL AND home_team_id <> away_team_id
+        ON CONFLICT (tournament_id, home_team_id, away_team_id, leg) WHERE leg IS NOT NULL
+        DO UPDATE SET
+            round = EXCLUDED.round,
+            played_at = EXCLUDED.played_at,
+            home_goals = EXCLUDED.home_goals,
+            away_goals = EXCLUDED.away_goals,
+            rated_at = CASE
+                WHEN (m.home_goals, m.away_goals) IS DISTINCT FROM (EXCLUDED.home_goals, EXCLUDED.away_goals) THEN NULL
+                ELSE m.rated_at
+            END,
+            result_corrected = m.result_corrected OR (
+                m.rated_at IS NOT NULL
+                AND (m.home_goals, m.away_goals) IS DISTINCT FROM (EXCLUDED.home_goals, EXCLUDED.away_goals)
+            )
+        WHERE (m.round, m.played_at, m.home_goals, m.away_goals)
+              IS DISTINCT FROM (EXCLUDED.round, EXCLUDED.played_at, EXCLUDED.home_goals, EXCLUDED.away_goals)
+        RETURNING m.tournament_id, m.home_team_id, m.away_team_id,
+                  (xmax = 0) AS inserted,
+                  (xmax <> 0 OR m.home_goals IS NOT NULL) AS affects_results
+    )
+    SELECT
+        (SELECT COUNT(*) FROM resolved) AS staged,
+        (SELECT COUNT(*) FROM resolved
+         WHERE home_team_id IS NULL OR away_team_id IS NULL OR home_team_id = away_team_id) AS unresolved,
+        COALESCE((SELECT COUNT(*) FILTER (WHERE inserted) FROM merged), 0) AS inserted,
+        COALESCE((SELECT COUNT(*) FILTER (WHERE NOT inserted) FROM merged), 0) AS updated,
+        COALESCE((
+            SELECT array_agg(DISTINCT side.tournament_id::bigint << 32 | side.team_id)
+            FROM merged
+            CROSS JOIN LATERAL (VALUES (merged.tournament_id, merged.home_team_id), (merged.tournament_id, merged.away_team_id)) AS side(tournament_id, team_id)
+            WHERE merged.affects_results
+        ), '{}') AS affected_teams
+'''
+
+# Счёт, форма и серия считаются по всем сыгранным матчам команды в турнире:
+# агрегаты, домашние/гостевые итоги, последние FORM_LENGTH результатов
+# (старые слева) и длина текущей серии одинаковых результатов. У турниров,
+# импортированных со страницы, итоги (игры, В/Н/П, мячи) ведёт таблица
+# страницы: список матчей на ней бывает неполным или шире таблицы, поэтому
+# из матчей пишутся только домашние/гостевые итоги, форма и серия.
+RECOMPUTE_TEAMS_SQL = f'''
+    WITH affected AS (
+        SELECT a.tournament_id, a.team_id,
+               a.tournament_id = ANY(%(page_tournaments)s::int[]) OR EXISTS (
+                   SELECT 1 FROM t_p5773343_football_league_app.wmfl_import_state s
+                   WHERE s.tournament_id = a.tournament_id
+               ) AS page_owned
+        FROM (
+            SELECT DISTINCT (code >> 32)::int AS tournament_id, (code & 4294967295)::int AS team_id
+            FROM unnest(%(teams)s::bigint[]) AS code
+        ) AS a
+    ),
+    sides AS (
+        SELECT m.id, m.played_at, side.*
+        FROM t_p5773343_football_league_app.wmfl_matches m
+        CROSS JOIN LATERAL (
+            VALUES (m.tournament_id, m.home_team_id, true, m.home_goals, m.away_goals),
+                   (m.tournament_id, m.away_team_id, false, m.away_goals, m.home_goals)
+        ) AS side(tournament_id, team_id, is_home, scored, conceded)
+        WHERE m.home_goals IS NOT NULL AND m.away_goals IS NOT NULL
+          AND m.tournament_id IN (SELECT tournament_id FROM affected)
+    ),
+    results AS (
+        SELECT s.tournament_id, s.team_id, s.is_home, s.scored, s.conceded, r.result,
+               ROW_NUMBER() OVER latest AS recency,
+               FIRST_VALUE(r.result) OVER latest AS last_result
+        FROM sides s
+        JOIN affected a ON a.tournament_id = s.tournament_id AND a.team_id = s.team_id
+        CROSS JOIN LATERAL (
+            SELECT CASE WHEN s.scored > s.conceded THEN 'В' WHEN s.scored = s.conceded THEN 'Н' ELSE 'П' END AS result
+        ) AS r
+        WINDOW latest AS (PARTITION BY s.tournament_id, s.team_id ORDER BY s.played_at DESC, s.id DESC)
+    ),
+    totals AS (
+        SELECT tournament_id, team_id,
+               COUNT(*) FILTER (WHERE result = 'В') AS wins,
+               COUNT(*) FILTER (WHERE result = 'Н') AS draws,
+               COUNT(*) FILTER (WHERE result = 'П') AS losses,
+               SUM(scored) AS goals_for,
+               SUM(conceded) AS goals_against,
+               COUNT(*) FILTER (WHERE is_home AND result = 'В') AS home_wins,
+               COUNT(*) FILTER (WHERE is_home AND result = 'Н') AS home_draws,
+               COUNT(*) FILTER (WHERE is_home AND result = 'П') AS home_losses,
+               COUNT(*) FILTER (WHERE NOT is_home AND result = 'В') AS away_wins,
+               COUNT(*) FILTER (WHERE NOT is_home AND result = 'Н') AS away_draws,
+               COUNT(*) FILTER (WHERE NOT is_home AND result = 'П') AS away_losses,
+               string_agg(result, '' ORDER BY recency DESC) FILTER (WHERE recency <= {FORM_LENGTH}) AS form,
+               COALESCE(MIN(recency) FILTER (WHERE result <> last_result) - 1, COUNT(*)) || MAX(last_result) AS streak
+        FROM results
+        GROUP BY tournament_id, team_id
+    ),
+    computed AS (
+        SELECT a.tournament_id, a.team_id,
+               CASE WHEN a.page_owned THEN t.wins ELSE COALESCE(x.wins, 0) END AS wins,
+               CASE WHEN a.page_owned THEN t.draws ELSE COALESCE(x.draws, 0) END AS draws,
+               CASE WHEN a.page_owned THEN t.losses ELSE COALESCE(x.losses, 0) END AS losses,
+               CASE WHEN a.page_owned THEN t.matches_played ELSE COALESCE(x.wins + x.draws + x.losses, 0) END AS matches_played,
+               CASE WHEN a.page_owned THEN t.goals_for ELSE COALESCE(x.goals_for, 0) END AS goals_for,
+               CASE WHEN a.page_owned THEN t.goals_against ELSE COALESCE(x.goals_against, 0) END AS goals_against,
+               COALESCE(x.home_wins, 0) AS home_wins, COALESCE(x.home_draws, 0) AS home_draws,
+               COALESCE(x.home_losses, 0) AS home_losses, COALESCE(x.away_wins, 0) AS away_wins,
+               COALESCE(x.away_draws, 0) AS away_draws, COALESCE(x.away_losses, 0) AS away_losses,
+               x.form, x.streak
+        FROM affected a
+        JOIN t_p5773343_football_league_app.wmfl_tournament_teams t ON t.tournament_id = a.tournament_id AND t.team_id = a.team_id
+        LEFT JOIN totals x ON x.tournament_id = a.tournament_id AND x.team_id = a.team_id
+    )
+    UPDATE t_p5773343_football_league_app.wmfl_tournament_teams AS t
+    SET wins = c.wins, draws = c.draws, losses = c.losses,
+        matches_played = c.matches_played,
+        goals_for = c.goals_for, goals_against = c.goals_against,
+        home_wins = c.home_wins, home_draws = c.home_draws, home_losses = c.home_losses,
+        away_wins = c.away_wins, away_draws = c.away_draws, away_losses = c.away_losses,
+        form = c.form, streak = c.streak,
+        updated_at = CURRENT_TIMESTAMP
+    FROM computed c
+    WHERE t.tournament_id = c.tournament_id AND t.team_id = c.team_id
+      AND (t.wins, t.draws, t.losses, t.matches_played, t.goals_for, t.goals_against,
+           t.home_wins, t.home_draws, t.home_losses, t.away_wins, t.away_draws, t.away_losses, t.form, t.streak)
+          IS DISTINCT FROM
+          (c.wins, c.draws, c.losses, c.matches_played, c.goals_for, c.goals_against,
+           c.home_wins, c.home_draws, c.home_losses, c.away_wins, c.away_draws, c.away_losses, c.form, c.streak)
+'''
+
+def copy_value(value: Any) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def copy_buffer(rows: List[Tuple]) -> io.StringIO:
+    return io.StringIO(''.join('\t'.join(copy_value(value) for value in row) + '\n' for row in rows))
+
+def ingest_matches(conn, rows: List[Tuple], page_tournaments: Sequence[int] = ()) -> Dict[str, int]:
+    if not rows:
+        return {'staged': 0, 'inserted': 0, 'updated': 0, 'unresolved': 0, 'teams_updated': 0}
+        
+    cur = conn.cursor()
+    lock_standings(cur, (row[0] for row in rows))
+    cur.execute(CREATE_STAGE_SQL)
+    cur.copy_expert(f"COPY wmfl_matches_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN", copy_buffer(rows))
+    cur.execute(MERGE_MATCHES_SQL)
+    merged = cur.fetchone()
+    
+    teams_updated = 0
+    if merged['affected_teams']:
+        cur.execute(RECOMPUTE_TEAMS_SQL, {'teams': merged['affected_teams'], 'page_tournaments': list(page_tournaments)})
+        teams_updated = cur.rowcount
+    conn.commit()
+    
+    return {
+        'staged': merged['staged'],
+        'inserted': merged['inserted'],
+        'updated': merged['updated'],
+        'unresolved': merged['unresolved'],
+        'teams_updated': teams_updated
+    }
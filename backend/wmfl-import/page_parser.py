@@ -0,0 +1,210 @@
+'''
+Business: Однопроходное извлечение таблиц страницы турнира WMFL (турнирная таблица, матчи, бомбардиры) по декларативным описаниям колонок
+Args: фрагменты HTML через feed(); tables - имена таблиц из TABLE_SPECS (по умолчанию все); разбор останавливается, когда все нужные таблицы прочитаны или закрыт <main>
+Returns: словарь списков строк в атрибуте tables (teams - строки турнирной таблицы), finished - дальше читать страницу не нужно
+'''
+
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+TEAM_LINK_PATTERN = re.compile(r'/team/(\d+)')
+PLAYER_LINK_PATTERN = re.compile(r'/player/(\d+)')
+SCORE_PATTERN = re.compile(r'^(\d+)\s*[:\-]\s*(\d+)$')
+DATE_PATTERN = re.compile(r'^(\d{2})\.(\d{2})\.(\d{4})(?:\s+(\d{2}):(\d{2}))?$')
+MIN_HEADER_MATCHES = 3
+
+def to_text(value: str) -> Optional[str]:
+    return value or None
+
+def to_int(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+def to_score(value: str) -> Tuple[Optional[int], Optional[int]]:
+    match = SCORE_PATTERN.match(value)
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+def to_datetime(value: str) -> Optional[str]:
+    match = DATE_PATTERN.match(value)
+    if not match:
+        return None
+    day, month, year, hour, minute = match.groups()
+    return f'{year}-{month}-{day}T{hour or "00"}:{minute or "00"}:00'
+
+# Колонка: заголовки, под которыми она встречается (в нижнем регистре), поле
+# строки (кортеж полей - если преобразователь возвращает несколько значений),
+# преобразователь текста ячейки и, при необходимости, поле для ID из ссылки.
+# Без <thead> колонки берутся по порядку описания.
+TABLE_SPECS: Dict[str, Dict[str, Any]] = {
+    'teams': {
+        'table_class': 'standings',
+        'row_hint': 'team',
+        'required': ('team_name',),
+        'columns': [
+            {'headers': ('#', 'м', 'место'), 'field': 'position', 'convert': to_int},
+            {'headers': ('команда',), 'field': 'team_name', 'convert': to_text, 'link': ('wmfl_team_id', TEAM_LINK_PATTERN)},
+            {'headers': ('и', 'игры'), 'field': 'games', 'convert': to_int},
+            {'headers': ('в', 'победы'), 'field': 'wins', 'convert': to_int},
+            {'headers': ('н', 'ничьи'), 'field': 'draws', 'convert': to_int},
+            {'headers': ('п', 'поражения'), 'field': 'losses', 'convert': to_int},
+            {'headers': ('мячи', 'голы'), 'field': ('goals_for', 'goals_against'), 'convert': to_score},
+            {'headers': ('о', 'очки'), 'field': 'points', 'convert': to_int}
+        ]
+    },
+    'matches': {
+        'table_class': 'matches',
+        'row_hint': 'match',
+        'required': ('home_team', 'away_team'),
+        'columns': [
+            {'headers': ('тур',), 'field': 'round', 'convert': to_int},
+            {'headers': ('дата',), 'field': 'played_at', 'convert': to_datetime},
+            {'headers': ('хозяева', 'дома'), 'field': 'home_team', 'convert': to_text, 'link': ('home_wmfl_team_id', TEAM_LINK_PATTERN)},
+            {'headers': ('счёт', 'счет'), 'field': ('home_goals', 'away_goals'), 'convert': to_score},
+            {'headers': ('гости',), 'field': 'away_team', 'convert': to_text, 'link': ('away_wmfl_team_id', TEAM_LINK_PATTERN)}
+        ]
+    },
+    'scorers': {
+        'table_class': 'scorers',
+        'row_hint': 'scorer',
+        'required': ('player_name', 'goals'),
+        'columns': [
+            {'headers': ('#', 'м', 'место'), 'field': 'position', 'convert': to_int},
+            {'headers': ('игрок',), 'field': 'player_name', 'convert': to_text, 'link': ('wmfl_player_id', PLAYER_LINK_PATTERN)},
+            {'headers': ('команда',), 'field': 'team_name', 'convert': to_text, 'link': ('wmfl_team_id', TEAM_LINK_PATTERN)},
+            {'headers': ('голы', 'г'), 'field': 'goals', 'convert': to_int},
+            {'headers': ('пен.', 'пенальти'), 'field': 'penalties', 'convert': to_int}
+        ]
+    }
+}
+
+def spec_by_headers(headers: List[str]) -> Optional[str]:
+    best, best_matches = None, MIN_HEADER_MATCHES - 1
+    for name, spec in TABLE_SPECS.items():
+        known = {header for column in spec['columns'] for header in column['headers']}
+        matches = sum(1 for header in headers if header in known)
+        if matches > best_matches:
+            best, best_matches = name, matches
+    return best
+
+def column_layout(spec: Dict[str, Any], headers: List[str]) -> List[Optional[Dict[str, Any]]]:
+    if not headers:
+        return list(spec['columns'])
+    by_header = {header: column for column in spec['columns'] for header in column['headers']}
+    layout = [by_header.get(header) for header in headers]
+    return layout if any(layout) else list(spec['columns'])
+
+class WMFLPageParser(HTMLParser):
+    def __init__(self, tables=None):
+        super().__init__()
+        self.wanted = list(tables or TABLE_SPECS)
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.wanted}
+        self.done = set()
+        self.stack = []
+        self.finished = False
+        
+    @property
+    def teams(self) -> List[Dict[str, Any]]:
+        return self.tables.get('teams', [])
+        
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+            
+        if tag == 'table':
+            classes = (dict(attrs).get('class') or '').lower().split()
+            name = next((n for n, spec in TABLE_SPECS.items() if spec['table_class'] in classes), None)
+            self.stack.append({'name': name, 'headers': [], 'layout': None, 'in_head': False, 'row': None, 'cell': None})
+            return
+        if not self.stack:
+            return
+            
+        table = self.stack[-1]
+        if tag == 'thead':
+            table['in_head'] = True
+        elif tag == 'tr':
+            table['row'] = {'attrs': attrs, 'cells': [], 'header': table['in_head']}
+            table['cell'] = None
+        elif tag in ('td', 'th') and table['row'] is not None:
+            table['cell'] = {'tag': tag, 'text': [], 'links': []}
+        elif tag == 'a' and table['cell'] is not None:
+            href = dict(attrs).get('href')
+            if href:
+                table['cell']['links'].append(href)
+                
+    def handle_data(self, data):
+        if self.stack and not self.finished:
+            cell = self.stack[-1]['cell']
+            if cell is not None:
+                text = data.strip()
+                if text:
+                    cell['text'].append(text)
+                    
+    def handle_endtag(self, tag):
+        if tag == 'main':
+            self.finished = True
+        if self.finished or not self.stack:
+            return
+            
+        table = self.stack[-1]
+        if tag in ('td', 'th') and table['cell'] is not None:
+            cell = table['cell']
+            table['row']['cells'].append((cell['tag'], ' '.join(cell['text']), cell['links']))
+            table['cell'] = None
+        elif tag == 'tr' and table['row'] is not None:
+            self.finish_row(table, table['row'])
+            table['row'] = None
+            table['cell'] = None
+        elif tag == 'thead':
+            table['in_head'] = False
+        elif tag == 'table':
+            self.stack.pop()
+            if table['name'] in self.tables:
+                self.done.add(table['name'])
+                self.finished = all(name in self.done for name in self.wanted)
+                
+    def finish_row(self, table, row):
+        cells = row['cells']
+        if not cells:
+            return
+        if row['header'] or all(cell_tag == 'th' for cell_tag, _, _ in cells):
+            if not table['headers']:
+                table['headers'] = [text.lower() for _, text, _ in cells]
+            return
+            
+        if table['name'] is None:
+            table['name'] = spec_by_headers(table['headers']) or hinted_spec(row['attrs'])
+        if table['name'] not in self.tables:
+            return
+        spec = TABLE_SPECS[table['name']]
+        if table['layout'] is None:
+            table['layout'] = column_layout(spec, table['headers'])
+            
+        record = extract_row(table['layout'], cells)
+        if all(record.get(field) is not None for field in spec['required']):
+            self.tables[table['name']].append(record)
+
+def extract_row(layout: List[Optional[Dict[str, Any]]], cells: List[Tuple[str, str, List[str]]]) -> Dict[str, Any]:
+    record: Dict[str, Any] = {}
+    for column, (_, text, links) in zip(layout, cells):
+        if column is None:
+            continue
+        value = column['convert'](text)
+        if isinstance(column['field'], tuple):
+            for field, part in zip(column['field'], value):
+                if part is not None:
+                    record[field] = part
+        elif value is not None:
+            record[column['field']] = value
+        if 'link' in column:
+            field, pattern = column['link']
+            for href in links:
+                match = pattern.search(href)
+                if match:
+                    record[field] = int(match.group(1))
+                    break
+    return record
+
+def hinted_spec(attrs) -> Optional[str]:
+    # Таблица без класса и известных заголовков: узнаём по классу строки, как раньше узнавались строки команд
+    values = [str(v).lower() for _, v in attrs]
+    return next((name for name, spec in TABLE_SPECS.items() if any(spec['row_hint'] in v for v in values)), None)
@@ -0,0 +1,402 @@
+'''
+Business: Общее ядро функций WMFL - соединения с БД, трассировка, кэш ответов и готовые HTTP-ответы
+Args: route функции и event; тяжёлые модули (psycopg2, urllib.request, html.parser) грузятся при первом обращении
+Returns: handler с Server-Timing и профилем холодного старта, ответы json_response/preflight_response
+'''
+
+import time
+
+CORE_IMPORT_STARTED = time.perf_counter()
+
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+DB_POOL_MAX_IDLE_SECONDS = float(os.environ.get('DB_POOL_MAX_IDLE_SECONDS', '300'))
+DB_POOL_PING_AFTER_SECONDS = float(os.environ.get('DB_POOL_PING_AFTER_SECONDS', '30'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '64'))
+PROFILE_COLD_START = os.environ.get('WMFL_PROFILE_COLD_START') == '1'
+
+JSON_HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+TEAM_NAME_TRANSLATION = str.maketrans('Ёё', 'Ее')
+STANDINGS_LOCK_CLASS = 5773344
+
+lazy_import_ms: Dict[str, float] = {}
+
+def load_module(name: str):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    duration_ms = (time.perf_counter() - started) * 1000
+    lazy_import_ms[name] = round(duration_ms, 1)
+    trace = current_trace.get()
+    if trace:
+        trace.add('import', duration_ms)
+    return module
+
+class LazyModule:
+    '''
+    Модуль, который импортируется при первом обращении к атрибуту. Так
+    OPTIONS и ответы из кэша не платят за psycopg2 и urllib.request.
+    '''
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = load_module(self._name)
+        return getattr(self._module, attr)
+
+psycopg2 = LazyModule('psycopg2')
+psycopg2_extras = LazyModule('psycopg2.extras')
+
+def execute_values(cur, sql, argslist, template=None, page_size=100, fetch=False):
+    return psycopg2_extras.execute_values(cur, sql, argslist, template=template, page_size=page_size, fetch=fetch)
+
+def text_response(status_code: int, body: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return {
+        'statusCode': status_code,
+        'headers': dict(JSON_HEADERS, **(headers or {})),
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+def json_response(status_code: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return text_response(status_code, json.dumps(payload, ensure_ascii=False, default=str), headers)
+
+def bad_request(message: str) -> Dict[str, Any]:
+    return json_response(400, {'error': message})
+
+def team_key(team_name: str) -> str:
+    # Совпадает с выражением, которым V0009 заполнила team_key для старых строк
+    return re.sub(r'\s+', ' ', team_name.translate(TEAM_NAME_TRANSLATION)).strip(' ').lower()
+
+def lock_standings(cur, tournament_ids) -> None:
+    # Места турнира пересчитываются при фиксации под этой же блокировкой (V0021):
+    # писатель берёт её до первой записи в строки турнира, иначе он и фиксирующая
+    # транзакция могут ждать строки друг друга
+    ids = sorted({tournament_id for tournament_id in tournament_ids if tournament_id is not None})
+    if ids:
+        cur.execute(
+            'SELECT pg_advisory_xact_lock(%s, tournament_id) FROM unnest(%s::int[]) AS tournament_id',
+            (STANDINGS_LOCK_CLASS, ids)
+        )
+
+def preflight_response(methods: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': methods,
+            'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+            'Access-Control-Max-Age': '86400'
+        },
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+METHOD_NOT_ALLOWED_RESPONSE = json_response(405, {'error': 'Method not allowed'})
+
+def get_db_connection():
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        raise Exception('DATABASE_URL not found in environment')
+    return psycopg2.connect(database_url, cursor_factory=tracing_cursor_class())
+
+class RequestTrace:
+    '''
+    Замеры одного вызова: длительность фаз, число SQL-запросов и строк.
+    Уходит в заголовок Server-Timing и в структурированную строку лога.
+    '''
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.queries = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def add(self, name: str, duration_ms: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+
+    def count_query(self, rowcount: int) -> None:
+        with self._lock:
+            self.queries += 1
+            if rowcount > 0:
+                self.rows += rowcount
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def phase_timings(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(duration, 1) for name, duration in self.phases.items()}
+
+    def server_timing(self) -> str:
+        entries = [f'{name};dur={duration}' for name, duration in self.phase_timings().items()]
+        entries.append(f'total;dur={round(self.total_ms(), 1)}')
+        return ', '.join(entries)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'total_ms': round(self.total_ms(), 1),
+            'phases': self.phase_timings(),
+            'queries': self.queries,
+            'rows': self.rows
+        }
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('current_trace', default=None)
+
+def trace_phase(name: str):
+    trace = current_trace.get()
+    return trace.phase(name) if trace else nullcontext()
+
+_tracing_cursor_class = None
+
+def tracing_cursor_class():
+    global _tracing_cursor_class
+    if _tracing_cursor_class is None:
+        class TracingCursor(psycopg2_extras.RealDictCursor):
+            def execute(self, query, vars=None):
+                trace = current_trace.get()
+                if trace is None:
+                    return super().execute(query, vars)
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    trace.add('db', (time.perf_counter() - started) * 1000)
+                    trace.count_query(self.rowcount)
+        
+        _tracing_cursor_class = TracingCursor
+    return _tracing_cursor_class
+
+def traced_handler(function_name: str, route, request_stats):
+    module_import_ms = round((time.perf_counter() - CORE_IMPORT_STARTED) * 1000, 1)
+    cold = {'pending': True}
+    
+    def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        trace = RequestTrace()
+        token = current_trace.set(trace)
+        try:
+            response = route(event, context)
+        finally:
+            current_trace.reset(token)
+        
+        server_timing = trace.server_timing()
+        log_line = {
+            'function': function_name,
+            'method': event.get('httpMethod'),
+            'status': response['statusCode']
+        }
+        log_line.update(trace.summary())
+        if cold.pop('pending', False):
+            handler_ms = round(trace.total_ms() - trace.phase_timings().get('import', 0.0), 1)
+            log_line['cold_start'] = {
+                'module_import_ms': module_import_ms,
+                'lazy_import_ms': dict(lazy_import_ms),
+                'handler_ms': handler_ms
+            }
+            if PROFILE_COLD_START:
+                server_timing += f', module_import;dur={module_import_ms}, handler;dur={handler_ms}'
+        log_line.update(request_stats())
+        print(json.dumps(log_line, ensure_ascii=False))
+        
+        return dict(response, headers=dict(response.get('headers') or {}, **{
+            'Server-Timing': server_timing,
+            'Timing-Allow-Origin': '*'
+        }))
+    
+    return handler
+
+class ConnectionPool:
+    '''
+    Пул соединений уровня модуля: переживает тёплые вызовы функции,
+    поэтому TCP/TLS/auth рукопожатие платится только при промахе.
+    '''
+    def __init__(self, connect, max_size: int, max_idle_seconds: float, ping_after_seconds: float):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.ping_after_seconds = ping_after_seconds
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        self.stats = {'reused': 0, 'created': 0, 'evicted': 0, 'broken': 0}
+
+    def acquire(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self.stats['created'] += 1
+                    break
+                conn, released_at = self._idle.pop()
+            idle_for = now - released_at
+            if idle_for > self.max_idle_seconds:
+                self._discard(conn, 'evicted')
+                continue
+            if self._is_healthy(conn, ping=idle_for > self.ping_after_seconds):
+                with self._lock:
+                    self.stats['reused'] += 1
+                return conn
+            self._discard(conn, 'broken')
+        return self.connect()
+
+    def release(self, conn) -> None:
+        if conn.closed:
+            with self._lock:
+                self.stats['broken'] += 1
+            return
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn, 'broken')
+            return
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._discard(conn, 'evicted')
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['idle'] = len(self._idle)
+        total = stats['reused'] + stats['created']
+        stats['hit_rate'] = round(stats['reused'] / total, 3) if total else 0.0
+        return stats
+
+    def _is_healthy(self, conn, ping: bool) -> bool:
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if not ping:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn, reason: str) -> None:
+        with self._lock:
+            self.stats[reason] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+db_pool = ConnectionPool(get_db_connection, DB_POOL_MAX_SIZE, DB_POOL_MAX_IDLE_SECONDS, DB_POOL_PING_AFTER_SECONDS)
+
+class ResponseCache:
+    '''
+    LRU сериализованных ответов GET внутри тёплого контейнера. Запись
+    валидна, пока совпадает версия данных, поэтому изменения из других
+    контейнеров и функций не отдаются устаревшими.
+    '''
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[str, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+    def get(self, key: str, version: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key: str, version: str, body: str) -> None:
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.stats['not_modified'] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats['invalidations'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES)
+
+def request_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def cached_response(event: Dict[str, Any], params: Dict[str, Any], version: str, build, extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    key = json.dumps(params, sort_keys=True)
+    etag = 'W/"' + hashlib.sha1(f'{key}|{version}'.encode('utf-8')).hexdigest() + '"'
+    cache_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': ', '.join(['ETag', 'X-Cache'] + list(extra_headers or {})),
+        'Cache-Control': 'no-cache',
+        'ETag': etag
+    }
+    cache_headers.update(extra_headers or {})
+    
+    if request_header(event, 'If-None-Match') == etag:
+        response_cache.count_not_modified()
+        return {
+            'statusCode': 304,
+            'headers': cache_headers,
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    body = response_cache.get(key, version)
+    cache_status = 'HIT'
+    if body is None:
+        response = build()
+        if response['statusCode'] != 200:
+            return response
+        body = response['body']
+        response_cache.put(key, version, body)
+        cache_status = 'MISS'
+    
+    return {
+        'statusCode': 200,
+        'headers': dict(cache_headers, **{'Content-Type': 'application/json', 'X-Cache': cache_status}),
+        'body': body,
+        'isBase64Encoded': False
+    }
@@ -0,0 +1,354 @@
+'''
+Business: Исходящий HTTP-клиент wmfl.ru - keep-alive соединения переживают страницы и тёплые вызовы, тело приходит в gzip/deflate, частота запросов ограничена ведром токенов, 5xx и таймауты повторяются с джиттером
+Args: базовый URL (WMFL_BASE_URL, для локального стаба - http://127.0.0.1:порт), путь и заголовки GET, таймаут и дедлайн по time.monotonic()
+Returns: потоковый ответ (status, headers, read) с распакованным телом и статистикой запроса; общая статистика клиента в snapshot()
+'''
+
+import http.client
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+WMFL_BASE_URL = os.environ.get('WMFL_BASE_URL', 'https://wmfl.ru')
+MAX_IDLE_CONNECTIONS = int(os.environ.get('WMFL_MAX_CONCURRENCY_PER_HOST', '4'))
+KEEPALIVE_IDLE_SECONDS = float(os.environ.get('WMFL_KEEPALIVE_IDLE_SECONDS', '30'))
+RATE_PER_SECOND = float(os.environ.get('WMFL_RATE_PER_SECOND', '5'))
+RATE_BURST = int(os.environ.get('WMFL_RATE_BURST', '4'))
+MAX_RETRIES = int(os.environ.get('WMFL_MAX_RETRIES', '2'))
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 4.0
+READ_SIZE = 16384
+DRAIN_LIMIT_BYTES = 65536
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+# Оборванное сервером простаивающее соединение: запрос повторяется на новом
+# соединении сразу, без паузы и без траты попытки.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+class TokenBucket:
+    '''
+    Ведро токенов на хост: burst запросов сразу, дальше rate в секунду.
+    Токен резервируется под замком, ждут вне замка, поэтому потоки
+    получают слоты по очереди. rate <= 0 выключает ограничение.
+    '''
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                raise Exception('Rate limit wait exceeds the time budget')
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+def body_decoder(content_encoding: Optional[str]):
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return DeflateDecoder()
+    if encoding in ('', 'identity'):
+        return None
+    raise Exception(f'Unsupported Content-Encoding: {encoding}')
+
+class DeflateDecoder:
+    '''
+    deflate по RFC должен идти с заголовком zlib, но часть серверов шлёт
+    «сырой» поток - формат определяется по первому блоку.
+    '''
+    def __init__(self):
+        self._decoder = None
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._decoder is None:
+            self._decoder = zlib.decompressobj()
+            try:
+                return self._decoder.decompress(data)
+            except zlib.error:
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decoder.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._decoder.flush() if self._decoder is not None else b''
+
+class WMFLResponse:
+    '''
+    Ответ в виде потока для parse_standings_stream: read() отдаёт уже
+    распакованные байты. close() возвращает соединение в пул, если тело
+    дочитано (или короткий хвост удалось дочитать), иначе закрывает его.
+    '''
+    def __init__(self, client: 'WMFLClient', conn, sock, response, stats: Dict[str, Any], started: float, deadline: Optional[float] = None):
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.stats = stats
+        self._client = client
+        self._conn = conn
+        self._sock = sock
+        self._timeout = conn.timeout
+        self._response = response
+        self._started = started
+        self._deadline = deadline
+        self._decoder = body_decoder(response.headers.get('Content-Encoding'))
+        self._buffer = b''
+        self._eof = False
+        self._broken = False
+        self._closed = False
+        self._wire_bytes = 0
+        self._body_bytes = 0
+        stats['encoding'] = (response.headers.get('Content-Encoding') or 'identity').lower()
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                if not self.limit_read_timeout():
+                    raise TimeoutError('Time budget exceeded while reading the response')
+                # read1 возвращается после одного recv; read(n) копил бы n байт сколь угодно долго
+                raw = self._response.read1(READ_SIZE)
+            except (OSError, http.client.HTTPException):
+                self._broken = True
+                raise
+            self._wire_bytes += len(raw)
+            if not raw:
+                self._eof = True
+                if self._decoder is not None:
+                    self._buffer += self._decoder.flush()
+                break
+            self._buffer += self._decoder.decompress(raw) if self._decoder is not None else raw
+        if size < 0 or size >= len(self._buffer):
+            chunk, self._buffer = self._buffer, b''
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._body_bytes += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        reusable = not self._broken and not self._response.will_close
+        if reusable and not self.body_read():
+            try:
+                drained = 0
+                while drained < DRAIN_LIMIT_BYTES and self.limit_read_timeout():
+                    raw = self._response.read1(DRAIN_LIMIT_BYTES - drained)
+                    if not raw:
+                        break
+                    drained += len(raw)
+                self._wire_bytes += drained
+            except (OSError, http.client.HTTPException):
+                reusable = False
+            reusable = reusable and self.body_read()
+        self._response.close()
+        self.stats['wire_bytes'] += self._wire_bytes
+        self.stats['body_bytes'] += self._body_bytes
+        self.stats['total_ms'] = round((time.perf_counter() - self._started) * 1000, 3)
+        self._client.finish(self._conn, self._wire_bytes, self._body_bytes, reusable)
+
+    def body_read(self) -> bool:
+        # read1 не закрывает ответ на последнем байте Content-Length, в отличие от read
+        return self._response.isclosed() or self._response.length == 0
+
+    def limit_read_timeout(self) -> bool:
+        # Таймаут сокета - на одно чтение, поэтому перед каждым он урезается до
+        # остатка дедлайна: медленное тело не держит поток загрузки дольше бюджета
+        if self._deadline is None:
+            return True
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        self._sock.settimeout(min(self._timeout, remaining))
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class WMFLClient:
+    '''
+    Клиент одного origin: простаивающие соединения лежат в пуле уровня
+    модуля и переживают тёплые вызовы функции, поэтому TCP/TLS-рукопожатие
+    платится только при промахе. Соединение, простоявшее дольше
+    keepalive_idle_seconds, закрывается - сервер, скорее всего, уже закрыл
+    его со своей стороны.
+    '''
+    def __init__(
+        self,
+        base_url: str,
+        max_idle: int = MAX_IDLE_CONNECTIONS,
+        keepalive_idle_seconds: float = KEEPALIVE_IDLE_SECONDS,
+        rate_per_second: float = RATE_PER_SECOND,
+        rate_burst: int = RATE_BURST,
+        max_retries: int = MAX_RETRIES,
+        backoff_base_seconds: float = BACKOFF_BASE_SECONDS,
+        backoff_max_seconds: float = BACKOFF_MAX_SECONDS
+    ):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname or ''
+        self.port = parts.port
+        self.max_idle = max_idle
+        self.keepalive_idle_seconds = keepalive_idle_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.bucket = TokenBucket(rate_per_second, rate_burst)
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0, 'retries': 0, 'stale_reconnects': 0, 'failures': 0,
+            'connections_created': 0, 'connections_reused': 0,
+            'wire_bytes': 0, 'body_bytes': 0, 'rate_wait_ms': 0.0
+        }
+
+    def get(self, path: str, headers: Optional[Dict[str, str]] = None, timeout: float = 15.0, deadline: Optional[float] = None) -> WMFLResponse:
+        request_headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        stats = {
+            'path': path, 'status': None, 'attempts': 0, 'reused_connection': False,
+            'rate_wait_ms': 0.0, 'connect_ms': 0.0, 'ttfb_ms': 0.0, 'total_ms': 0.0,
+            'wire_bytes': 0, 'body_bytes': 0, 'encoding': None
+        }
+        started = time.perf_counter()
+        stale_retry_left = True
+
+        while True:
+            stats['attempts'] += 1
+            waited_ms = self.bucket.acquire(deadline) * 1000
+            stats['rate_wait_ms'] = round(stats['rate_wait_ms'] + waited_ms, 3)
+            with self._lock:
+                self.stats['rate_wait_ms'] += waited_ms
+            conn, reused = self.acquire(self.request_timeout(timeout, deadline))
+            stats['reused_connection'] = reused
+            try:
+                if conn.sock is None:
+                    connect_started = time.perf_counter()
+                    conn.connect()
+                    stats['connect_ms'] = round((time.perf_counter() - connect_started) * 1000, 3)
+                request_started = time.perf_counter()
+                conn.request('GET', path, headers=request_headers)
+                # getresponse() с Connection: close отдаёт сокет ответу и обнуляет conn.sock
+                sock = conn.sock
+                response = conn.getresponse()
+                stats['ttfb_ms'] = round((time.perf_counter() - request_started) * 1000, 3)
+            except STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if reused and stale_retry_left:
+                    stale_retry_left = False
+                    stats['attempts'] -= 1
+                    self.count('stale_reconnects')
+                    self.clear_idle()
+                    continue
+                self.retry_or_raise(stats, deadline, e)
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self.retry_or_raise(stats, deadline, e)
+                continue
+
+            stats['status'] = response.status
+            if response.status in RETRY_STATUSES and stats['attempts'] <= self.max_retries:
+                WMFLResponse(self, conn, sock, response, stats, started, deadline).close()
+                self.retry_or_raise(stats, deadline, Exception(f'HTTP Error {response.status}: {response.reason}'), retry_after=response.headers.get('Retry-After'))
+                continue
+            return WMFLResponse(self, conn, sock, response, stats, started, deadline)
+
+    def request_timeout(self, timeout: float, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Exception('Time budget exceeded before the request')
+        return min(timeout, remaining)
+
+    def retry_or_raise(self, stats: Dict[str, Any], deadline: Optional[float], error: Exception, retry_after: Optional[str] = None) -> None:
+        attempt = stats['attempts']
+        if attempt > self.max_retries:
+            self.count('failures')
+            raise error
+        # Полный джиттер: случайная пауза до экспоненциального потолка, чтобы
+        # параллельные загрузки не повторяли запросы одновременно
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1)))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self.count('failures')
+            raise error
+        self.count('retries')
+        time.sleep(delay)
+
+    def acquire(self, timeout: float) -> Tuple[Any, bool]:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self.stats['connections_created'] += 1
+                    break
+                conn, released_at = self._idle.pop()
+            if now - released_at > self.keepalive_idle_seconds or conn.sock is None:
+                conn.close()
+                continue
+            conn.timeout = timeout
+            conn.sock.settimeout(timeout)
+            with self._lock:
+                self.stats['connections_reused'] += 1
+            return conn, True
+
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout), False
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout), False
+
+    def finish(self, conn, wire_bytes: int, body_bytes: int, reusable: bool) -> None:
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['wire_bytes'] += wire_bytes
+            self.stats['body_bytes'] += body_bytes
+            if reusable and len(self._idle) < self.max_idle:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def clear_idle(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['idle'] = len(self._idle)
+        connections = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_rate'] = round(stats['connections_reused'] / connections, 3) if connections else 0.0
+        stats['compression_ratio'] = round(stats['body_bytes'] / stats['wire_bytes'], 2) if stats['wire_bytes'] else 0.0
+        stats['rate_wait_ms'] = round(stats['rate_wait_ms'], 1)
+        return stats
+
+client = WMFLClient(WMFL_BASE_URL)
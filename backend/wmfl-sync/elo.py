@@ -0,0 +1,105 @@
+'''
+Business: Рейтинг Эло команд WMFL по результатам отдельных матчей
+Args: матчи как (home_key, away_key, home_goals, away_goals) в порядке игры
+Returns: словарь рейтингов по ключу команды
+'''
+
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0
+
+Match = Tuple[Hashable, Hashable, int, int]
+
+def goal_multiplier(goal_diff: int) -> float:
+    goal_diff = abs(goal_diff)
+    if goal_diff <= 1:
+        return 1.0
+    if goal_diff == 2:
+        return 1.5
+    return (11.0 + goal_diff) / 8.0
+
+def rate_match(home_rating: float, away_rating: float, home_goals: int, away_goals: int) -> Tuple[float, float]:
+    expected_home = 1.0 / (1.0 + 10.0 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400.0))
+    if home_goals > away_goals:
+        score = 1.0
+    elif home_goals == away_goals:
+        score = 0.5
+    else:
+        score = 0.0
+    delta = K_FACTOR * goal_multiplier(home_goals - away_goals) * (score - expected_home)
+    return home_rating + delta, away_rating - delta
+
+def apply_matches(ratings: Dict[Hashable, float], matches: Iterable[Match]) -> Dict[Hashable, float]:
+    for home, away, home_goals, away_goals in matches:
+        ratings[home], ratings[away] = rate_match(
+            ratings.get(home, INITIAL_RATING),
+            ratings.get(away, INITIAL_RATING),
+            home_goals,
+            away_goals
+        )
+    return ratings
+
+def schedule_waves(home_idx: Sequence[int], away_idx: Sequence[int], team_count: int) -> List[int]:
+    last_wave = [-1] * team_count
+    waves = []
+    for home, away in zip(home_idx, away_idx):
+        wave = max(last_wave[home], last_wave[away]) + 1
+        last_wave[home] = last_wave[away] = wave
+        waves.append(wave)
+    return waves
+
+def recompute_ratings(matches: Sequence[Match], initial: Dict[Hashable, float] = None) -> Dict[Hashable, float]:
+    import numpy as np
+    
+    keys: Dict[Hashable, int] = {}
+    home_idx = [keys.setdefault(match[0], len(keys)) for match in matches]
+    away_idx = [keys.setdefault(match[1], len(keys)) for match in matches]
+    for key in (initial or {}):
+        keys.setdefault(key, len(keys))
+    
+    ratings = np.full(len(keys), INITIAL_RATING)
+    for key, rating in (initial or {}).items():
+        ratings[keys[key]] = rating
+    
+    recompute_ratings_indexed(
+        np.asarray(home_idx, dtype=np.int64),
+        np.asarray(away_idx, dtype=np.int64),
+        np.asarray([match[2] for match in matches], dtype=np.int64),
+        np.asarray([match[3] for match in matches], dtype=np.int64),
+        ratings
+    )
+    return {key: float(ratings[index]) for key, index in keys.items()}
+
+def recompute_ratings_indexed(home, away, home_goals, away_goals, ratings):
+    '''
+    Пересчёт с нуля для целых сезонов или многих турниров сразу. Команды
+    заданы плотными индексами в массив ratings, который меняется на месте.
+    Матчи раскладываются на волны, где каждая команда встречается не больше
+    одного раза, и каждая волна считается векторно; порядок матчей каждой
+    команды сохраняется, поэтому результат совпадает с apply_matches.
+    '''
+    import numpy as np
+    
+    if len(home) == 0:
+        return ratings
+    
+    goal_diff = home_goals - away_goals
+    score = np.where(goal_diff > 0, 1.0, np.where(goal_diff == 0, 0.5, 0.0))
+    abs_diff = np.abs(goal_diff)
+    multiplier = np.where(abs_diff <= 1, 1.0, np.where(abs_diff == 2, 1.5, (11.0 + abs_diff) / 8.0))
+    
+    waves = np.asarray(schedule_waves(home.tolist(), away.tolist(), len(ratings)))
+    order = np.argsort(waves, kind='stable')
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+    
+    for wave in np.split(order, bounds):
+        h = home[wave]
+        a = away[wave]
+        expected_home = 1.0 / (1.0 + 10.0 ** ((ratings[a] - ratings[h] - HOME_ADVANTAGE) / 400.0))
+        delta = K_FACTOR * multiplier[wave] * (score[wave] - expected_home)
+        ratings[h] += delta
+        ratings[a] -= delta
+    
+    return ratings
@@ -1,121 +1,644 @@
 '''
 Business: Автоматическая синхронизация команд турнира WMFL - периодическое обновление данных
-Args: event - dict with httpMethod, body (tournament_id, auto_sync settings)
+Args: event - dict with httpMethod, body (tournament_id, recompute_ratings, time_budget_seconds, maintain_log), queryStringParameters (tournament_id, status, run_type, limit, cursor, rollup)
       context - object with attributes: request_id, function_name
 Returns: HTTP response with sync status
 '''
 
+import base64
 import json
 import os
-from typing import Dict, Any, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime
-
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception('DATABASE_URL not found in environment')
-    return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-
-def get_tournaments_for_sync(conn) -> List[Dict[str, Any]]:
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from wmfl_core import (
+    METHOD_NOT_ALLOWED_RESPONSE, bad_request, cached_response, current_trace, db_pool,
+    execute_values, json_response, lock_standings, preflight_response, psycopg2, response_cache,
+    trace_phase, traced_handler
+)
+import elo
+import standings_history
+
+def sync_log_version(conn) -> str:
     cur = conn.cursor()
     cur.execute('''
-        SELECT DISTINCT tournament_id, season
-        FROM t_p5773343_football_league_app.wmfl_tournament_teams
-        WHERE is_active = true
-        GROUP BY tournament_id, season
+        SELECT MAX(id) AS last_id FROM t_p5773343_football_league_app.wmfl_sync_log
     ''')
-    return [dict(row) for row in cur.fetchall()]
+    return str(cur.fetchone()['last_id'])
 
-def update_sync_status(conn, tournament_id: int, status: str, message: str, teams_updated: int = 0):
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', '90'))
+SYNC_LOG_MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get('SYNC_LOG_MAINTENANCE_INTERVAL_SECONDS', '3600'))
+SYNC_LOG_PARTITION_PREFIX = 'wmfl_sync_log_p'
+LOG_STATUSES = ('success', 'error', 'warning')
+LOG_RUN_TYPES = ('sync', 'import')
+ROLLUP_GRANULARITIES = ('hour', 'day')
+DEFAULT_LOG_PAGE_SIZE = 50
+MAX_LOG_PAGE_SIZE = 200
+
+_log_maintenance = {'last_run': 0.0}
+_log_maintenance_lock = threading.Lock()
+
+def encode_log_cursor(row: Dict[str, Any]) -> str:
+    key = [row['sync_time'].isoformat(), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, int]:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[0], str) or not isinstance(key[1], int):
+        raise ValueError('Invalid cursor')
+    return datetime.fromisoformat(key[0]), key[1]
+
+def list_sync_logs(conn, params: Dict[str, Any]) -> Dict[str, Any]:
+    if params.get('rollup'):
+        return list_sync_log_rollups(conn, params)
+    
+    conditions = ['TRUE']
+    values: List[Any] = []
+    
+    if params.get('tournament_id'):
+        if not params['tournament_id'].isdigit():
+            return bad_request('tournament_id must be an integer')
+        conditions.append('tournament_id = %s')
+        values.append(int(params['tournament_id']))
+    if params.get('status'):
+        if params['status'] not in LOG_STATUSES:
+            return bad_request(f"status must be one of: {', '.join(LOG_STATUSES)}")
+        conditions.append('status = %s')
+        values.append(params['status'])
+    if params.get('run_type'):
+        if params['run_type'] not in LOG_RUN_TYPES:
+            return bad_request(f"run_type must be one of: {', '.join(LOG_RUN_TYPES)}")
+        conditions.append('run_type = %s')
+        values.append(params['run_type'])
+    if params.get('cursor'):
+        try:
+            sync_time, log_id = decode_log_cursor(params['cursor'])
+        except (ValueError, TypeError):
+            return bad_request('Invalid cursor')
+        conditions.append('(sync_time, id) < (%s, %s)')
+        values.extend([sync_time, log_id])
+    
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LOG_PAGE_SIZE)), 1), MAX_LOG_PAGE_SIZE)
+    except ValueError:
+        return bad_request('limit must be an integer')
+    
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT * FROM t_p5773343_football_league_app.wmfl_sync_log
+        WHERE {' AND '.join(conditions)}
+        ORDER BY sync_time DESC, id DESC
+        LIMIT %s
+    ''', values + [limit + 1])
+    logs = [dict(row) for row in cur.fetchall()]
+    
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_log_cursor(logs[-1])
+    
+    return json_response(200, {'logs': logs, 'next_cursor': next_cursor})
+
+def list_sync_log_rollups(conn, params: Dict[str, Any]) -> Dict[str, Any]:
+    granularity = params['rollup']
+    if granularity not in ROLLUP_GRANULARITIES:
+        return bad_request(f"rollup must be one of: {', '.join(ROLLUP_GRANULARITIES)}")
+    
+    conditions = ['granularity = %s']
+    values: List[Any] = [granularity]
+    if params.get('tournament_id'):
+        if not params['tournament_id'].isdigit():
+            return bad_request('tournament_id must be an integer')
+        conditions.append('tournament_id = %s')
+        values.append(int(params['tournament_id']))
+    if params.get('run_type'):
+        if params['run_type'] not in LOG_RUN_TYPES:
+            return bad_request(f"run_type must be one of: {', '.join(LOG_RUN_TYPES)}")
+        conditions.append('run_type = %s')
+        values.append(params['run_type'])
+    
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LOG_PAGE_SIZE)), 1), MAX_LOG_PAGE_SIZE)
+    except ValueError:
+        return bad_request('limit must be an integer')
+    
     cur = conn.cursor()
+    cur.execute(f'''
+        SELECT bucket_start, tournament_id, run_type, runs, success_count, error_count, teams_updated,
+               ROUND(success_count::numeric / NULLIF(runs, 0), 3)::float8 AS success_rate,
+               ROUND(total_duration_ms::numeric / NULLIF(runs, 0))::integer AS avg_duration_ms
+        FROM t_p5773343_football_league_app.wmfl_sync_log_rollup
+        WHERE {' AND '.join(conditions)}
+        ORDER BY bucket_start DESC, tournament_id, run_type
+        LIMIT %s
+    ''', values + [limit])
+    rollups = [dict(row) for row in cur.fetchall()]
     
+    return json_response(200, {'granularity': granularity, 'rollups': rollups})
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def list_log_partitions(cur) -> Dict[str, date]:
+    cur.execute('''
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 't_p5773343_football_league_app.wmfl_sync_log'::regclass
+    ''')
+    partitions = {}
+    for row in cur.fetchall():
+        suffix = row['name'][len(SYNC_LOG_PARTITION_PREFIX):]
+        if row['name'].startswith(SYNC_LOG_PARTITION_PREFIX) and suffix.isdigit() and len(suffix) == 6:
+            partitions[row['name']] = date(int(suffix[:4]), int(suffix[4:]), 1)
+    return partitions
+
+def ensure_log_partitions(conn, partitions: Dict[str, date], today: date) -> List[str]:
+    created = []
+    cur = conn.cursor()
+    for start in (month_start(today), next_month(today)):
+        name = f"{SYNC_LOG_PARTITION_PREFIX}{start.strftime('%Y%m')}"
+        if name in partitions:
+            continue
+        try:
+            cur.execute(f'''
+                CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.{name}
+                PARTITION OF t_p5773343_football_league_app.wmfl_sync_log
+                FOR VALUES FROM (%s) TO (%s)
+            ''', (start, next_month(start)))
+            conn.commit()
+            created.append(name)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Failed to create sync log partition {name}: {str(e)}")
+    return created
+
+def roll_up_sync_log(conn) -> int:
+    cur = conn.cursor()
     cur.execute('''
+        INSERT INTO t_p5773343_football_league_app.wmfl_sync_log_rollup
+        (granularity, bucket_start, tournament_id, run_type, runs, success_count, 
+         error_count, teams_updated, total_duration_ms)
+        SELECT g.granularity, date_trunc(g.granularity, l.sync_time), l.tournament_id, l.run_type,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE l.status = 'success'),
+               COUNT(*) FILTER (WHERE l.status = 'error'),
+               COALESCE(SUM(l.teams_updated), 0),
+               SUM(l.duration_ms)
+        FROM t_p5773343_football_league_app.wmfl_sync_log l
+        CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+        WHERE l.sync_time >= COALESCE((
+            SELECT MAX(bucket_start) FROM t_p5773343_football_league_app.wmfl_sync_log_rollup
+            WHERE granularity = 'day'
+        ), '-infinity')
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (granularity, bucket_start, tournament_id, run_type)
+        DO UPDATE SET
+            runs = EXCLUDED.runs,
+            success_count = EXCLUDED.success_count,
+            error_count = EXCLUDED.error_count,
+            teams_updated = EXCLUDED.teams_updated,
+            total_duration_ms = EXCLUDED.total_duration_ms,
+            updated_at = CURRENT_TIMESTAMP
+    ''')
+    rolled_up = cur.rowcount
+    conn.commit()
+    return rolled_up
+
+def drop_expired_log_data(conn, partitions: Dict[str, date], cutoff: datetime) -> Dict[str, Any]:
+    cur = conn.cursor()
+    dropped = [name for name, start in partitions.items() if next_month(start) <= cutoff.date()]
+    for name in dropped:
+        cur.execute(f'DROP TABLE IF EXISTS t_p5773343_football_league_app.{name}')
+    
+    cur.execute('''
+        DELETE FROM t_p5773343_football_league_app.wmfl_sync_log_default WHERE sync_time < %s
+    ''', (cutoff,))
+    rows_deleted = cur.rowcount
+    cur.execute('''
+        DELETE FROM t_p5773343_football_league_app.wmfl_sync_log_rollup
+        WHERE granularity = 'hour' AND bucket_start < %s
+    ''', (cutoff,))
+    conn.commit()
+    return {'partitions_dropped': sorted(dropped), 'rows_deleted': rows_deleted}
+
+def compact_rating_buckets(conn) -> int:
+    cur = conn.cursor()
+    cur.execute('SELECT t_p5773343_football_league_app.wmfl_compact_rating_buckets() AS folded')
+    folded = cur.fetchone()['folded']
+    conn.commit()
+    return folded
+
+def maintain_sync_log(conn, force: bool = False) -> Optional[Dict[str, Any]]:
+    with _log_maintenance_lock:
+        if not force and time.monotonic() - _log_maintenance['last_run'] < SYNC_LOG_MAINTENANCE_INTERVAL_SECONDS:
+            return None
+        _log_maintenance['last_run'] = time.monotonic()
+    
+    now = datetime.now()
+    try:
+        cur = conn.cursor()
+        partitions = list_log_partitions(cur)
+        conn.commit()
+        
+        result = {'partitions_created': ensure_log_partitions(conn, partitions, now.date())}
+        result['rollup_rows'] = roll_up_sync_log(conn)
+        result.update(drop_expired_log_data(conn, partitions, now - timedelta(days=SYNC_LOG_RETENTION_DAYS)))
+        result['rating_buckets_folded'] = compact_rating_buckets(conn)
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Sync log maintenance failed: {str(e)}")
+        return None
+    
+    response_cache.invalidate()
+    return result
+
+def update_sync_status(conn, tournament_id: int, status: str, message: str, teams_updated: int = 0):
+    update_sync_statuses(conn, [(tournament_id, status, message, teams_updated)])
+
+def update_sync_statuses(conn, entries: List[Tuple[int, str, str, int]]):
+    if not entries:
+        return
+    
+    trace = current_trace.get()
+    duration_ms = round(trace.total_ms()) if trace else None
+    phase_timings = json.dumps(trace.phase_timings()) if trace else None
+    cur = conn.cursor()
+    
+    execute_values(cur, '''
         INSERT INTO t_p5773343_football_league_app.wmfl_sync_log 
-        (tournament_id, status, message, teams_updated)
-        VALUES (%s, %s, %s, %s)
-    ''', (tournament_id, status, message, teams_updated))
+        (tournament_id, status, message, teams_updated, run_type, duration_ms, phase_timings)
+        VALUES %s
+    ''', [entry + (duration_ms, phase_timings) for entry in entries],
+        template="(%s, %s, %s, %s, 'sync', %s, %s)", page_size=len(entries))
     
     conn.commit()
+    response_cache.invalidate()
 
-def sync_tournament_data(conn, tournament_id: int) -> Dict[str, Any]:
+def recalculate_positions(conn, tournament_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
     cur = conn.cursor()
+    if tournament_ids is not None:
+        lock_standings(cur, tournament_ids)
     
     cur.execute('''
-        SELECT team_id, team_name, rating, wins, draws, losses, 
-               goals_for, goals_against, points, position
+        SELECT tournament_id, teams_count, teams_updated
+        FROM t_p5773343_football_league_app.wmfl_rank_standings(%s::int[])
+    ''', (tournament_ids,))
+    
+    results = [
+        {
+            'tournament_id': row['tournament_id'],
+            'teams_count': row['teams_count'],
+            'teams_updated': row['teams_updated'],
+            'status': 'success'
+        }
+        for row in cur.fetchall()
+    ]
+    
+    conn.commit()
+    return results
+
+def recompute_match_ratings(matches: List[Dict[str, Any]]) -> Dict[Tuple[int, int], float]:
+    import numpy as np
+    
+    tournaments = np.fromiter((match['tournament_id'] for match in matches), dtype=np.int64, count=len(matches))
+    home_teams = np.fromiter((match['home_team_id'] for match in matches), dtype=np.int64, count=len(matches))
+    away_teams = np.fromiter((match['away_team_id'] for match in matches), dtype=np.int64, count=len(matches))
+    codes, dense = np.unique(
+        np.concatenate([(tournaments << 32) | home_teams, (tournaments << 32) | away_teams]),
+        return_inverse=True
+    )
+    ratings = np.full(len(codes), elo.INITIAL_RATING)
+    elo.recompute_ratings_indexed(
+        dense[:len(matches)],
+        dense[len(matches):],
+        np.fromiter((match['home_goals'] for match in matches), dtype=np.int64, count=len(matches)),
+        np.fromiter((match['away_goals'] for match in matches), dtype=np.int64, count=len(matches)),
+        ratings
+    )
+    return {(int(code >> 32), int(code & 0xFFFFFFFF)): float(rating) for code, rating in zip(codes, ratings)}
+
+# Эло зависит от порядка матчей, поэтому турнир пересчитывается целиком, если в нём
+# изменён счёт уже учтённого матча или новый результат лёг раньше учтённых матчей:
+# доложить такой матч поверх elo_rating нельзя, старый результат уже внутри
+STALE_TOURNAMENTS_SQL = '''
+    SELECT tournament_id
+    FROM t_p5773343_football_league_app.wmfl_matches
+    WHERE result_corrected
+      AND (%(only)s::int[] IS NULL OR tournament_id = ANY(%(only)s::int[]))
+    UNION
+    SELECT u.tournament_id
+    FROM t_p5773343_football_league_app.wmfl_matches u
+    WHERE u.rated_at IS NULL AND u.home_goals IS NOT NULL AND u.away_goals IS NOT NULL
+      AND (%(only)s::int[] IS NULL OR u.tournament_id = ANY(%(only)s::int[]))
+      AND EXISTS (
+          SELECT 1 FROM t_p5773343_football_league_app.wmfl_matches r
+          WHERE r.tournament_id = u.tournament_id
+            AND r.rated_at IS NOT NULL
+            AND (r.played_at, r.id) > (u.played_at, u.id)
+      )
+'''
+
+def select_scored_matches(cur, conditions: List[str], values: List[Any]) -> List[Dict[str, Any]]:
+    conditions = ['home_goals IS NOT NULL', 'away_goals IS NOT NULL'] + conditions
+    cur.execute(f'''
+        SELECT id, tournament_id, home_team_id, away_team_id, home_goals, away_goals
+        FROM t_p5773343_football_league_app.wmfl_matches
+        WHERE {' AND '.join(conditions)}
+        ORDER BY played_at, id
+    ''', values)
+    return cur.fetchall()
+
+def continue_match_ratings(cur, matches: List[Dict[str, Any]]) -> Dict[Tuple[int, int], float]:
+    keyed_matches = [
+        (
+            (match['tournament_id'], match['home_team_id']),
+            (match['tournament_id'], match['away_team_id']),
+            match['home_goals'],
+            match['away_goals']
+        )
+        for match in matches
+    ]
+    keys = {key for match in keyed_matches for key in match[:2]}
+    # Продолжение от точного elo_rating: округлённый rating копил бы ошибку с каждым запуском;
+    # команды без elo_rating (рейтинг по очкам из импорта) начинают с INITIAL_RATING
+    cur.execute('''
+        SELECT tournament_id, team_id, elo_rating
         FROM t_p5773343_football_league_app.wmfl_tournament_teams
-        WHERE tournament_id = %s AND is_active = true
-        ORDER BY points DESC, goal_difference DESC
-    ''', (tournament_id,))
+        WHERE (tournament_id, team_id) IN (
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        ) AND elo_rating IS NOT NULL
+    ''', ([key[0] for key in keys], [key[1] for key in keys]))
+    current = {(row['tournament_id'], row['team_id']): row['elo_rating'] for row in cur.fetchall()}
+    return elo.apply_matches(current, keyed_matches)
+
+def update_ratings(conn, tournament_ids: Optional[List[int]] = None, recompute: bool = False) -> Dict[str, int]:
+    cur = conn.cursor()
+    scope: List[str] = []
+    scope_values: List[Any] = []
+    if tournament_ids is not None:
+        scope.append('tournament_id = ANY(%s)')
+        scope_values.append(tournament_ids)
     
-    teams = [dict(row) for row in cur.fetchall()]
+    if recompute:
+        rebuilt = select_scored_matches(cur, scope, scope_values)
+        rebuilt_ids = sorted({match['tournament_id'] for match in rebuilt})
+        continued: List[Dict[str, Any]] = []
+    else:
+        cur.execute(STALE_TOURNAMENTS_SQL, {'only': tournament_ids})
+        rebuilt_ids = sorted(row['tournament_id'] for row in cur.fetchall())
+        rebuilt = select_scored_matches(cur, ['tournament_id = ANY(%s)'], [rebuilt_ids]) if rebuilt_ids else []
+        continued = select_scored_matches(
+            cur, ['rated_at IS NULL', 'tournament_id <> ALL(%s)'] + scope, [rebuilt_ids] + scope_values
+        )
     
-    recalculated = 0
-    for idx, team in enumerate(teams, start=1):
-        new_position = idx
-        new_points = team['wins'] * 3 + team['draws']
-        
-        if team['position'] != new_position or team['points'] != new_points:
-            cur.execute('''
-                UPDATE t_p5773343_football_league_app.wmfl_tournament_teams
-                SET position = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE team_id = %s AND tournament_id = %s
-            ''', (new_position, team['team_id'], tournament_id))
-            recalculated += 1
+    if not rebuilt_ids and not continued:
+        conn.commit()
+        return {'matches_rated': 0, 'teams_rated': 0}
+    
+    # Турниры не пересекаются, поэтому пересчитанные и продолженные рейтинги просто объединяются
+    ratings = recompute_match_ratings(rebuilt) if rebuilt else {}
+    if continued:
+        ratings.update(continue_match_ratings(cur, continued))
     
+    teams_rated = 0
+    if ratings:
+        lock_standings(cur, (key[0] for key in ratings))
+        execute_values(cur, '''
+            UPDATE t_p5773343_football_league_app.wmfl_tournament_teams AS t
+            SET rating = v.rating, elo_rating = v.elo_rating, updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(tournament_id, team_id, rating, elo_rating)
+            WHERE t.tournament_id = v.tournament_id AND t.team_id = v.team_id
+              AND t.elo_rating IS DISTINCT FROM v.elo_rating
+        ''', [(key[0], key[1], round(rating), rating) for key, rating in ratings.items()],
+            template='(%s, %s, %s, %s::float8)', page_size=len(ratings))
+        teams_rated = cur.rowcount
+    
+    # Исправленный матч без счёта в пересчитанном турнире остаётся неучтённым
+    cur.execute('''
+        UPDATE t_p5773343_football_league_app.wmfl_matches
+        SET rated_at = CASE WHEN home_goals IS NOT NULL AND away_goals IS NOT NULL THEN CURRENT_TIMESTAMP END,
+            result_corrected = false
+        WHERE id = ANY(%s) OR (result_corrected AND tournament_id = ANY(%s))
+    ''', ([match['id'] for match in rebuilt + continued], rebuilt_ids))
+    
+    matches_rated = len(rebuilt) + len(continued)
+    conn.commit()
+    return {'matches_rated': matches_rated, 'teams_rated': teams_rated}
+
+SYNC_TIME_BUDGET_SECONDS = float(os.environ.get('SYNC_TIME_BUDGET_SECONDS', '20'))
+SYNC_CHUNK_SIZE = int(os.environ.get('SYNC_CHUNK_SIZE', '50'))
+SYNC_LOCK_CLASS = 5773343
+
+def rank_tournaments(cur, only: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    cur.execute('''
+        WITH tournaments AS (
+            SELECT tournament_id, MAX(updated_at) AS last_change_at
+            FROM t_p5773343_football_league_app.wmfl_tournament_teams
+            WHERE is_active = true
+              AND (%(only)s::int[] IS NULL OR tournament_id = ANY(%(only)s::int[]))
+            GROUP BY tournament_id
+        )
+        SELECT t.tournament_id,
+               EXISTS (
+                   SELECT 1 FROM t_p5773343_football_league_app.wmfl_matches m
+                   WHERE m.tournament_id = t.tournament_id
+                     AND m.played_at >= CURRENT_DATE
+                     AND m.played_at < CURRENT_DATE + 1
+               ) AS live,
+               t.last_change_at > COALESCE(s.last_synced_at, '-infinity') AS dirty,
+               s.last_synced_at
+        FROM tournaments t
+        LEFT JOIN t_p5773343_football_league_app.wmfl_sync_schedule s ON s.tournament_id = t.tournament_id
+        ORDER BY live DESC, dirty DESC, s.last_synced_at NULLS FIRST, t.tournament_id
+    ''', {'only': only})
+    return [dict(row) for row in cur.fetchall()]
+
+def load_sync_cursor(cur) -> Dict[str, Any]:
+    cur.execute('''
+        SELECT pending, run_started_at FROM t_p5773343_football_league_app.wmfl_sync_cursor WHERE id = 1
+    ''')
+    row = cur.fetchone()
+    return dict(row) if row else {'pending': [], 'run_started_at': None}
+
+def save_sync_cursor(conn, pending: List[int], run_started_at: Optional[datetime]) -> None:
+    cur = conn.cursor()
+    cur.execute('''
+        INSERT INTO t_p5773343_football_league_app.wmfl_sync_cursor (id, pending, run_started_at, updated_at)
+        VALUES (1, %s::int[], COALESCE(%s, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP)
+        ON CONFLICT (id) DO UPDATE SET
+            pending = EXCLUDED.pending,
+            run_started_at = EXCLUDED.run_started_at,
+            updated_at = EXCLUDED.updated_at
+    ''', (pending, run_started_at))
+    conn.commit()
+
+def lock_tournaments(conn, tournament_ids: List[int]) -> List[int]:
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT tournament_id FROM unnest(%s::int[]) AS tournament_id
+        WHERE pg_try_advisory_lock(%s, tournament_id)
+    ''', (tournament_ids, SYNC_LOCK_CLASS))
+    locked = [row['tournament_id'] for row in cur.fetchall()]
+    conn.commit()
+    return locked
+
+def unlock_tournaments(conn, tournament_ids: List[int]) -> None:
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT pg_advisory_unlock(%s, tournament_id) FROM unnest(%s::int[]) AS tournament_id
+    ''', (SYNC_LOCK_CLASS, tournament_ids))
+    conn.commit()
+
+def mark_synced(conn, tournament_ids: List[int], duration_ms: int) -> None:
+    cur = conn.cursor()
+    execute_values(cur, '''
+        INSERT INTO t_p5773343_football_league_app.wmfl_sync_schedule 
+        (tournament_id, last_synced_at, last_duration_ms, sync_count)
+        VALUES %s
+        ON CONFLICT (tournament_id) DO UPDATE SET
+            last_synced_at = EXCLUDED.last_synced_at,
+            last_duration_ms = EXCLUDED.last_duration_ms,
+            sync_count = wmfl_sync_schedule.sync_count + 1
+    ''', [(tournament_id, duration_ms) for tournament_id in tournament_ids],
+        template='(%s, CURRENT_TIMESTAMP, %s, 1)', page_size=len(tournament_ids))
     conn.commit()
+
+def sync_tournaments(conn, tournament_ids: List[int], recompute: bool) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    started = time.monotonic()
+    with trace_phase('ratings'):
+        ratings = update_ratings(conn, tournament_ids, recompute)
+    with trace_phase('positions'):
+        results = recalculate_positions(conn, tournament_ids)
+    with trace_phase('snapshots'):
+        standings_history.record_standings_snapshots(conn, tournament_ids)
+    mark_synced(conn, tournament_ids, round((time.monotonic() - started) * 1000))
+    return results, ratings
+
+def time_budget_value(raw: Any) -> Optional[float]:
+    # Бюджет больше SYNC_TIME_BUDGET_SECONDS урезается до него; NaN и бесконечность не проходят сравнение
+    if isinstance(raw, bool) or not isinstance(raw, (int, float, str)):
+        return None
+    try:
+        budget = float(raw)
+    except ValueError:
+        return None
+    return min(budget, SYNC_TIME_BUDGET_SECONDS) if 0 < budget < float('inf') else None
+
+def run_scheduled_sync(conn, recompute: bool, time_budget: float) -> Dict[str, Any]:
+    started = time.monotonic()
+    cur = conn.cursor()
+    state = load_sync_cursor(cur)
+    resumed = bool(state['pending'])
+    ranked = rank_tournaments(cur, state['pending'] if resumed else None)
+    conn.commit()
+    pending = [row['tournament_id'] for row in ranked]
+    live = [row['tournament_id'] for row in ranked if row['live']]
+    
+    results: List[Dict[str, Any]] = []
+    errors: Dict[int, str] = {}
+    coalesced: List[int] = []
+    ratings = {'matches_rated': 0, 'teams_rated': 0}
+    last_chunk_seconds = 0.0
+    
+    while pending:
+        elapsed = time.monotonic() - started
+        if (results or errors) and elapsed + last_chunk_seconds > time_budget:
+            break
+        chunk, pending = pending[:SYNC_CHUNK_SIZE], pending[SYNC_CHUNK_SIZE:]
+        chunk_started = time.monotonic()
+        
+        locked = lock_tournaments(conn, chunk)
+        coalesced.extend(tournament_id for tournament_id in chunk if tournament_id not in locked)
+        if not locked:
+            continue
+        try:
+            chunk_results, chunk_ratings = sync_tournaments(conn, locked, recompute)
+            results.extend(chunk_results)
+            for key, value in chunk_ratings.items():
+                ratings[key] += value
+        except Exception as e:
+            conn.rollback()
+            print(f"Sync failed for tournaments {locked}: {str(e)}")
+            errors.update({tournament_id: str(e) for tournament_id in locked})
+        finally:
+            unlock_tournaments(conn, locked)
+        last_chunk_seconds = time.monotonic() - chunk_started
+    
+    save_sync_cursor(conn, pending, state['run_started_at'] if resumed else None)
+    elapsed = time.monotonic() - started
+    processed = len(results) + len(errors)
     
     return {
-        'tournament_id': tournament_id,
-        'teams_count': len(teams),
-        'teams_updated': recalculated,
-        'status': 'success'
+        'results': results,
+        'errors': errors,
+        'ratings': ratings,
+        'scheduler': {
+            'resumed': resumed,
+            'processed': processed,
+            'remaining': len(pending),
+            'coalesced': coalesced,
+            'live': live,
+            'time_budget_seconds': time_budget,
+            'elapsed_seconds': round(elapsed, 3),
+            'tournaments_per_second': round(processed / elapsed, 1) if elapsed > 0 else None
+        }
     }
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+PREFLIGHT_RESPONSE = preflight_response('GET, POST, OPTIONS')
+
+def route(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'POST')
     
     if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+        return PREFLIGHT_RESPONSE
     
     try:
-        conn = get_db_connection()
+        with trace_phase('db_connect'):
+            conn = db_pool.acquire()
         
         if method == 'GET':
-            cur = conn.cursor()
-            cur.execute('''
-                SELECT * FROM t_p5773343_football_league_app.wmfl_sync_log
-                ORDER BY sync_time DESC
-                LIMIT 50
-            ''')
-            logs = [dict(row) for row in cur.fetchall()]
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'logs': logs}, ensure_ascii=False, default=str),
-                'isBase64Encoded': False
-            }
+            params = event.get('queryStringParameters') or {}
+            return cached_response(event, params, sync_log_version(conn), lambda: list_sync_logs(conn, params))
         
         elif method == 'POST':
             body_str = event.get('body', '{}')
             body_data = json.loads(body_str) if body_str else {}
             tournament_id = body_data.get('tournament_id')
+            recompute_ratings = bool(body_data.get('recompute_ratings', False))
+            
+            if body_data.get('maintain_log'):
+                with trace_phase('maintenance'):
+                    log_maintenance = maintain_sync_log(conn, force=True)
+                return json_response(200 if log_maintenance is not None else 500, {
+                    'success': log_maintenance is not None,
+                    'message': 'Обслуживание лога синхронизации выполнено' if log_maintenance is not None else 'Ошибка обслуживания лога синхронизации',
+                    'log_maintenance': log_maintenance
+                })
             
             if tournament_id:
-                result = sync_tournament_data(conn, tournament_id)
+                if not lock_tournaments(conn, [tournament_id]):
+                    return json_response(200, {
+                        'success': True,
+                        'coalesced': True,
+                        'message': 'Синхронизация турнира уже выполняется'
+                    })
+                try:
+                    results, ratings = sync_tournaments(conn, [tournament_id], recompute_ratings)
+                finally:
+                    unlock_tournaments(conn, [tournament_id])
+                result = results[0] if results else {
+                    'tournament_id': tournament_id,
+                    'teams_count': 0,
+                    'teams_updated': 0,
+                    'status': 'success'
+                }
+                result['ratings'] = ratings
                 update_sync_status(
                     conn, 
                     tournament_id, 
@@ -123,83 +646,70 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     f"Синхронизировано команд: {result['teams_updated']}",
                     result['teams_updated']
                 )
+                with trace_phase('maintenance'):
+                    log_maintenance = maintain_sync_log(conn)
                 
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'message': 'Синхронизация завершена',
-                        'result': result
-                    }, ensure_ascii=False),
-                    'isBase64Encoded': False
-                }
+                return json_response(200, {
+                    'success': True,
+                    'message': 'Синхронизация завершена',
+                    'result': result,
+                    'log_maintenance': log_maintenance
+                })
             else:
-                tournaments = get_tournaments_for_sync(conn)
+                time_budget = time_budget_value(body_data.get('time_budget_seconds', SYNC_TIME_BUDGET_SECONDS))
+                if time_budget is None:
+                    return bad_request('time_budget_seconds must be a positive number')
+                run = run_scheduled_sync(conn, recompute_ratings, time_budget)
+                results = run['results']
                 
-                if not tournaments:
-                    return {
-                        'statusCode': 200,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({
-                            'success': True,
-                            'message': 'Нет турниров для синхронизации',
-                            'synced_count': 0
-                        }, ensure_ascii=False),
-                        'isBase64Encoded': False
-                    }
+                if not results and not run['errors'] and not run['scheduler']['remaining']:
+                    return json_response(200, {
+                        'success': True,
+                        'message': 'Нет турниров для синхронизации',
+                        'synced_count': 0,
+                        'scheduler': run['scheduler']
+                    })
                 
-                results = []
-                for tournament in tournaments:
-                    try:
-                        result = sync_tournament_data(conn, tournament['tournament_id'])
-                        results.append(result)
-                        update_sync_status(
-                            conn, 
-                            tournament['tournament_id'], 
-                            'success', 
-                            f"Автосинхронизация: обновлено {result['teams_updated']} команд",
-                            result['teams_updated']
-                        )
-                    except Exception as e:
-                        update_sync_status(
-                            conn, 
-                            tournament['tournament_id'], 
-                            'error', 
-                            str(e)
-                        )
+                update_sync_statuses(conn, [
+                    (
+                        result['tournament_id'],
+                        'success',
+                        f"Автосинхронизация: обновлено {result['teams_updated']} команд",
+                        result['teams_updated']
+                    )
+                    for result in results
+                ] + [
+                    (tournament_id, 'error', error, 0)
+                    for tournament_id, error in run['errors'].items()
+                ])
+                with trace_phase('maintenance'):
+                    log_maintenance = maintain_sync_log(conn)
                 
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({
-                        'success': True,
-                        'message': f'Синхронизировано турниров: {len(results)}',
-                        'synced_count': len(results),
-                        'results': results
-                    }, ensure_ascii=False),
-                    'isBase64Encoded': False
-                }
+                return json_response(200, {
+                    'success': not run['errors'],
+                    'message': f"Синхронизировано турниров: {len(results)}, осталось: {run['scheduler']['remaining']}",
+                    'synced_count': len(results),
+                    'failed_count': len(run['errors']),
+                    'ratings': run['ratings'],
+                    'results': results,
+                    'scheduler': run['scheduler'],
+                    'log_maintenance': log_maintenance
+                })
         
         else:
-            return {
-                'statusCode': 405,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'}),
-                'isBase64Encoded': False
-            }
+            return METHOD_NOT_ALLOWED_RESPONSE
     
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'error': str(e),
-                'message': 'Ошибка синхронизации'
-            }, ensure_ascii=False),
-            'isBase64Encoded': False
-        }
+        return json_response(500, {
+            'error': str(e),
+            'message': 'Ошибка синхронизации'
+        })
     
     finally:
         if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            db_pool.release(conn)
+
+def request_stats() -> Dict[str, Any]:
+    return {'db_pool': db_pool.snapshot(), 'response_cache': response_cache.snapshot()}
+
+handler = traced_handler('wmfl-sync', route, request_stats)
@@ -0,0 +1,145 @@
+'''
+Business: История турнирных таблиц WMFL - компактные снимки после каждого изменения
+Args: соединение psycopg2 (RealDictCursor) и ID турниров или команды
+Returns: число записанных снимков, ряд значений команды или таблицу на момент времени
+'''
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from wmfl_core import execute_values
+
+KEYFRAME_INTERVAL = 24
+SNAPSHOT_FIELDS = ('position', 'points', 'goal_difference', 'rating', 'matches_played')
+
+Standings = Dict[int, Tuple]
+
+def apply_snapshot(standings: Standings, snapshot: Dict[str, Any]) -> Standings:
+    if snapshot['is_keyframe']:
+        standings = {}
+    columns = zip(
+        snapshot['positions'], snapshot['points'], snapshot['goal_differences'],
+        snapshot['ratings'], snapshot['matches_played']
+    )
+    for team_id, values in zip(snapshot['team_ids'], columns):
+        standings[team_id] = values
+    for team_id in snapshot['removed_team_ids']:
+        standings.pop(team_id, None)
+    return standings
+
+def load_current_standings(cur, tournament_ids: List[int]) -> Dict[int, Standings]:
+    cur.execute('''
+        SELECT tournament_id, team_id, position, points, goal_difference, rating, matches_played
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams
+        WHERE is_active = true AND team_id IS NOT NULL AND tournament_id = ANY(%s)
+    ''', (tournament_ids,))
+    current: Dict[int, Standings] = {tournament_id: {} for tournament_id in tournament_ids}
+    for row in cur.fetchall():
+        current[row['tournament_id']][row['team_id']] = tuple(row[field] for field in SNAPSHOT_FIELDS)
+    return current
+
+def load_latest_standings(cur, tournament_ids: List[int]) -> Dict[int, Tuple[Standings, int]]:
+    cur.execute('''
+        SELECT s.* FROM t_p5773343_football_league_app.wmfl_standings_snapshots s
+        JOIN (
+            SELECT tournament_id, MAX(id) AS keyframe_id
+            FROM t_p5773343_football_league_app.wmfl_standings_snapshots
+            WHERE is_keyframe AND tournament_id = ANY(%s)
+            GROUP BY tournament_id
+        ) k ON k.tournament_id = s.tournament_id AND s.id >= k.keyframe_id
+        ORDER BY s.tournament_id, s.id
+    ''', (tournament_ids,))
+    latest: Dict[int, Tuple[Standings, int]] = {}
+    for snapshot in cur.fetchall():
+        standings, deltas = latest.get(snapshot['tournament_id'], ({}, -1))
+        latest[snapshot['tournament_id']] = (apply_snapshot(standings, snapshot), deltas + 1)
+    return latest
+
+def snapshot_row(tournament_id: int, is_keyframe: bool, changed: Standings, removed: List[int]) -> Tuple:
+    team_ids = sorted(changed)
+    return (
+        tournament_id,
+        is_keyframe,
+        team_ids,
+        *([changed[team_id][index] for team_id in team_ids] for index in range(len(SNAPSHOT_FIELDS))),
+        removed
+    )
+
+def record_standings_snapshots(conn, tournament_ids: List[int]) -> int:
+    if not tournament_ids:
+        return 0
+    
+    cur = conn.cursor()
+    current = load_current_standings(cur, tournament_ids)
+    latest = load_latest_standings(cur, tournament_ids)
+    
+    rows = []
+    for tournament_id, standings in current.items():
+        previous, deltas = latest.get(tournament_id, ({}, None))
+        changed = {team_id: values for team_id, values in standings.items() if previous.get(team_id) != values}
+        removed = sorted(team_id for team_id in previous if team_id not in standings)
+        if not changed and not removed:
+            continue
+        if deltas is None or deltas + 1 >= KEYFRAME_INTERVAL:
+            rows.append(snapshot_row(tournament_id, True, standings, []))
+        else:
+            rows.append(snapshot_row(tournament_id, False, changed, removed))
+    
+    if rows:
+        execute_values(cur, '''
+            INSERT INTO t_p5773343_football_league_app.wmfl_standings_snapshots
+            (tournament_id, is_keyframe, team_ids, positions, points, goal_differences,
+             ratings, matches_played, removed_team_ids)
+            VALUES %s
+        ''', rows, template='(%s, %s, %s::int[], %s::smallint[], %s::int[], %s::int[], %s::int[], %s::smallint[], %s::int[])',
+            page_size=len(rows))
+    conn.commit()
+    return len(rows)
+
+def load_snapshots(cur, tournament_id: int, start: Optional[datetime], end: Optional[datetime], team_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    conditions = ['s.tournament_id = %(tournament_id)s', 's.id >= COALESCE(k.keyframe_id, 0)']
+    if end is not None:
+        conditions.append('s.taken_at <= %(end)s')
+    if team_id is not None:
+        conditions.append('(s.is_keyframe OR %(team_id)s = ANY(s.team_ids) OR %(team_id)s = ANY(s.removed_team_ids))')
+    
+    cur.execute(f'''
+        WITH k AS (
+            SELECT MAX(id) AS keyframe_id
+            FROM t_p5773343_football_league_app.wmfl_standings_snapshots
+            WHERE tournament_id = %(tournament_id)s AND is_keyframe
+              AND taken_at <= COALESCE(%(start)s::timestamp, '-infinity'::timestamp)
+        )
+        SELECT s.* FROM t_p5773343_football_league_app.wmfl_standings_snapshots s, k
+        WHERE {' AND '.join(conditions)}
+        ORDER BY s.id
+    ''', {'tournament_id': tournament_id, 'start': start, 'end': end, 'team_id': team_id})
+    return cur.fetchall()
+
+def team_series(cur, tournament_id: int, team_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    series = []
+    standings: Standings = {}
+    previous = None
+    for snapshot in load_snapshots(cur, tournament_id, start, end, team_id):
+        standings = apply_snapshot(standings, snapshot)
+        values = standings.get(team_id)
+        in_range = start is None or snapshot['taken_at'] >= start
+        changed = values != previous if series else values is not None
+        previous = values
+        if not in_range or not changed:
+            continue
+        point = {'taken_at': snapshot['taken_at'], 'removed': values is None}
+        point.update(zip(SNAPSHOT_FIELDS, values or (None,) * len(SNAPSHOT_FIELDS)))
+        series.append(point)
+    return series
+
+def standings_as_of(cur, tournament_id: int, as_of: Optional[datetime] = None) -> Tuple[Optional[datetime], List[Dict[str, Any]]]:
+    standings: Standings = {}
+    taken_at = None
+    for snapshot in load_snapshots(cur, tournament_id, as_of or datetime.max, as_of):
+        standings = apply_snapshot(standings, snapshot)
+        taken_at = snapshot['taken_at']
+    
+    table = [dict(zip(SNAPSHOT_FIELDS, values), team_id=team_id) for team_id, values in standings.items()]
+    table.sort(key=lambda row: (row['position'] is None, row['position'] or 0, -row['points']))
+    return taken_at, table
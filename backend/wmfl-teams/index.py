@@ -1,186 +1,680 @@
 '''
-Business: API для управления командами турнира WMFL - получение, добавление и обновление рейтинга команд
-Args: event - dict with httpMethod, body, queryStringParameters, pathParams
+Business: API для управления командами турнира WMFL - получение, добавление и обновление рейтинга команд, рейтинг-лист по всем турнирам
+Args: event - dict with httpMethod, body, queryStringParameters (team_id, tournament_id, season, fields, limit, cursor, changes_since, wait, history, from, to, as_of, leaderboard, window), pathParams
       context - object with attributes: request_id, function_name
 Returns: HTTP response dict with team data
 '''
 
+import base64
 import json
 import os
-from typing import Dict, Any, Optional, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import select
+import time
+from typing import Callable, Dict, Any, Iterable, Optional, List, Tuple
 from datetime import datetime
+from wmfl_core import (
+    METHOD_NOT_ALLOWED_RESPONSE, bad_request, cached_response, db_pool, execute_values,
+    json_response, lock_standings, preflight_response, psycopg2, response_cache, team_key,
+    text_response, trace_phase, traced_handler
+)
+import leaderboard
+import standings_history
 
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception('DATABASE_URL not found in environment')
-    return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+# Версия - последняя транзакция, менявшая строки, и ещё не завершённые в снимке
+# транзакции ниже неё: updated_at (время начала транзакции) и один MAX(change_xid)
+# не меняются, когда позже фиксируется транзакция, начатая раньше уже видимой
+TEAMS_VERSION_SQL = '''
+    WITH s AS (SELECT pg_current_snapshot() AS snap),
+    m AS (
+        SELECT MAX(change_xid) AS last_change
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams
+        {where}
+    )
+    SELECT m.last_change::text AS last_change,
+           pg_snapshot_xmin(s.snap)::text AS horizon,
+           ARRAY(SELECT x FROM pg_snapshot_xip(s.snap) AS x WHERE x < m.last_change ORDER BY x)::text AS pending
+    FROM s, m
+'''
+
+def teams_version(cur, tournament_id: Optional[str]) -> Tuple[str, int]:
+    if tournament_id and tournament_id.isdigit():
+        cur.execute(TEAMS_VERSION_SQL.format(where='WHERE tournament_id = %s'), (int(tournament_id),))
+    else:
+        cur.execute(TEAMS_VERSION_SQL.format(where=''))
+    row = cur.fetchone()
+    return f"{row['last_change']}|{row['pending']}", int(row['horizon'])
+
+def get_team(cur, team_id: str) -> Dict[str, Any]:
+    cur.execute('''
+        SELECT * FROM t_p5773343_football_league_app.wmfl_tournament_teams 
+        WHERE team_id = %s AND is_active = true
+    ''', (team_id,))
+    team = cur.fetchone()
+    
+    if not team:
+        return json_response(404, {'error': 'Team not found'})
+    
+    return json_response(200, dict(team))
+
+TEAM_COLUMNS = [
+    'id', 'team_id', 'team_name', 'team_short_name', 'team_logo', 'city', 'stadium',
+    'matches_played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+    'goal_difference', 'points', 'rating', 'position', 'form', 'streak',
+    'home_wins', 'home_draws', 'home_losses', 'away_wins', 'away_draws', 'away_losses',
+    'yellow_cards', 'red_cards', 'tournament_id', 'season', 'is_active',
+    'created_at', 'updated_at'
+]
+KEYSET_COLUMNS = ['tournament_id', 'position', 'id']
+TIMESTAMP_COLUMNS = {'created_at', 'updated_at'}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+JSON_DB_RENDER_MIN_ROWS = int(os.environ.get('JSON_DB_RENDER_MIN_ROWS', '200'))
+MAX_UNPAGED_ROWS = 2147483647
+COMPACT_SEPARATORS = (',', ':')
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    return encode_cursor_key([row[column] for column in KEYSET_COLUMNS])
+
+def encode_cursor_key(key: List[int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> List[int]:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(key, list) or len(key) != len(KEYSET_COLUMNS) or not all(isinstance(v, int) for v in key):
+        raise ValueError('Invalid cursor')
+    return key
+
+def json_value_sql(column: str) -> str:
+    if column not in TIMESTAMP_COLUMNS:
+        return column
+    return (
+        f"CASE WHEN date_part('microseconds', {column})::bigint %% 1000000 = 0 "
+        f"THEN to_char({column}, 'YYYY-MM-DD HH24:MI:SS') "
+        f"ELSE to_char({column}, 'YYYY-MM-DD HH24:MI:SS.US') END"
+    )
+
+def list_teams_rendered_in_db(cur, fields: List[str], conditions: List[str], values: List[Any], limit: Optional[int], paginated: bool) -> Dict[str, Any]:
+    selected = fields + [column for column in KEYSET_COLUMNS if column not in fields]
+    json_object = ', '.join(f'{json_value_sql(field)} AS {field}' for field in fields)
+    page_limit = ''
+    if limit is not None:
+        page_limit = 'LIMIT %s'
+        values = values + [limit + 1]
+    
+    cur.execute(f'''
+        WITH page AS (
+            SELECT {', '.join(selected)},
+                   ROW_NUMBER() OVER (ORDER BY tournament_id, position, id) AS page_row
+            FROM t_p5773343_football_league_app.wmfl_tournament_teams 
+            WHERE {' AND '.join(conditions)}
+            ORDER BY tournament_id, position, id
+            {page_limit}
+        )
+        SELECT '[' || COALESCE(
+                   string_agg((SELECT row_to_json(team) FROM (SELECT {json_object}) AS team)::text, ',' ORDER BY page_row) FILTER (WHERE page_row <= %s),
+                   ''
+               ) || ']' AS body,
+               COUNT(*) > %s AS has_more,
+               (SELECT json_build_array({', '.join(KEYSET_COLUMNS)})::text FROM page WHERE page_row = %s) AS last_key
+        FROM page
+    ''', values + [limit or MAX_UNPAGED_ROWS, limit or MAX_UNPAGED_ROWS, limit or 0])
+    result = cur.fetchone()
+    
+    body = result['body']
+    if paginated:
+        next_cursor = encode_cursor_key(json.loads(result['last_key'])) if result['has_more'] else None
+        body = '{"teams":' + body + ',"next_cursor":' + json.dumps(next_cursor) + '}'
+    
+    return text_response(200, body)
+
+def list_teams(cur, params: Dict[str, Any]) -> Dict[str, Any]:
+    fields = TEAM_COLUMNS
+    if params.get('fields'):
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in TEAM_COLUMNS]
+        if unknown:
+            return bad_request(f"Unknown fields: {', '.join(unknown)}")
+    
+    paginated = 'limit' in params or 'cursor' in params
+    conditions = ['is_active = true']
+    values: List[Any] = []
+    
+    if params.get('tournament_id'):
+        if not params['tournament_id'].isdigit():
+            return bad_request('tournament_id must be an integer')
+        conditions.append('tournament_id = %s')
+        values.append(int(params['tournament_id']))
+    if params.get('season'):
+        conditions.append('season = %s')
+        values.append(params['season'])
+    if params.get('cursor'):
+        try:
+            key = decode_cursor(params['cursor'])
+        except (ValueError, TypeError):
+            return bad_request('Invalid cursor')
+        conditions.append(f"({', '.join(KEYSET_COLUMNS)}) > (%s, %s, %s)")
+        values.extend(key)
+    
+    limit = None
+    if paginated:
+        try:
+            limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return bad_request('limit must be an integer')
+    
+    # Маршрут по фактическому числу строк: первые JSON_DB_RENDER_MIN_ROWS строк
+    # читаются сразу, и только если их не меньше, ответ собирается в Postgres
+    probe = JSON_DB_RENDER_MIN_ROWS if limit is None else min(limit + 1, JSON_DB_RENDER_MIN_ROWS)
+    selected = fields + [column for column in KEYSET_COLUMNS if column not in fields]
+    cur.execute(f'''
+        SELECT {', '.join(selected)} FROM t_p5773343_football_league_app.wmfl_tournament_teams 
+        WHERE {' AND '.join(conditions)}
+        ORDER BY tournament_id, position, id
+        LIMIT %s
+    ''', values + [probe])
+    rows = cur.fetchall()
+    if len(rows) >= JSON_DB_RENDER_MIN_ROWS:
+        return list_teams_rendered_in_db(cur, fields, conditions, values, limit, paginated)
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    
+    teams_list = [{field: row[field] for field in fields} for row in rows]
+    body = {'teams': teams_list, 'next_cursor': next_cursor} if paginated else teams_list
+    
+    return text_response(200, json.dumps(body, ensure_ascii=False, default=str, separators=COMPACT_SEPARATORS))
+
+TEAMS_CHANGED_CHANNEL = 'wmfl_teams_changed'
+DEFAULT_CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+LONG_POLL_MAX_SECONDS = float(os.environ.get('LONG_POLL_MAX_SECONDS', '25'))
+LONG_POLL_RECHECK_SECONDS = 2.0
+
+def encode_change_cursor(change_xid: int, row_id: int) -> str:
+    return encode_cursor_key([change_xid, row_id])
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    if cursor in ('', '0'):
+        return 0, 0
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(v, int) and v >= 0 for v in key):
+        raise ValueError('Invalid cursor')
+    return key[0], key[1]
+
+def fetch_team_changes(cur, since: Tuple[int, int], tournament_id: Optional[int], limit: int) -> Dict[str, Any]:
+    conditions = ['(t.change_xid, t.id) > (%s::text::xid8, %s)', 't.change_xid < h.horizon']
+    values: List[Any] = [str(since[0]), since[1]]
+    if tournament_id is not None:
+        conditions.append('t.tournament_id = %s')
+        values.append(tournament_id)
+    
+    cur.execute(f'''
+        WITH h AS (SELECT pg_snapshot_xmin(pg_current_snapshot()) AS horizon)
+        SELECT h.horizon::text AS horizon, t.change_xid::text AS change_xid, t.*
+        FROM h
+        LEFT JOIN t_p5773343_football_league_app.wmfl_tournament_teams t ON {' AND '.join(conditions)}
+        ORDER BY t.change_xid, t.id
+        LIMIT %s
+    ''', values + [limit + 1])
+    rows = cur.fetchall()
+    horizon = int(rows[0]['horizon'])
+    rows = [row for row in rows if row['id'] is not None]
+    
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        next_cursor = encode_change_cursor(int(rows[-1]['change_xid']), rows[-1]['id'])
+    else:
+        next_cursor = encode_change_cursor(max(horizon, since[0]), 0)
+    
+    changes = [dict({field: row[field] for field in TEAM_COLUMNS}, deleted=not row['is_active']) for row in rows]
+    return {'changes': changes, 'cursor': next_cursor, 'has_more': has_more}
+
+def wait_for_team_changes(conn, timeout: float) -> None:
+    if select.select([conn], [], [], timeout) != ([], [], []):
+        conn.poll()
+        conn.notifies.clear()
+
+def list_team_changes(conn, params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        since = decode_change_cursor(params['changes_since'] or '')
+    except (ValueError, TypeError):
+        return bad_request('Invalid cursor')
+    
+    tournament_id = None
+    if params.get('tournament_id'):
+        if not params['tournament_id'].isdigit():
+            return bad_request('tournament_id must be an integer')
+        tournament_id = int(params['tournament_id'])
+    
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_CHANGES_PAGE_SIZE)), 1), MAX_CHANGES_PAGE_SIZE)
+        wait = min(max(float(params.get('wait', 0)), 0.0), LONG_POLL_MAX_SECONDS)
+    except ValueError:
+        return bad_request('limit and wait must be numbers')
+    
+    cur = conn.cursor()
+    deadline = time.monotonic() + wait
+    if wait > 0:
+        cur.execute(f'LISTEN {TEAMS_CHANGED_CHANNEL}')
+        conn.commit()
+    
+    try:
+        while True:
+            result = fetch_team_changes(cur, since, tournament_id, limit)
+            conn.commit()
+            remaining = deadline - time.monotonic()
+            if result['changes'] or remaining <= 0:
+                break
+            with trace_phase('long_poll'):
+                wait_for_team_changes(conn, min(remaining, LONG_POLL_RECHECK_SECONDS))
+    finally:
+        if wait > 0:
+            cur.execute(f'UNLISTEN {TEAMS_CHANGED_CHANNEL}')
+            conn.commit()
+            conn.notifies.clear()
+    
+    return json_response(200, result, {'Cache-Control': 'no-store'})
+
+HISTORY_KINDS = ('team', 'table')
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def standings_history_version(cur, tournament_id: int) -> str:
+    cur.execute('''
+        SELECT MAX(id) AS last_id FROM t_p5773343_football_league_app.wmfl_standings_snapshots
+        WHERE tournament_id = %s
+    ''', (tournament_id,))
+    return str(cur.fetchone()['last_id'])
+
+def standings_history_response(event: Dict[str, Any], cur, params: Dict[str, Any]) -> Dict[str, Any]:
+    if params['history'] not in HISTORY_KINDS:
+        return bad_request(f"history must be one of: {', '.join(HISTORY_KINDS)}")
+    if not (params.get('tournament_id') or '').isdigit():
+        return bad_request('tournament_id is required')
+    if params['history'] == 'team' and not (params.get('team_id') or '').isdigit():
+        return bad_request('team_id is required')
+    try:
+        start, end, as_of = (parse_timestamp(params.get(name)) for name in ('from', 'to', 'as_of'))
+    except ValueError:
+        return bad_request('from, to and as_of must be ISO timestamps')
+    
+    tournament_id = int(params['tournament_id'])
+    version = standings_history_version(cur, tournament_id)
+    if params['history'] == 'team':
+        return cached_response(event, params, version, lambda: team_history(cur, tournament_id, int(params['team_id']), start, end))
+    return cached_response(event, params, version, lambda: table_history(cur, tournament_id, as_of))
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def team_history(cur, tournament_id: int, team_id: int, start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+    series = standings_history.team_series(cur, tournament_id, team_id, start, end)
+    return json_response(200, {'tournament_id': tournament_id, 'team_id': team_id, 'series': series})
+
+def table_history(cur, tournament_id: int, as_of: Optional[datetime]) -> Dict[str, Any]:
+    taken_at, table = standings_history.standings_as_of(cur, tournament_id, as_of)
+    if table:
+        cur.execute('''
+            SELECT team_id, team_name FROM t_p5773343_football_league_app.wmfl_tournament_teams
+            WHERE team_id = ANY(%s)
+        ''', ([row['team_id'] for row in table],))
+        names = {row['team_id']: row['team_name'] for row in cur.fetchall()}
+        for row in table:
+            row['team_name'] = names.get(row['team_id'])
+    
+    return json_response(200, {'tournament_id': tournament_id, 'taken_at': taken_at, 'standings': table})
+
+LEADERBOARD_KINDS = ('top', 'around')
+DEFAULT_LEADERBOARD_SIZE = 50
+DEFAULT_LEADERBOARD_WINDOW = 5
+MAX_LEADERBOARD_WINDOW = 50
+
+def decode_leaderboard_cursor(cursor: str) -> Tuple[int, int]:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(v, int) for v in key):
+        raise ValueError('Invalid cursor')
+    return key[0], key[1]
+
+def leaderboard_response(event: Dict[str, Any], cur, params: Dict[str, Any]) -> Dict[str, Any]:
+    kind = params['leaderboard']
+    if kind not in LEADERBOARD_KINDS:
+        return bad_request(f"leaderboard must be one of: {', '.join(LEADERBOARD_KINDS)}")
+    season = params.get('season') or None
+    if season == leaderboard.ALL_SEASONS:
+        return bad_request('Invalid season')
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LEADERBOARD_SIZE)), 1), MAX_PAGE_SIZE)
+        window = min(max(int(params.get('window', DEFAULT_LEADERBOARD_WINDOW)), 0), MAX_LEADERBOARD_WINDOW)
+    except ValueError:
+        return bad_request('limit and window must be integers')
+    
+    version, _ = teams_version(cur, None)
+    if kind == 'around':
+        if not (params.get('team_id') or '').isdigit():
+            return bad_request('team_id is required')
+        return cached_response(event, params, version, lambda: leaderboard_around(cur, int(params['team_id']), season, window))
+    
+    after = None
+    if params.get('cursor'):
+        try:
+            after = decode_leaderboard_cursor(params['cursor'])
+        except (ValueError, TypeError):
+            return bad_request('Invalid cursor')
+    return cached_response(event, params, version, lambda: leaderboard_top(cur, season, limit, after))
+
+def leaderboard_top(cur, season: Optional[str], limit: int, after: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    page = leaderboard.top(cur, season, limit, after)
+    next_key = page.pop('next_key')
+    page['next_cursor'] = encode_cursor_key(list(next_key)) if next_key else None
+    return json_response(200, page)
+
+def leaderboard_around(cur, team_id: int, season: Optional[str], window: int) -> Dict[str, Any]:
+    neighbourhood = leaderboard.around(cur, team_id, season, window)
+    if neighbourhood is None:
+        return json_response(404, {'error': 'Team not found'})
+    return json_response(200, neighbourhood)
+
+INSERT_COLUMNS = [
+    ('team_id', None), ('team_key', None), ('team_name', None), ('team_short_name', None), ('team_logo', None),
+    ('city', None), ('stadium', None), ('matches_played', 0), ('wins', 0), ('draws', 0),
+    ('losses', 0), ('goals_for', 0), ('goals_against', 0), ('rating', 1500), ('position', None),
+    ('form', None), ('streak', None), ('home_wins', 0), ('home_draws', 0), ('home_losses', 0),
+    ('away_wins', 0), ('away_draws', 0), ('away_losses', 0), ('yellow_cards', 0), ('red_cards', 0),
+    ('tournament_id', 1056456), ('season', '2024/2025'), ('is_active', True)
+]
+TEAM_INSERT_SQL = f'''
+    INSERT INTO t_p5773343_football_league_app.wmfl_tournament_teams 
+    ({', '.join(column for column, _ in INSERT_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (tournament_id, team_key) DO NOTHING
+    RETURNING id, team_id, team_name, points, goal_difference, tournament_id, team_key
+'''
+DUPLICATE_TEAM_ERROR = 'Team with this name already exists in the tournament'
+DUPLICATE_TEAM_ID_ERROR = 'Team with this team_id already exists'
+TEAM_KEY_INDEX = 'uq_wmfl_tournament_teams_key'
+UNIQUE_VIOLATION = '23505'
+UPDATABLE_FIELDS = {
+    'team_name': 'text', 'team_short_name': 'text', 'team_logo': 'text', 'city': 'text',
+    'stadium': 'text', 'matches_played': 'integer', 'wins': 'integer', 'draws': 'integer',
+    'losses': 'integer', 'goals_for': 'integer', 'goals_against': 'integer', 'rating': 'integer',
+    'position': 'integer', 'form': 'text', 'streak': 'text', 'home_wins': 'integer',
+    'home_draws': 'integer', 'home_losses': 'integer', 'away_wins': 'integer',
+    'away_draws': 'integer', 'away_losses': 'integer', 'yellow_cards': 'integer',
+    'red_cards': 'integer', 'season': 'text', 'is_active': 'boolean'
+}
+INSERT_FIELDS = dict(UPDATABLE_FIELDS, team_id='integer', tournament_id='integer')
+COLUMN_TYPES = dict(INSERT_FIELDS, team_key='text')
+NULLABLE_FIELDS = {'team_id', 'team_short_name', 'team_logo', 'city', 'stadium', 'position', 'form', 'streak', 'season'}
+TYPE_NAMES = {'integer': 'an integer', 'text': 'a string', 'boolean': 'a boolean'}
+INTEGER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+MAX_BATCH_ITEMS = 5000
+
+def coerce_value(value: Any, column_type: str) -> Any:
+    if isinstance(value, bool):
+        if column_type != 'boolean':
+            raise ValueError(value)
+        return value
+    if column_type == 'integer':
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        if not isinstance(value, (int, float, str)):
+            raise TypeError(value)
+        number = int(value)
+        if not INTEGER_RANGE[0] <= number <= INTEGER_RANGE[1]:
+            raise ValueError(value)
+        return number
+    if column_type == 'text' and isinstance(value, (str, int, float)):
+        return str(value)
+    raise TypeError(value)
+
+def coerce_team_fields(body_data: Dict[str, Any], field_types: Dict[str, str]) -> Tuple[Dict[str, Any], Optional[str]]:
+    # Значения приводятся к типам колонок здесь, а не приведением %s::type в SQL:
+    # неверное поле даёт ошибку своего элемента, а не обрыв всей транзакции
+    fields: Dict[str, Any] = {}
+    for field, column_type in field_types.items():
+        if field not in body_data:
+            continue
+        value = body_data[field]
+        if value is None and field in NULLABLE_FIELDS:
+            fields[field] = None
+            continue
+        try:
+            fields[field] = coerce_value(value, column_type)
+        except (TypeError, ValueError):
+            return {}, f'{field} must be {TYPE_NAMES[column_type]}'
+    if 'team_name' in fields:
+        if not fields['team_name'].strip():
+            return {}, 'team_name must not be empty'
+        # Переименование меняет и ключ идентичности, иначе импорт не узнает команду
+        fields['team_key'] = team_key(fields['team_name'])
+    return fields, None
+
+def team_insert_row(fields: Dict[str, Any]) -> Dict[str, Any]:
+    # team_id без значения берётся из последовательности V0009, team_key - как у импорта,
+    # чтобы импорт нашёл эту команду, а не создал вторую
+    row = {column: fields.get(column, default) for column, default in INSERT_COLUMNS}
+    if row['team_id'] is None:
+        row['team_id'] = psycopg2.extensions.AsIs('DEFAULT')
+    return row
+
+def validate_team_insert(body_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    if not body_data.get('team_name'):
+        return {}, 'Missing required field: team_name'
+    return coerce_team_fields(body_data, INSERT_FIELDS)
+
+def write_error(error: psycopg2.Error) -> str:
+    if error.diag.constraint_name == TEAM_KEY_INDEX:
+        return DUPLICATE_TEAM_ERROR
+    if error.pgcode == UNIQUE_VIOLATION:
+        return DUPLICATE_TEAM_ID_ERROR
+    return error.diag.message_primary or str(error)
+
+def lock_team_standings(cur, team_ids: List[Any], tournament_ids: Iterable[int] = ()) -> None:
+    cur.execute('''
+        SELECT DISTINCT tournament_id FROM t_p5773343_football_league_app.wmfl_tournament_teams
+        WHERE team_id = ANY(%s::int[])
+    ''', (team_ids,))
+    lock_standings(cur, [row['tournament_id'] for row in cur.fetchall()] + list(tournament_ids))
+
+def insert_teams(cur, rows: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    lock_standings(cur, (row['tournament_id'] for row in rows))
+    created = execute_values(
+        cur, TEAM_INSERT_SQL, [tuple(row[column] for column, _ in INSERT_COLUMNS) for row in rows],
+        page_size=len(rows), fetch=True
+    )
+    by_key = {(team['tournament_id'], team['team_key']): dict(team) for team in created}
+    # Строки, пропущенные ON CONFLICT (и повторы внутри одной пачки), получают None
+    return [by_key.pop((row['tournament_id'], row['team_key']), None) for row in rows]
+
+def update_teams(cur, columns: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> List[bool]:
+    template = '(%s::integer, ' + ', '.join(f'%s::{COLUMN_TYPES[column]}' for column in columns) + ')'
+    updated = execute_values(cur, f'''
+        UPDATE t_p5773343_football_league_app.wmfl_tournament_teams AS t
+        SET {', '.join(f'{column} = v.{column}' for column in columns)}, updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v(team_id, {', '.join(columns)})
+        WHERE t.team_id = v.team_id
+        RETURNING t.team_id
+    ''', rows, template=template, page_size=len(rows), fetch=True)
+    updated_ids = {row['team_id'] for row in updated}
+    return [row[0] in updated_ids for row in rows]
+
+def write_isolated(cur, rows: List[Any], write: Callable[[List[Any]], List[Any]]) -> List[Tuple[Any, Optional[str]]]:
+    # Пачка пишется одним запросом под точкой сохранения; если запрос упал (дубль
+    # team_id, слишком длинная строка), строки повторяются по одной, и ошибку
+    # получает только свой элемент, а остальная пачка фиксируется
+    cur.execute('SAVEPOINT batch_write')
+    try:
+        results = write(rows)
+    except psycopg2.Error as e:
+        cur.execute('ROLLBACK TO SAVEPOINT batch_write')
+        if len(rows) == 1:
+            return [(None, write_error(e))]
+        return [result for row in rows for result in write_isolated(cur, [row], write)]
+    cur.execute('RELEASE SAVEPOINT batch_write')
+    return [(result, None) for result in results]
+
+def validate_batch_item(item: Any) -> Tuple[Dict[str, Any], Optional[str]]:
+    if not isinstance(item, dict):
+        return {}, 'Item must be an object'
+    op = item.get('op')
+    if op == 'insert':
+        return validate_team_insert(item)
+    if op not in ('update', 'delete'):
+        return {}, 'op must be insert, update or delete'
+    if not isinstance(item.get('team_id'), int) or isinstance(item['team_id'], bool):
+        return {}, 'team_id is required'
+    if op == 'update':
+        if not any(field in item for field in UPDATABLE_FIELDS):
+            return {}, 'No fields to update'
+        return coerce_team_fields(item, UPDATABLE_FIELDS)
+    return {}, None
+
+def apply_batch(conn, items: Any) -> Dict[str, Any]:
+    if not isinstance(items, list) or not items or len(items) > MAX_BATCH_ITEMS:
+        return bad_request(f'items must be a list of 1..{MAX_BATCH_ITEMS} operations')
+    
+    results: List[Dict[str, Any]] = [{'index': index} for index in range(len(items))]
+    inserts: Dict[int, Dict[str, Any]] = {}
+    updates: Dict[int, Dict[str, Any]] = {}
+    update_indexes: Dict[int, List[int]] = {}
+    deletes: Dict[int, List[int]] = {}
+    
+    for index, item in enumerate(items):
+        fields, error = validate_batch_item(item)
+        if error:
+            results[index].update({'status': 'error', 'error': error})
+        elif item['op'] == 'insert':
+            inserts[index] = team_insert_row(fields)
+        elif item['op'] == 'update':
+            updates.setdefault(item['team_id'], {}).update(fields)
+            update_indexes.setdefault(item['team_id'], []).append(index)
+        else:
+            deletes.setdefault(item['team_id'], []).append(index)
+    
+    cur = conn.cursor()
+    # Все турниры пачки блокируются одним упорядоченным вызовом до первой записи
+    lock_team_standings(cur, list(updates) + list(deletes), (row['tournament_id'] for row in inserts.values()))
+    
+    if inserts:
+        written = write_isolated(cur, list(inserts.values()), lambda rows: insert_teams(cur, rows))
+        for index, (team, error) in zip(inserts, written):
+            if error or team is None:
+                results[index].update({'status': 'error', 'error': error or DUPLICATE_TEAM_ERROR})
+            else:
+                results[index].update({'status': 'inserted', 'team': team})
+    
+    by_column_set: Dict[Tuple[str, ...], List[int]] = {}
+    for team_id, fields in updates.items():
+        by_column_set.setdefault(tuple(sorted(fields)), []).append(team_id)
+    
+    for columns, team_ids in by_column_set.items():
+        rows = [(team_id, *[updates[team_id][column] for column in columns]) for team_id in team_ids]
+        written = write_isolated(cur, rows, lambda rows, columns=columns: update_teams(cur, columns, rows))
+        for team_id, (found, error) in zip(team_ids, written):
+            for index in update_indexes[team_id]:
+                if error:
+                    results[index].update({'status': 'error', 'error': error})
+                else:
+                    results[index]['status'] = 'updated' if found else 'not_found'
+    
+    deleted_ids = set()
+    if deletes:
+        cur.execute('''
+            UPDATE t_p5773343_football_league_app.wmfl_tournament_teams 
+            SET is_active = false, updated_at = CURRENT_TIMESTAMP
+            WHERE team_id = ANY(%s)
+            RETURNING team_id
+        ''', (list(deletes),))
+        deleted_ids = {row['team_id'] for row in cur.fetchall()}
+    
+    for team_id, indexes in deletes.items():
+        for index in indexes:
+            results[index]['status'] = 'deleted' if team_id in deleted_ids else 'not_found'
+    
+    conn.commit()
+    response_cache.invalidate()
+    
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    
+    return json_response(200, {'counts': counts, 'results': results})
+
+PREFLIGHT_RESPONSE = preflight_response('GET, POST, PUT, DELETE, OPTIONS')
+
+def route(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+        return PREFLIGHT_RESPONSE
     
     try:
-        conn = get_db_connection()
+        with trace_phase('db_connect'):
+            conn = db_pool.acquire()
         cur = conn.cursor()
         
         if method == 'GET':
             params = event.get('queryStringParameters') or {}
             team_id = params.get('team_id')
+            if 'changes_since' in params:
+                return list_team_changes(conn, params)
+            if params.get('history'):
+                return standings_history_response(event, cur, params)
+            if params.get('leaderboard'):
+                return leaderboard_response(event, cur, params)
             
-            if team_id:
-                cur.execute('''
-                    SELECT * FROM t_p5773343_football_league_app.wmfl_tournament_teams 
-                    WHERE team_id = %s AND is_active = true
-                ''', (team_id,))
-                team = cur.fetchone()
-                
-                if not team:
-                    return {
-                        'statusCode': 404,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Team not found'}),
-                        'isBase64Encoded': False
-                    }
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(dict(team), ensure_ascii=False, default=str),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute('''
-                SELECT * FROM t_p5773343_football_league_app.wmfl_tournament_teams 
-                WHERE is_active = true 
-                ORDER BY points DESC, goal_difference DESC, goals_for DESC
-            ''')
-            teams = cur.fetchall()
+            version, horizon = teams_version(cur, params.get('tournament_id'))
             
-            teams_list = [dict(team) for team in teams]
+            if team_id:
+                return cached_response(event, params, version, lambda: get_team(cur, team_id))
             
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(teams_list, ensure_ascii=False, default=str),
-                'isBase64Encoded': False
-            }
+            change_cursor = {'X-Change-Cursor': encode_change_cursor(horizon, 0)}
+            return cached_response(event, params, version, lambda: list_teams(cur, params), change_cursor)
         
         elif method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
             
-            required_fields = ['team_name']
-            for field in required_fields:
-                if field not in body_data:
-                    return {
-                        'statusCode': 400,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': f'Missing required field: {field}'}),
-                        'isBase64Encoded': False
-                    }
+            if 'items' in body_data:
+                return apply_batch(conn, body_data['items'])
             
-            cur.execute('''
-                INSERT INTO t_p5773343_football_league_app.wmfl_tournament_teams 
-                (team_id, team_name, team_short_name, team_logo, city, stadium, 
-                 matches_played, wins, draws, losses, goals_for, goals_against, 
-                 rating, position, form, streak, home_wins, home_draws, home_losses, 
-                 away_wins, away_draws, away_losses, yellow_cards, red_cards, 
-                 tournament_id, season, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, team_id, team_name, points, goal_difference
-            ''', (
-                body_data.get('team_id'),
-                body_data['team_name'],
-                body_data.get('team_short_name'),
-                body_data.get('team_logo'),
-                body_data.get('city'),
-                body_data.get('stadium'),
-                body_data.get('matches_played', 0),
-                body_data.get('wins', 0),
-                body_data.get('draws', 0),
-                body_data.get('losses', 0),
-                body_data.get('goals_for', 0),
-                body_data.get('goals_against', 0),
-                body_data.get('rating', 1500),
-                body_data.get('position'),
-                body_data.get('form'),
-                body_data.get('streak'),
-                body_data.get('home_wins', 0),
-                body_data.get('home_draws', 0),
-                body_data.get('home_losses', 0),
-                body_data.get('away_wins', 0),
-                body_data.get('away_draws', 0),
-                body_data.get('away_losses', 0),
-                body_data.get('yellow_cards', 0),
-                body_data.get('red_cards', 0),
-                body_data.get('tournament_id', 1056456),
-                body_data.get('season', '2024/2025'),
-                body_data.get('is_active', True)
-            ))
+            fields, error = validate_team_insert(body_data)
+            if error:
+                return bad_request(error)
             
-            new_team = cur.fetchone()
+            try:
+                new_team = insert_teams(cur, [team_insert_row(fields)])[0]
+            except psycopg2.IntegrityError as e:
+                conn.rollback()
+                return json_response(409, {'error': write_error(e)})
+            if new_team is None:
+                conn.rollback()
+                return json_response(409, {'error': DUPLICATE_TEAM_ERROR})
             conn.commit()
+            response_cache.invalidate()
             
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(new_team), ensure_ascii=False, default=str),
-                'isBase64Encoded': False
-            }
+            return json_response(201, new_team)
         
         elif method == 'PUT':
             body_data = json.loads(event.get('body', '{}'))
             team_id = body_data.get('team_id')
             
             if not team_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'team_id is required'}),
-                    'isBase64Encoded': False
-                }
-            
-            update_fields = []
-            values = []
+                return json_response(400, {'error': 'team_id is required'})
             
-            allowed_fields = [
-                'team_name', 'team_short_name', 'team_logo', 'city', 'stadium',
-                'matches_played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
-                'rating', 'position', 'form', 'streak', 'home_wins', 'home_draws', 
-                'home_losses', 'away_wins', 'away_draws', 'away_losses', 
-                'yellow_cards', 'red_cards', 'season', 'is_active'
-            ]
+            fields, error = coerce_team_fields(body_data, UPDATABLE_FIELDS)
+            if error:
+                return bad_request(error)
             
-            for field in allowed_fields:
-                if field in body_data:
-                    update_fields.append(f"{field} = %s")
-                    values.append(body_data[field])
+            update_fields = [f"{field} = %s" for field in fields]
+            values = list(fields.values())
             
             if not update_fields:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'No fields to update'}),
-                    'isBase64Encoded': False
-                }
+                return json_response(400, {'error': 'No fields to update'})
             
             update_fields.append("updated_at = CURRENT_TIMESTAMP")
             values.append(team_id)
+            lock_team_standings(cur, [team_id])
             
             query = f'''
                 UPDATE t_p5773343_football_league_app.wmfl_tournament_teams 
@@ -189,38 +683,29 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 RETURNING id, team_id, team_name, points, goal_difference
             '''
             
-            cur.execute(query, values)
+            try:
+                cur.execute(query, values)
+            except psycopg2.IntegrityError as e:
+                conn.rollback()
+                return json_response(409, {'error': write_error(e)})
             updated_team = cur.fetchone()
             
             if not updated_team:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Team not found'}),
-                    'isBase64Encoded': False
-                }
+                return json_response(404, {'error': 'Team not found'})
             
             conn.commit()
+            response_cache.invalidate()
             
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(updated_team), ensure_ascii=False, default=str),
-                'isBase64Encoded': False
-            }
+            return json_response(200, dict(updated_team))
         
         elif method == 'DELETE':
             params = event.get('queryStringParameters') or {}
             team_id = params.get('team_id')
             
             if not team_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'team_id is required'}),
-                    'isBase64Encoded': False
-                }
+                return json_response(400, {'error': 'team_id is required'})
             
+            lock_team_standings(cur, [team_id])
             cur.execute('''
                 UPDATE t_p5773343_football_league_app.wmfl_tournament_teams 
                 SET is_active = false, updated_at = CURRENT_TIMESTAMP
@@ -231,40 +716,26 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             deleted_team = cur.fetchone()
             
             if not deleted_team:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Team not found'}),
-                    'isBase64Encoded': False
-                }
+                return json_response(404, {'error': 'Team not found'})
             
             conn.commit()
+            response_cache.invalidate()
             
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'message': 'Team deleted', 'team': dict(deleted_team)}, ensure_ascii=False),
-                'isBase64Encoded': False
-            }
+            return json_response(200, {'message': 'Team deleted', 'team': dict(deleted_team)})
         
         else:
-            return {
-                'statusCode': 405,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'}),
-                'isBase64Encoded': False
-            }
+            return METHOD_NOT_ALLOWED_RESPONSE
     
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)}),
-            'isBase64Encoded': False
-        }
+        return json_response(500, {'error': str(e)})
     
     finally:
         if 'cur' in locals():
             cur.close()
         if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            db_pool.release(conn)
+
+def request_stats() -> Dict[str, Any]:
+    return {'db_pool': db_pool.snapshot(), 'response_cache': response_cache.snapshot()}
+
+handler = traced_handler('wmfl-teams', route, request_stats)
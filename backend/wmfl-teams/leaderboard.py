@@ -0,0 +1,109 @@
+'''
+Business: Рейтинг команд WMFL поверх всех турниров или внутри сезона - лидеры и место команды с соседями
+Args: курсор psycopg2 (RealDictCursor), сезон (None - все сезоны), размер страницы и ключ продолжения или ID команды и ширина окна
+Returns: строки рейтинга с местом по убыванию (rating, id); место - 1 + число активных команд с рейтингом выше (равные делят место) по корзинам wmfl_rating_buckets
+'''
+
+from typing import Any, Dict, List, Optional, Tuple
+
+ALL_SEASONS = '*'
+ENTRY_COLUMNS = ('id', 'team_id', 'team_name', 'tournament_id', 'season', 'rating', 'points', 'matches_played')
+SELECTED_COLUMNS = ', '.join(f't.{column}' for column in ENTRY_COLUMNS)
+
+# Места считаются по корзинам рейтинга сезона не ниже самой низкой строки
+# страницы: полосы корзины складываются, затем нарастающая сумма сверху вниз
+# минус своя корзина. Это проход по корзинам выше страницы, а не
+# логарифмический поиск: для нижних мест читаются все корзины сезона. Корзины
+# есть только у текущих рейтингов (пустые удаляются, полосы сворачивает
+# обслуживание wmfl-sync), поэтому стоимость ограничена диапазоном рейтинга и
+# от числа команд не зависит.
+RANKED_PAGE_SQL = '''
+    WITH page AS ({page_sql}),
+    ranked AS MATERIALIZED (
+        SELECT rating, (SUM(SUM(teams)) OVER (ORDER BY rating DESC) - SUM(teams) + 1)::int AS rank
+        FROM t_p5773343_football_league_app.wmfl_rating_buckets
+        WHERE season = %(season)s AND rating >= (SELECT MIN(rating) FROM page) AND teams <> 0
+        GROUP BY rating
+    )
+    SELECT totals.total, entries.*
+    FROM (
+        SELECT COALESCE(SUM(teams), 0)::int AS total
+        FROM t_p5773343_football_league_app.wmfl_rating_buckets
+        WHERE season = %(season)s
+    ) AS totals
+    LEFT JOIN (
+        SELECT page.*, ranked.rank FROM page JOIN ranked ON ranked.rating = page.rating
+    ) AS entries ON true
+    ORDER BY entries.page_order
+'''
+
+def scope_filter(season: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    if season is None:
+        return '', {}
+    return 'AND t.season = %(scope)s', {'scope': season}
+
+def rows_with_ranks(cur, season: Optional[str], page_sql: str, values: Dict[str, Any]) -> Tuple[int, List[Dict[str, Any]]]:
+    cur.execute(RANKED_PAGE_SQL.format(page_sql=page_sql), dict(values, season=season or ALL_SEASONS))
+    rows = cur.fetchall()
+    return rows[0]['total'], [row for row in rows if row['id'] is not None]
+
+def entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {'rank': row['rank'], **{column: row[column] for column in ENTRY_COLUMNS}}
+
+def top(cur, season: Optional[str], limit: int, after: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    scope, values = scope_filter(season)
+    keyset = ''
+    if after is not None:
+        keyset = 'AND (t.rating, t.id) < (%(after_rating)s, %(after_id)s)'
+        values.update(after_rating=after[0], after_id=after[1])
+    
+    page_sql = f'''
+        SELECT {SELECTED_COLUMNS}, ROW_NUMBER() OVER (ORDER BY t.rating DESC, t.id DESC) AS page_order
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.is_active = true {scope} {keyset}
+        ORDER BY t.rating DESC, t.id DESC
+        LIMIT %(limit)s
+    '''
+    total, rows = rows_with_ranks(cur, season, page_sql, dict(values, limit=limit + 1))
+    entries = [entry(row) for row in rows[:limit]]
+    
+    next_key = None
+    if len(rows) > limit:
+        next_key = (entries[-1]['rating'], entries[-1]['id'])
+    return {'season': season, 'total': total, 'entries': entries, 'next_key': next_key}
+
+def around(cur, team_id: int, season: Optional[str], window: int) -> Optional[Dict[str, Any]]:
+    scope, values = scope_filter(season)
+    cur.execute(f'''
+        SELECT t.id, t.rating FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.team_id = %(team_id)s AND t.is_active = true {scope}
+    ''', dict(values, team_id=team_id))
+    anchor = cur.fetchone()
+    if anchor is None:
+        return None
+    
+    # Соседи берутся двумя проходами индекса (rating, id) от строки команды:
+    # сравнение строк сразу ставит проход на место, равные по рейтингу не перебираются
+    page_sql = f'''
+        SELECT t.*, ROW_NUMBER() OVER (ORDER BY t.rating DESC, t.id DESC) AS page_order
+        FROM (
+            (SELECT {SELECTED_COLUMNS}, 'above' AS side FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+             WHERE t.is_active = true {scope} AND (t.rating, t.id) > (%(rating)s, %(id)s)
+             ORDER BY t.rating, t.id
+             LIMIT %(window)s)
+            UNION ALL
+            (SELECT {SELECTED_COLUMNS}, 'team' AS side FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+             WHERE t.id = %(id)s)
+            UNION ALL
+            (SELECT {SELECTED_COLUMNS}, 'below' AS side FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+             WHERE t.is_active = true {scope} AND (t.rating, t.id) < (%(rating)s, %(id)s)
+             ORDER BY t.rating DESC, t.id DESC
+             LIMIT %(window)s)
+        ) AS t
+    '''
+    total, rows = rows_with_ranks(cur, season, page_sql, dict(values, rating=anchor['rating'], id=anchor['id'], window=window))
+    
+    sides: Dict[str, List[Dict[str, Any]]] = {'above': [], 'team': [], 'below': []}
+    for row in rows:
+        sides[row['side']].append(entry(row))
+    return {'season': season, 'total': total, 'team': sides['team'][0], 'above': sides['above'], 'below': sides['below']}
@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_import_state (
+    tournament_id INTEGER PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash VARCHAR(64),
+    standings_hash VARCHAR(64),
+    skipped_count INTEGER NOT NULL DEFAULT 0,
+    last_checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_changed_at TIMESTAMP
+);
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_import_state IS 'Состояние импорта турниров WMFL для условных запросов';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_import_state.body_hash IS 'SHA-256 тела страницы таблицы турнира';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_import_state.standings_hash IS 'SHA-256 распарсенной таблицы турнира';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_import_state.skipped_count IS 'Сколько импортов пропущено без изменений';
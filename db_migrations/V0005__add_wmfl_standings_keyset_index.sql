@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_standings_keyset
+    ON t_p5773343_football_league_app.wmfl_tournament_teams
+    (tournament_id, points DESC, goal_difference DESC, goals_for DESC, id DESC)
+    WHERE is_active = true;
+
+COMMENT ON INDEX t_p5773343_football_league_app.idx_wmfl_tournament_standings_keyset IS 'Keyset-пагинация таблицы турнира по очкам, разнице и забитым мячам';
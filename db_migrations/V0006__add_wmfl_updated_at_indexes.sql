@@ -0,0 +1,6 @@
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_updated_at
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(updated_at);
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_id_updated_at
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(tournament_id, updated_at);
+
+COMMENT ON INDEX t_p5773343_football_league_app.idx_wmfl_tournament_id_updated_at IS 'Версия данных турнира для ETag: MAX(updated_at) без сканирования таблицы';
@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_matches (
+    id SERIAL PRIMARY KEY,
+    tournament_id INTEGER NOT NULL,
+    home_team_id INTEGER NOT NULL,
+    away_team_id INTEGER NOT NULL,
+    home_goals INTEGER,
+    away_goals INTEGER,
+    played_at TIMESTAMP NOT NULL,
+    rated_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_wmfl_matches_tournament_played ON t_p5773343_football_league_app.wmfl_matches(tournament_id, played_at, id);
+CREATE INDEX idx_wmfl_matches_unrated ON t_p5773343_football_league_app.wmfl_matches(played_at, id)
+    WHERE rated_at IS NULL AND home_goals IS NOT NULL;
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_matches IS 'Матчи турниров WMFL';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_matches.rated_at IS 'Когда результат матча учтён в рейтинге Эло (NULL - ещё не учтён)';
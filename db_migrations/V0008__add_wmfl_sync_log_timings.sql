@@ -0,0 +1,8 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_sync_log
+    ADD COLUMN IF NOT EXISTS run_type VARCHAR(20) NOT NULL DEFAULT 'sync',
+    ADD COLUMN IF NOT EXISTS duration_ms INTEGER,
+    ADD COLUMN IF NOT EXISTS phase_timings JSONB;
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.run_type IS 'Тип запуска: sync (синхронизация) или import (импорт из WMFL)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.duration_ms IS 'Длительность запуска в миллисекундах';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.phase_timings IS 'Длительность фаз запуска (fetch, parse, write, db, ...) в миллисекундах';
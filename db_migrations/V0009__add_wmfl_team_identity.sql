@@ -0,0 +1,47 @@
+CREATE SEQUENCE IF NOT EXISTS t_p5773343_football_league_app.wmfl_tournament_teams_team_id_seq
+    START WITH 1000000
+    OWNED BY t_p5773343_football_league_app.wmfl_tournament_teams.team_id;
+
+ALTER TABLE t_p5773343_football_league_app.wmfl_tournament_teams
+    ALTER COLUMN team_id SET DEFAULT nextval('t_p5773343_football_league_app.wmfl_tournament_teams_team_id_seq'),
+    ADD COLUMN IF NOT EXISTS team_key VARCHAR(255),
+    ADD COLUMN IF NOT EXISTS wmfl_team_id INTEGER;
+
+UPDATE t_p5773343_football_league_app.wmfl_tournament_teams
+SET team_key = lower(btrim(regexp_replace(translate(team_name, 'Ёё', 'Ее'), '\s+', ' ', 'g'), ' '));
+
+WITH ranked AS (
+    SELECT id, team_id,
+           FIRST_VALUE(team_id) OVER w AS survivor_team_id,
+           ROW_NUMBER() OVER w AS duplicate_rank
+    FROM t_p5773343_football_league_app.wmfl_tournament_teams
+    WINDOW w AS (
+        PARTITION BY tournament_id, team_key
+        ORDER BY updated_at DESC NULLS LAST, id DESC
+    )
+),
+duplicates AS (
+    SELECT id, team_id, survivor_team_id FROM ranked WHERE duplicate_rank > 1
+),
+remapped AS (
+    UPDATE t_p5773343_football_league_app.wmfl_matches AS m
+    SET home_team_id = COALESCE(
+            (SELECT d.survivor_team_id FROM duplicates d WHERE d.team_id = m.home_team_id), m.home_team_id),
+        away_team_id = COALESCE(
+            (SELECT d.survivor_team_id FROM duplicates d WHERE d.team_id = m.away_team_id), m.away_team_id)
+    WHERE m.home_team_id IN (SELECT team_id FROM duplicates)
+       OR m.away_team_id IN (SELECT team_id FROM duplicates)
+)
+DELETE FROM t_p5773343_football_league_app.wmfl_tournament_teams AS t
+USING duplicates AS d
+WHERE t.id = d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_wmfl_tournament_teams_key
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(tournament_id, team_key);
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_teams_wmfl_id
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(tournament_id, wmfl_team_id)
+    WHERE wmfl_team_id IS NOT NULL;
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.team_key IS 'Нормализованное название команды: ключ идентичности внутри турнира';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.wmfl_team_id IS 'ID команды на wmfl.ru из ссылки в таблице (NULL - ссылки не было)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.team_id IS 'Стабильный ID команды; новые строки получают значение из последовательности';
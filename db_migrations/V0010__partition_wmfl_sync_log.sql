@@ -0,0 +1,79 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_sync_log RENAME TO wmfl_sync_log_legacy;
+ALTER SEQUENCE t_p5773343_football_league_app.wmfl_sync_log_id_seq OWNED BY NONE;
+
+CREATE TABLE t_p5773343_football_league_app.wmfl_sync_log (
+    id INTEGER NOT NULL DEFAULT nextval('t_p5773343_football_league_app.wmfl_sync_log_id_seq'),
+    tournament_id INTEGER NOT NULL,
+    sync_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    status VARCHAR(50) NOT NULL,
+    message TEXT,
+    teams_updated INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    run_type VARCHAR(20) NOT NULL DEFAULT 'sync',
+    duration_ms INTEGER,
+    phase_timings JSONB,
+    PRIMARY KEY (id, sync_time)
+) PARTITION BY RANGE (sync_time);
+
+CREATE TABLE t_p5773343_football_league_app.wmfl_sync_log_default
+    PARTITION OF t_p5773343_football_league_app.wmfl_sync_log DEFAULT;
+
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR month_start IN
+        SELECT generate_series(
+            date_trunc('month', LEAST(
+                COALESCE((SELECT MIN(sync_time) FROM t_p5773343_football_league_app.wmfl_sync_log_legacy), CURRENT_TIMESTAMP),
+                CURRENT_TIMESTAMP
+            )),
+            date_trunc('month', CURRENT_TIMESTAMP + INTERVAL '1 month'),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.%I PARTITION OF t_p5773343_football_league_app.wmfl_sync_log FOR VALUES FROM (%L) TO (%L)',
+            'wmfl_sync_log_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO t_p5773343_football_league_app.wmfl_sync_log
+(id, tournament_id, sync_time, status, message, teams_updated, created_at, run_type, duration_ms, phase_timings)
+SELECT id, tournament_id, COALESCE(sync_time, created_at, CURRENT_TIMESTAMP), status, message, teams_updated,
+       created_at, run_type, duration_ms, phase_timings
+FROM t_p5773343_football_league_app.wmfl_sync_log_legacy;
+
+DROP TABLE t_p5773343_football_league_app.wmfl_sync_log_legacy;
+ALTER SEQUENCE t_p5773343_football_league_app.wmfl_sync_log_id_seq OWNED BY t_p5773343_football_league_app.wmfl_sync_log.id;
+
+CREATE INDEX idx_wmfl_sync_log_time ON t_p5773343_football_league_app.wmfl_sync_log(sync_time DESC, id DESC);
+CREATE INDEX idx_wmfl_sync_log_tournament ON t_p5773343_football_league_app.wmfl_sync_log(tournament_id, sync_time DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_sync_log_rollup (
+    granularity VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    tournament_id INTEGER NOT NULL,
+    run_type VARCHAR(20) NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    teams_updated INTEGER NOT NULL DEFAULT 0,
+    total_duration_ms BIGINT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (granularity, bucket_start, tournament_id, run_type)
+);
+
+CREATE INDEX idx_wmfl_sync_log_rollup_tournament ON t_p5773343_football_league_app.wmfl_sync_log_rollup(tournament_id, granularity, bucket_start DESC);
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_sync_log IS 'Лог синхронизации данных турниров WMFL (помесячные партиции по sync_time)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.status IS 'Статус синхронизации: success, error, warning';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.run_type IS 'Тип запуска: sync (синхронизация) или import (импорт из WMFL)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.duration_ms IS 'Длительность запуска в миллисекундах';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log.phase_timings IS 'Длительность фаз запуска (fetch, parse, write, db, ...) в миллисекундах';
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_sync_log_rollup IS 'Почасовые и суточные сводки лога синхронизации по турнирам';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log_rollup.granularity IS 'Размер интервала: hour или day';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_log_rollup.total_duration_ms IS 'Суммарная длительность запусков интервала (среднее = total_duration_ms / runs)';
@@ -0,0 +1,41 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_tournament_teams
+    ADD COLUMN IF NOT EXISTS change_xid XID8;
+
+UPDATE t_p5773343_football_league_app.wmfl_tournament_teams
+SET change_xid = pg_current_xact_id()
+WHERE change_xid IS NULL;
+
+ALTER TABLE t_p5773343_football_league_app.wmfl_tournament_teams
+    ALTER COLUMN change_xid SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_teams_change
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(change_xid, id);
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_teams_stamp_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_teams_notify_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('wmfl_teams_changed', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_stamp_change ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_stamp_change
+    BEFORE INSERT OR UPDATE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    FOR EACH ROW EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_stamp_change();
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_notify_change ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_notify_change();
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.change_xid IS 'Транзакция последнего изменения строки: курсор ленты изменений (строки ниже xmin снимка уже окончательны)';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_teams_notify_change() IS 'NOTIFY wmfl_teams_changed после любой записи в таблицу команд (будит long-poll в wmfl-teams)';
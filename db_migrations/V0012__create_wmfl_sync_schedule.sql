@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_sync_schedule (
+    tournament_id INTEGER PRIMARY KEY,
+    last_synced_at TIMESTAMP,
+    last_duration_ms INTEGER,
+    sync_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_sync_cursor (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    pending INTEGER[] NOT NULL DEFAULT '{}',
+    run_started_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_sync_schedule IS 'Когда турнир последний раз синхронизировался планировщиком';
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_sync_cursor IS 'Курсор планировщика синхронизации: турниры текущего прохода, не успевшие в бюджет времени';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_sync_cursor.pending IS 'Турниры, которые следующий вызов обработает первыми (порядок пересчитывается по приоритету)';
@@ -0,0 +1,22 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_standings_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    tournament_id INTEGER NOT NULL,
+    taken_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    is_keyframe BOOLEAN NOT NULL,
+    team_ids INTEGER[] NOT NULL,
+    positions SMALLINT[] NOT NULL,
+    points INTEGER[] NOT NULL,
+    goal_differences INTEGER[] NOT NULL,
+    ratings INTEGER[] NOT NULL,
+    matches_played SMALLINT[] NOT NULL,
+    removed_team_ids INTEGER[] NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX idx_wmfl_standings_snapshots_tournament ON t_p5773343_football_league_app.wmfl_standings_snapshots(tournament_id, id);
+CREATE INDEX idx_wmfl_standings_snapshots_keyframes ON t_p5773343_football_league_app.wmfl_standings_snapshots(tournament_id, taken_at, id)
+    WHERE is_keyframe;
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_standings_snapshots IS 'История турнирных таблиц: полный снимок (keyframe) и дельты к нему, по массиву на поле';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_standings_snapshots.is_keyframe IS 'true - полная таблица, false - только команды, изменившиеся с прошлого снимка';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_standings_snapshots.team_ids IS 'team_id команд снимка; i-й элемент остальных массивов относится к i-й команде';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_standings_snapshots.removed_team_ids IS 'Команды, выбывшие из таблицы с прошлого снимка';
@@ -0,0 +1,171 @@
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_rank_standings(p_tournament_ids INTEGER[])
+RETURNS TABLE (tournament_id INTEGER, teams_count INTEGER, teams_updated INTEGER) AS $$
+    WITH teams AS (
+        SELECT t.id, t.tournament_id, t.team_id, t.team_name, t.points, t.goal_difference, t.goals_for, t.wins
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.is_active = true
+          AND (p_tournament_ids IS NULL OR t.tournament_id = ANY(p_tournament_ids))
+    ),
+    head_to_head AS (
+        SELECT m.tournament_id, side.team_id,
+               SUM(CASE WHEN side.scored > side.conceded THEN 3 WHEN side.scored = side.conceded THEN 1 ELSE 0 END) AS points,
+               SUM(side.scored - side.conceded) AS goal_difference,
+               SUM(side.scored) AS goals_for
+        FROM t_p5773343_football_league_app.wmfl_matches m
+        JOIN teams home ON home.tournament_id = m.tournament_id AND home.team_id = m.home_team_id
+        JOIN teams away ON away.tournament_id = m.tournament_id AND away.team_id = m.away_team_id
+        CROSS JOIN LATERAL (
+            VALUES (m.home_team_id, m.home_goals, m.away_goals), (m.away_team_id, m.away_goals, m.home_goals)
+        ) AS side(team_id, scored, conceded)
+        WHERE away.points = home.points
+          AND m.home_goals IS NOT NULL AND m.away_goals IS NOT NULL
+        GROUP BY m.tournament_id, side.team_id
+    ),
+    ranked AS (
+        SELECT teams.id, teams.tournament_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY teams.tournament_id
+                   ORDER BY teams.points DESC,
+                            COALESCE(h.points, 0) DESC, COALESCE(h.goal_difference, 0) DESC, COALESCE(h.goals_for, 0) DESC,
+                            teams.goal_difference DESC, teams.goals_for DESC, teams.wins DESC, teams.team_name, teams.id
+               )::int AS new_position
+        FROM teams
+        LEFT JOIN head_to_head h ON h.tournament_id = teams.tournament_id AND h.team_id = teams.team_id
+    ),
+    updated AS (
+        UPDATE t_p5773343_football_league_app.wmfl_tournament_teams t
+        SET position = ranked.new_position, updated_at = CURRENT_TIMESTAMP
+        FROM ranked
+        WHERE t.id = ranked.id AND t.position IS DISTINCT FROM ranked.new_position
+        RETURNING t.tournament_id
+    ),
+    cleared AS (
+        UPDATE t_p5773343_football_league_app.wmfl_tournament_teams t
+        SET position = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE t.is_active IS NOT TRUE AND t.position IS NOT NULL
+          AND (p_tournament_ids IS NULL OR t.tournament_id = ANY(p_tournament_ids))
+        RETURNING t.tournament_id
+    ),
+    updated_counts AS (
+        SELECT changed.tournament_id, COUNT(*) AS teams_updated
+        FROM (SELECT * FROM updated UNION ALL SELECT * FROM cleared) AS changed
+        GROUP BY changed.tournament_id
+    )
+    SELECT ranked.tournament_id,
+           COUNT(*)::int AS teams_count,
+           COALESCE(MAX(updated_counts.teams_updated), 0)::int AS teams_updated
+    FROM ranked
+    LEFT JOIN updated_counts ON updated_counts.tournament_id = ranked.tournament_id
+    GROUP BY ranked.tournament_id
+    ORDER BY ranked.tournament_id
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings()
+RETURNS TRIGGER AS $$
+DECLARE
+    affected INTEGER[];
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT n.tournament_id) INTO affected FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT o.tournament_id) INTO affected FROM old_rows o WHERE o.position IS NOT NULL;
+    ELSE
+        SELECT array_agg(DISTINCT changed.tournament_id) INTO affected
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES (o.tournament_id), (n.tournament_id)) AS changed(tournament_id)
+        WHERE (o.tournament_id, o.is_active, o.team_id, o.team_name, o.points, o.goal_difference, o.goals_for, o.wins, o.position)
+              IS DISTINCT FROM
+              (n.tournament_id, n.is_active, n.team_id, n.team_name, n.points, n.goal_difference, n.goals_for, n.wins, n.position);
+    END IF;
+
+    IF affected IS NOT NULL THEN
+        PERFORM * FROM t_p5773343_football_league_app.wmfl_rank_standings(affected);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings()
+RETURNS TRIGGER AS $$
+DECLARE
+    affected INTEGER[];
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT n.tournament_id) INTO affected FROM new_rows n WHERE n.home_goals IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT o.tournament_id) INTO affected FROM old_rows o WHERE o.home_goals IS NOT NULL;
+    ELSE
+        SELECT array_agg(DISTINCT changed.tournament_id) INTO affected
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES (o.tournament_id), (n.tournament_id)) AS changed(tournament_id)
+        WHERE (o.tournament_id, o.home_team_id, o.away_team_id, o.home_goals, o.away_goals)
+              IS DISTINCT FROM
+              (n.tournament_id, n.home_team_id, n.away_team_id, n.home_goals, n.away_goals);
+    END IF;
+
+    IF affected IS NOT NULL THEN
+        PERFORM * FROM t_p5773343_football_league_app.wmfl_rank_standings(affected);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_standings_insert ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_standings_insert
+    AFTER INSERT ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings();
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_standings_update ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_standings_update
+    AFTER UPDATE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings();
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_standings_delete ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_standings_delete
+    AFTER DELETE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings();
+
+DROP TRIGGER IF EXISTS trg_wmfl_matches_standings_insert ON t_p5773343_football_league_app.wmfl_matches;
+CREATE TRIGGER trg_wmfl_matches_standings_insert
+    AFTER INSERT ON t_p5773343_football_league_app.wmfl_matches
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings();
+
+DROP TRIGGER IF EXISTS trg_wmfl_matches_standings_update ON t_p5773343_football_league_app.wmfl_matches;
+CREATE TRIGGER trg_wmfl_matches_standings_update
+    AFTER UPDATE ON t_p5773343_football_league_app.wmfl_matches
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings();
+
+DROP TRIGGER IF EXISTS trg_wmfl_matches_standings_delete ON t_p5773343_football_league_app.wmfl_matches;
+CREATE TRIGGER trg_wmfl_matches_standings_delete
+    AFTER DELETE ON t_p5773343_football_league_app.wmfl_matches
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings();
+
+SELECT * FROM t_p5773343_football_league_app.wmfl_rank_standings(NULL);
+
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_standings_position
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(tournament_id, position, id)
+    WHERE is_active = true;
+
+DROP INDEX IF EXISTS t_p5773343_football_league_app.idx_wmfl_tournament_standings_keyset;
+
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_rank_standings(INTEGER[]) IS 'Места команд в турнирах (NULL - во всех): очки, личные встречи равных по очкам (очки, разница, забитые), разница мячей, забитые, победы, название. Переписывает только изменившиеся места';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings() IS 'Пересчёт мест только в турнирах, где запись изменила очки, разницу, забитые, победы, название или активность команды';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings() IS 'Пересчёт мест в турнирах, где изменились результаты матчей (влияют на личные встречи)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.position IS 'Место в турнире: поддерживается триггерами в той же транзакции, что и запись (NULL у неактивных команд)';
+COMMENT ON INDEX t_p5773343_football_league_app.idx_wmfl_tournament_standings_position IS 'Таблица турнира по местам: чтение и keyset-пагинация без сортировки';
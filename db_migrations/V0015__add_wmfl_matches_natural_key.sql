@@ -0,0 +1,15 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_matches
+    ADD COLUMN IF NOT EXISTS round INTEGER,
+    ADD COLUMN IF NOT EXISTS leg SMALLINT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_wmfl_matches_natural_key
+    ON t_p5773343_football_league_app.wmfl_matches(tournament_id, home_team_id, away_team_id, leg)
+    WHERE leg IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_wmfl_matches_home_team
+    ON t_p5773343_football_league_app.wmfl_matches(tournament_id, home_team_id);
+CREATE INDEX IF NOT EXISTS idx_wmfl_matches_away_team
+    ON t_p5773343_football_league_app.wmfl_matches(tournament_id, away_team_id);
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_matches.round IS 'Тур матча по странице WMFL (NULL - не указан)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_matches.leg IS 'Номер встречи этих хозяев с этими гостями в турнире: вместе с турниром и командами - естественный ключ загружаемых матчей (NULL у матчей, внесённых вручную)';
+COMMENT ON INDEX t_p5773343_football_league_app.uq_wmfl_matches_natural_key IS 'Идемпотентная загрузка матчей: повторная загрузка обновляет матч, а не дублирует его';
@@ -0,0 +1,107 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_rating_buckets (
+    season VARCHAR(50) NOT NULL,
+    rating INTEGER NOT NULL,
+    teams INTEGER NOT NULL,
+    PRIMARY KEY (season, rating)
+);
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(p_seasons TEXT[], p_ratings INTEGER[], p_deltas INTEGER[])
+RETURNS VOID AS $$
+    WITH changes AS (
+        SELECT scope.season, c.rating, SUM(c.delta)::int AS delta
+        FROM unnest(p_seasons, p_ratings, p_deltas) AS c(season, rating, delta)
+        CROSS JOIN LATERAL (VALUES ('*'), (COALESCE(c.season, ''))) AS scope(season)
+        GROUP BY scope.season, c.rating
+        HAVING SUM(c.delta) <> 0
+    ),
+    applied AS (
+        INSERT INTO t_p5773343_football_league_app.wmfl_rating_buckets AS b (season, rating, teams)
+        SELECT season, rating, delta FROM changes
+        ON CONFLICT (season, rating) DO UPDATE SET teams = b.teams + EXCLUDED.teams
+        RETURNING b.season, b.rating, b.teams
+    )
+    DELETE FROM t_p5773343_football_league_app.wmfl_rating_buckets b
+    USING applied
+    WHERE applied.teams = 0 AND b.season = applied.season AND b.rating = applied.rating
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_teams_maintain_rating_buckets()
+RETURNS TRIGGER AS $$
+DECLARE
+    seasons TEXT[];
+    ratings INTEGER[];
+    deltas INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(n.season), array_agg(n.rating), array_agg(1)
+        INTO seasons, ratings, deltas
+        FROM new_rows n WHERE n.is_active IS TRUE;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(o.season), array_agg(o.rating), array_agg(-1)
+        INTO seasons, ratings, deltas
+        FROM old_rows o WHERE o.is_active IS TRUE;
+    ELSE
+        SELECT array_agg(side.season), array_agg(side.rating), array_agg(side.delta)
+        INTO seasons, ratings, deltas
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (
+            VALUES (o.season, o.rating, -1, o.is_active IS TRUE), (n.season, n.rating, 1, n.is_active IS TRUE)
+        ) AS side(season, rating, delta, counted)
+        WHERE side.counted
+          AND (o.season, o.rating, o.is_active IS TRUE) IS DISTINCT FROM (n.season, n.rating, n.is_active IS TRUE);
+    END IF;
+
+    IF seasons IS NOT NULL THEN
+        PERFORM t_p5773343_football_league_app.wmfl_apply_rating_deltas(seasons, ratings, deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_rating_rank(p_season TEXT, p_rating INTEGER)
+RETURNS INTEGER AS $$
+    SELECT 1 + COALESCE(SUM(teams), 0)::int
+    FROM t_p5773343_football_league_app.wmfl_rating_buckets
+    WHERE season = COALESCE(p_season, '*') AND rating > p_rating
+$$ LANGUAGE sql STABLE;
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_rating_buckets_insert ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_rating_buckets_insert
+    AFTER INSERT ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_maintain_rating_buckets();
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_rating_buckets_update ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_rating_buckets_update
+    AFTER UPDATE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_maintain_rating_buckets();
+
+DROP TRIGGER IF EXISTS trg_wmfl_teams_rating_buckets_delete ON t_p5773343_football_league_app.wmfl_tournament_teams;
+CREATE TRIGGER trg_wmfl_teams_rating_buckets_delete
+    AFTER DELETE ON t_p5773343_football_league_app.wmfl_tournament_teams
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_teams_maintain_rating_buckets();
+
+TRUNCATE t_p5773343_football_league_app.wmfl_rating_buckets;
+SELECT t_p5773343_football_league_app.wmfl_apply_rating_deltas(array_agg(season), array_agg(rating), array_agg(1))
+FROM t_p5773343_football_league_app.wmfl_tournament_teams
+WHERE is_active IS TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_leaderboard
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(rating, id)
+    WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_wmfl_tournament_season_leaderboard
+    ON t_p5773343_football_league_app.wmfl_tournament_teams(season, rating, id)
+    WHERE is_active = true;
+
+DROP INDEX IF EXISTS t_p5773343_football_league_app.idx_wmfl_tournament_rating;
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_rating_buckets IS 'Число активных команд с каждым рейтингом: место в рейтинге - 1 + сумма корзин выше, без сортировки таблицы команд';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_rating_buckets.season IS 'Сезон корзины: * - все сезоны вместе, пустая строка - команды без сезона';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(TEXT[], INTEGER[], INTEGER[]) IS 'Прибавляет изменения к корзинам сезона и к общим (*), пустые корзины удаляет';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_teams_maintain_rating_buckets() IS 'Поддержка корзин рейтинга в той же транзакции, что и запись: учитываются только строки, где изменились рейтинг, сезон или активность';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_rating_rank(TEXT, INTEGER) IS 'Место рейтинга в сезоне (NULL - среди всех сезонов): 1 + число активных команд с рейтингом выше, равные делят место';
+COMMENT ON INDEX t_p5773343_football_league_app.idx_wmfl_tournament_leaderboard IS 'Лидеры по рейтингу среди всех турниров (обратный проход) и соседи команды: окно начинается сравнением строк (rating, id), без сортировки и перебора равных';
+COMMENT ON INDEX t_p5773343_football_league_app.idx_wmfl_tournament_season_leaderboard IS 'Лидеры сезона по рейтингу и соседи команды внутри сезона без сортировки';
@@ -0,0 +1,14 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_tournament_teams
+    ADD COLUMN IF NOT EXISTS elo_rating DOUBLE PRECISION;
+
+UPDATE t_p5773343_football_league_app.wmfl_tournament_teams AS t
+SET elo_rating = t.rating
+WHERE t.elo_rating IS NULL
+  AND EXISTS (
+      SELECT 1 FROM t_p5773343_football_league_app.wmfl_matches m
+      WHERE m.tournament_id = t.tournament_id
+        AND t.team_id IN (m.home_team_id, m.away_team_id)
+        AND m.rated_at IS NOT NULL
+  );
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.elo_rating IS 'Рейтинг Эло без округления: инкрементальный пересчёт продолжает от него и не накапливает ошибку округления; rating - округлённое значение для выдачи. NULL - учтённых матчей ещё нет, rating считается импортом по очкам (1500 + 10 за очко)';
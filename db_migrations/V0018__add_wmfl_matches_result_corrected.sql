@@ -0,0 +1,8 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_matches
+    ADD COLUMN IF NOT EXISTS result_corrected BOOLEAN NOT NULL DEFAULT false;
+
+CREATE INDEX IF NOT EXISTS idx_wmfl_matches_result_corrected
+    ON t_p5773343_football_league_app.wmfl_matches(tournament_id)
+    WHERE result_corrected;
+
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_matches.result_corrected IS 'Счёт изменён после того, как матч был учтён в рейтинге Эло: старый результат уже вошёл в elo_rating, поэтому турнир пересчитывается целиком, а не инкрементально';
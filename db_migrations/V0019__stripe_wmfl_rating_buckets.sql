@@ -0,0 +1,39 @@
+ALTER TABLE t_p5773343_football_league_app.wmfl_rating_buckets
+    ADD COLUMN IF NOT EXISTS stripe SMALLINT NOT NULL DEFAULT 0;
+
+ALTER TABLE t_p5773343_football_league_app.wmfl_rating_buckets
+    DROP CONSTRAINT IF EXISTS wmfl_rating_buckets_pkey;
+ALTER TABLE t_p5773343_football_league_app.wmfl_rating_buckets
+    ADD PRIMARY KEY (season, rating, stripe);
+
+-- Каждый сеанс пишет в свою полосу корзины (pg_backend_pid() % 8): новые команды
+-- приходят с одним рейтингом, и без полос все записи вставали бы в очередь на
+-- одну строку ('*', 1500). Строки обновляются в порядке (season, rating), чтобы
+-- две транзакции брали блокировки в одном порядке и не попадали в дедлок.
+-- Полоса может уйти в минус (команда добавлена одним сеансом, удалена другим) -
+-- смысл имеет только сумма по полосам; строк не больше 8 на рейтинг сезона.
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(p_seasons TEXT[], p_ratings INTEGER[], p_deltas INTEGER[])
+RETURNS VOID AS $$
+    WITH changes AS (
+        SELECT scope.season, c.rating, SUM(c.delta)::int AS delta
+        FROM unnest(p_seasons, p_ratings, p_deltas) AS c(season, rating, delta)
+        CROSS JOIN LATERAL (VALUES ('*'), (COALESCE(c.season, ''))) AS scope(season)
+        GROUP BY scope.season, c.rating
+        HAVING SUM(c.delta) <> 0
+    ),
+    applied AS (
+        INSERT INTO t_p5773343_football_league_app.wmfl_rating_buckets AS b (season, rating, stripe, teams)
+        SELECT season, rating, (pg_backend_pid() % 8)::smallint, delta FROM changes
+        ORDER BY season, rating
+        ON CONFLICT (season, rating, stripe) DO UPDATE SET teams = b.teams + EXCLUDED.teams
+        RETURNING b.season, b.rating, b.stripe, b.teams
+    )
+    DELETE FROM t_p5773343_football_league_app.wmfl_rating_buckets b
+    USING applied
+    WHERE applied.teams = 0 AND b.season = applied.season AND b.rating = applied.rating AND b.stripe = applied.stripe
+$$ LANGUAGE sql;
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_rating_buckets IS 'Число активных команд с каждым рейтингом по полосам: место в рейтинге - 1 + сумма корзин выше, без сортировки таблицы команд. Стоимость места линейна по числу строк корзин выше рейтинга (различные рейтинги выше x до 8 полос), от числа команд не зависит';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_rating_buckets.stripe IS 'Полоса корзины (pg_backend_pid() % 8) - разносит одновременные записи одного рейтинга по разным строкам; teams в полосе может быть отрицательным, значима сумма по полосам';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(TEXT[], INTEGER[], INTEGER[]) IS 'Прибавляет изменения к полосе сеанса в корзинах сезона и общих (*) в порядке (season, rating), обнулившиеся полосы удаляет';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_rating_rank(TEXT, INTEGER) IS 'Место рейтинга в сезоне (NULL - среди всех сезонов): 1 + число активных команд с рейтингом выше, равные делят место. Суммирует все строки корзин выше рейтинга: для нижних мест это все корзины сезона (до различных рейтингов x 8 строк), не логарифмический поиск';
@@ -0,0 +1,97 @@
+-- Удаление обнулившихся полос - отдельный оператор: в одном операторе с
+-- INSERT ... ON CONFLICT DELETE видит корзины в снимке до обновления и пустые
+-- строки не удалял. Второй оператор SQL-функции видит результат первого.
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(p_seasons TEXT[], p_ratings INTEGER[], p_deltas INTEGER[])
+RETURNS VOID AS $$
+    INSERT INTO t_p5773343_football_league_app.wmfl_rating_buckets AS b (season, rating, stripe, teams)
+    SELECT scope.season, c.rating, (pg_backend_pid() % 8)::smallint, SUM(c.delta)::int
+    FROM unnest(p_seasons, p_ratings, p_deltas) AS c(season, rating, delta)
+    CROSS JOIN LATERAL (VALUES ('*'), (COALESCE(c.season, ''))) AS scope(season)
+    GROUP BY scope.season, c.rating
+    HAVING SUM(c.delta) <> 0
+    ORDER BY scope.season, c.rating
+    ON CONFLICT (season, rating, stripe) DO UPDATE SET teams = b.teams + EXCLUDED.teams;
+
+    DELETE FROM t_p5773343_football_league_app.wmfl_rating_buckets b
+    USING unnest(p_seasons, p_ratings) AS c(season, rating)
+    WHERE b.teams = 0
+      AND b.stripe = pg_backend_pid() % 8
+      AND b.rating = c.rating
+      AND b.season IN ('*', COALESCE(c.season, ''));
+$$ LANGUAGE sql;
+
+-- Сворачивает полосы каждого рейтинга в полосу 0 и убирает рейтинги, которых
+-- больше нет: +1 в одной полосе и -1 в другой иначе остаются навсегда, и
+-- подсчёт места читал бы каждый рейтинг, который когда-либо встречался.
+-- Строки блокируются в том же порядке (season, rating), что и у записи, а
+-- DELETE ... RETURNING возвращает последнюю версию строки, поэтому изменения,
+-- зафиксированные одновременно, не теряются.
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_compact_rating_buckets()
+RETURNS INTEGER AS $$
+DECLARE
+    locked_seasons TEXT[];
+    locked_ratings INTEGER[];
+    locked_stripes SMALLINT[];
+    seasons TEXT[];
+    ratings INTEGER[];
+    totals INTEGER[];
+BEGIN
+    SELECT array_agg(season), array_agg(rating), array_agg(stripe)
+    INTO locked_seasons, locked_ratings, locked_stripes
+    FROM (
+        SELECT b.season, b.rating, b.stripe
+        FROM t_p5773343_football_league_app.wmfl_rating_buckets b
+        WHERE (b.season, b.rating) IN (
+            SELECT season, rating FROM t_p5773343_football_league_app.wmfl_rating_buckets
+            GROUP BY season, rating
+            HAVING COUNT(*) > 1 OR bool_or(teams = 0)
+        )
+        ORDER BY b.season, b.rating, b.stripe
+        FOR UPDATE
+    ) AS locked;
+    
+    IF locked_seasons IS NULL THEN
+        RETURN 0;
+    END IF;
+    
+    -- Удаляются только заблокированные выше строки: новые полосы, появившиеся
+    -- после блокировки, не трогаются и не нарушают порядок блокировок
+    WITH removed AS (
+        DELETE FROM t_p5773343_football_league_app.wmfl_rating_buckets b
+        USING unnest(locked_seasons, locked_ratings, locked_stripes) AS k(season, rating, stripe)
+        WHERE b.season = k.season AND b.rating = k.rating AND b.stripe = k.stripe
+        RETURNING b.season, b.rating, b.teams
+    ),
+    sums AS (
+        SELECT season, rating, SUM(teams)::int AS teams
+        FROM removed GROUP BY season, rating
+        HAVING SUM(teams) <> 0
+    )
+    SELECT array_agg(season ORDER BY season, rating), array_agg(rating ORDER BY season, rating), array_agg(teams ORDER BY season, rating)
+    INTO seasons, ratings, totals
+    FROM sums;
+    
+    IF seasons IS NOT NULL THEN
+        INSERT INTO t_p5773343_football_league_app.wmfl_rating_buckets AS b (season, rating, stripe, teams)
+        SELECT k.season, k.rating, 0, k.teams
+        FROM unnest(seasons, ratings, totals) WITH ORDINALITY AS k(season, rating, teams, n)
+        ORDER BY k.n
+        ON CONFLICT (season, rating, stripe) DO UPDATE SET teams = b.teams + EXCLUDED.teams;
+    END IF;
+    RETURN cardinality(locked_seasons);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_rating_rank(p_season TEXT, p_rating INTEGER)
+RETURNS INTEGER AS $$
+    SELECT 1 + COALESCE(SUM(teams), 0)::int
+    FROM t_p5773343_football_league_app.wmfl_rating_buckets
+    WHERE season = COALESCE(p_season, '*') AND rating > p_rating AND teams <> 0
+$$ LANGUAGE sql STABLE;
+
+SELECT t_p5773343_football_league_app.wmfl_compact_rating_buckets();
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_rating_buckets IS 'Число активных команд с каждым рейтингом по полосам: место в рейтинге - 1 + сумма корзин выше, без сортировки таблицы команд. Строки есть только у рейтингов, которые сейчас у кого-то есть (пустые полосы удаляются сразу, разошедшиеся сворачивает wmfl_compact_rating_buckets), поэтому место стоит O(различных текущих рейтингов выше x полос) и не зависит от числа команд; это не логарифмический поиск, а ограниченный диапазоном рейтинга проход по первичному ключу';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_apply_rating_deltas(TEXT[], INTEGER[], INTEGER[]) IS 'Прибавляет изменения к полосе сеанса в корзинах сезона и общих (*) в порядке (season, rating), затем отдельным оператором удаляет обнулившиеся полосы';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_compact_rating_buckets() IS 'Сворачивает полосы каждого рейтинга в полосу 0 и удаляет рейтинги с нулевой суммой; вызывается обслуживанием wmfl-sync. Возвращает число свёрнутых строк';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_rating_rank(TEXT, INTEGER) IS 'Место рейтинга в сезоне (NULL - среди всех сезонов): 1 + число активных команд с рейтингом выше, равные делят место. Проходит по корзинам выше рейтинга - O(различных текущих рейтингов выше), не логарифмический поиск';
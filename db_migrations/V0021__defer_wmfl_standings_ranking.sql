@@ -0,0 +1,229 @@
+CREATE TABLE IF NOT EXISTS t_p5773343_football_league_app.wmfl_standings_dirty (
+    tournament_id INTEGER PRIMARY KEY,
+    min_points INTEGER,
+    max_points INTEGER NOT NULL
+);
+
+-- Места внутри полосы очков [p_min_points, p_max_points] (NULL снизу - до конца
+-- таблицы). Команды выше полосы своих мест не меняют, поэтому отсчёт идёт от
+-- их числа, а личные встречи считаются только внутри полосы: равные по очкам
+-- всегда попадают в неё целиком.
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_rank_standings_band(p_tournament_id INTEGER, p_min_points INTEGER, p_max_points INTEGER)
+RETURNS INTEGER AS $$
+    WITH teams AS (
+        SELECT t.id, t.team_id, t.team_name, t.points, t.goal_difference, t.goals_for, t.wins
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.tournament_id = p_tournament_id AND t.is_active = true
+          AND t.points <= p_max_points
+          AND (p_min_points IS NULL OR t.points >= p_min_points)
+    ),
+    above AS MATERIALIZED (
+        SELECT COUNT(*)::int AS teams
+        FROM t_p5773343_football_league_app.wmfl_tournament_teams t
+        WHERE t.tournament_id = p_tournament_id AND t.is_active = true AND t.points > p_max_points
+    ),
+    head_to_head AS (
+        SELECT side.team_id,
+               SUM(CASE WHEN side.scored > side.conceded THEN 3 WHEN side.scored = side.conceded THEN 1 ELSE 0 END) AS points,
+               SUM(side.scored - side.conceded) AS goal_difference,
+               SUM(side.scored) AS goals_for
+        FROM t_p5773343_football_league_app.wmfl_matches m
+        JOIN teams home ON home.team_id = m.home_team_id
+        JOIN teams away ON away.team_id = m.away_team_id
+        CROSS JOIN LATERAL (
+            VALUES (m.home_team_id, m.home_goals, m.away_goals), (m.away_team_id, m.away_goals, m.home_goals)
+        ) AS side(team_id, scored, conceded)
+        WHERE m.tournament_id = p_tournament_id
+          AND away.points = home.points
+          AND m.home_goals IS NOT NULL AND m.away_goals IS NOT NULL
+        GROUP BY side.team_id
+    ),
+    ranked AS (
+        SELECT teams.id,
+               (above.teams + ROW_NUMBER() OVER (
+                   ORDER BY teams.points DESC,
+                            COALESCE(h.points, 0) DESC, COALESCE(h.goal_difference, 0) DESC, COALESCE(h.goals_for, 0) DESC,
+                            teams.goal_difference DESC, teams.goals_for DESC, teams.wins DESC, teams.team_name, teams.id
+               ))::int AS new_position
+        FROM teams
+        CROSS JOIN above
+        LEFT JOIN head_to_head h ON h.team_id = teams.team_id
+    ),
+    updated AS (
+        UPDATE t_p5773343_football_league_app.wmfl_tournament_teams t
+        SET position = ranked.new_position, updated_at = CURRENT_TIMESTAMP
+        FROM ranked
+        WHERE t.id = ranked.id AND t.position IS DISTINCT FROM ranked.new_position
+        RETURNING t.id
+    ),
+    cleared AS (
+        UPDATE t_p5773343_football_league_app.wmfl_tournament_teams t
+        SET position = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE t.tournament_id = p_tournament_id AND t.is_active IS NOT TRUE AND t.position IS NOT NULL
+        RETURNING t.id
+    )
+    SELECT ((SELECT COUNT(*) FROM updated) + (SELECT COUNT(*) FROM cleared))::int
+$$ LANGUAGE sql;
+
+-- Запоминает, какие полосы турниров пересчитать при фиксации, и берёт
+-- блокировку турнира (класс 5773344, как STANDINGS_LOCK_CLASS в wmfl_core) в
+-- порядке tournament_id. Функции берут её до первой записи (lock_standings);
+-- здесь она только сериализует пересчёт для остальных писателей: те, кто
+-- заблокировал строки турнира раньше неё, могут получить deadlock.
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_mark_standings_dirty(p_tournament_ids INTEGER[], p_min_points INTEGER[], p_max_points INTEGER[])
+RETURNS VOID AS $$
+    SELECT pg_advisory_xact_lock(5773344, ids.tournament_id)
+    FROM (
+        SELECT DISTINCT c.tournament_id FROM unnest(p_tournament_ids) AS c(tournament_id)
+        WHERE c.tournament_id IS NOT NULL
+        ORDER BY c.tournament_id
+    ) AS ids;
+
+    INSERT INTO t_p5773343_football_league_app.wmfl_standings_dirty AS d (tournament_id, min_points, max_points)
+    SELECT c.tournament_id,
+           CASE WHEN bool_or(c.min_points IS NULL) THEN NULL ELSE MIN(c.min_points) END,
+           MAX(c.max_points)
+    FROM unnest(p_tournament_ids, p_min_points, p_max_points) AS c(tournament_id, min_points, max_points)
+    WHERE c.tournament_id IS NOT NULL AND c.max_points IS NOT NULL
+    GROUP BY c.tournament_id
+    ORDER BY c.tournament_id
+    ON CONFLICT (tournament_id) DO UPDATE SET
+        min_points = CASE WHEN d.min_points IS NULL OR EXCLUDED.min_points IS NULL THEN NULL
+                          ELSE LEAST(d.min_points, EXCLUDED.min_points) END,
+        max_points = GREATEST(d.max_points, EXCLUDED.max_points);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_standings_rank_dirty()
+RETURNS TRIGGER AS $$
+DECLARE
+    band RECORD;
+BEGIN
+    DELETE FROM t_p5773343_football_league_app.wmfl_standings_dirty
+    WHERE tournament_id = NEW.tournament_id
+    RETURNING min_points, max_points INTO band;
+
+    IF FOUND THEN
+        PERFORM t_p5773343_football_league_app.wmfl_rank_standings_band(NEW.tournament_id, band.min_points, band.max_points);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Вставка команды сдвигает всех ниже неё (полоса без нижней границы), смена
+-- очков в турнире - только команды между старыми и новыми очками, смена
+-- названия, разницы или побед - только равных по очкам
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings()
+RETURNS TRIGGER AS $$
+DECLARE
+    tournament_ids INTEGER[];
+    min_points INTEGER[];
+    max_points INTEGER[];
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(n.tournament_id), array_agg(NULL::int), array_agg(n.points)
+        INTO tournament_ids, min_points, max_points
+        FROM new_rows n WHERE n.is_active IS TRUE OR n.position IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(o.tournament_id), array_agg(NULL::int), array_agg(o.points)
+        INTO tournament_ids, min_points, max_points
+        FROM old_rows o WHERE o.position IS NOT NULL;
+    ELSE
+        SELECT array_agg(band.tournament_id), array_agg(band.min_points), array_agg(band.max_points)
+        INTO tournament_ids, min_points, max_points
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (
+            SELECT (o.tournament_id, o.is_active IS TRUE) IS DISTINCT FROM (n.tournament_id, n.is_active IS TRUE) AS moved
+        ) AS m
+        CROSS JOIN LATERAL (
+            VALUES (o.tournament_id, CASE WHEN m.moved THEN NULL ELSE LEAST(o.points, n.points) END,
+                    CASE WHEN m.moved THEN o.points ELSE GREATEST(o.points, n.points) END),
+                   (n.tournament_id, CASE WHEN m.moved THEN NULL ELSE LEAST(o.points, n.points) END,
+                    CASE WHEN m.moved THEN n.points ELSE GREATEST(o.points, n.points) END)
+        ) AS band(tournament_id, min_points, max_points)
+        WHERE (o.is_active IS TRUE OR n.is_active IS TRUE OR n.position IS NOT NULL)
+          AND (o.tournament_id, o.is_active, o.team_id, o.team_name, o.points, o.goal_difference, o.goals_for, o.wins, o.position)
+              IS DISTINCT FROM
+              (n.tournament_id, n.is_active, n.team_id, n.team_name, n.points, n.goal_difference, n.goals_for, n.wins, n.position);
+    END IF;
+
+    IF tournament_ids IS NOT NULL THEN
+        PERFORM t_p5773343_football_league_app.wmfl_mark_standings_dirty(tournament_ids, min_points, max_points);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Результат матча влияет только на личные встречи, то есть на полосу между
+-- очками его участников
+CREATE OR REPLACE FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings()
+RETURNS TRIGGER AS $$
+DECLARE
+    pair_tournaments INTEGER[];
+    pair_home_teams INTEGER[];
+    pair_away_teams INTEGER[];
+    tournament_ids INTEGER[];
+    min_points INTEGER[];
+    max_points INTEGER[];
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(n.tournament_id), array_agg(n.home_team_id), array_agg(n.away_team_id)
+        INTO pair_tournaments, pair_home_teams, pair_away_teams
+        FROM new_rows n WHERE n.home_goals IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(o.tournament_id), array_agg(o.home_team_id), array_agg(o.away_team_id)
+        INTO pair_tournaments, pair_home_teams, pair_away_teams
+        FROM old_rows o WHERE o.home_goals IS NOT NULL;
+    ELSE
+        SELECT array_agg(side.tournament_id), array_agg(side.home_team_id), array_agg(side.away_team_id)
+        INTO pair_tournaments, pair_home_teams, pair_away_teams
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (
+            VALUES (o.tournament_id, o.home_team_id, o.away_team_id), (n.tournament_id, n.home_team_id, n.away_team_id)
+        ) AS side(tournament_id, home_team_id, away_team_id)
+        WHERE (o.tournament_id, o.home_team_id, o.away_team_id, o.home_goals, o.away_goals)
+              IS DISTINCT FROM
+              (n.tournament_id, n.home_team_id, n.away_team_id, n.home_goals, n.away_goals);
+    END IF;
+
+    IF pair_tournaments IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT array_agg(pair.tournament_id), array_agg(LEAST(home.points, away.points)), array_agg(GREATEST(home.points, away.points))
+    INTO tournament_ids, min_points, max_points
+    FROM unnest(pair_tournaments, pair_home_teams, pair_away_teams) AS pair(tournament_id, home_team_id, away_team_id)
+    JOIN t_p5773343_football_league_app.wmfl_tournament_teams home
+      ON home.tournament_id = pair.tournament_id AND home.team_id = pair.home_team_id AND home.is_active = true
+    JOIN t_p5773343_football_league_app.wmfl_tournament_teams away
+      ON away.tournament_id = pair.tournament_id AND away.team_id = pair.away_team_id AND away.is_active = true;
+
+    IF tournament_ids IS NOT NULL THEN
+        PERFORM t_p5773343_football_league_app.wmfl_mark_standings_dirty(tournament_ids, min_points, max_points);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wmfl_standings_dirty_rank ON t_p5773343_football_league_app.wmfl_standings_dirty;
+CREATE CONSTRAINT TRIGGER trg_wmfl_standings_dirty_rank
+    AFTER INSERT OR UPDATE ON t_p5773343_football_league_app.wmfl_standings_dirty
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION t_p5773343_football_league_app.wmfl_standings_rank_dirty();
+
+COMMENT ON TABLE t_p5773343_football_league_app.wmfl_standings_dirty IS 'Полосы очков турниров, места в которых нужно пересчитать при фиксации текущей транзакции: строка живёт только внутри транзакции, её удаляет отложенный триггер';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_rank_standings_band(INTEGER, INTEGER, INTEGER) IS 'Места турнира в полосе очков (NULL снизу - до конца таблицы) с отсчётом от числа команд выше полосы; стоимость пропорциональна командам полосы, а не турнира';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_mark_standings_dirty(INTEGER[], INTEGER[], INTEGER[]) IS 'Блокирует турниры в порядке tournament_id и расширяет их полосы пересчёта мест до фиксации';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_standings_rank_dirty() IS 'Отложенный до фиксации пересчёт мест: один раз на турнир за транзакцию, сколько бы строк ни записал построчный импорт';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_teams_refresh_standings() IS 'Отмечает полосу пересчёта мест, только если запись изменила очки, разницу, забитые, победы, название, активность или место команды';
+COMMENT ON FUNCTION t_p5773343_football_league_app.wmfl_matches_refresh_standings() IS 'Отмечает полосу между очками участников матча, у которого изменился результат (влияет на личные встречи)';
+COMMENT ON COLUMN t_p5773343_football_league_app.wmfl_tournament_teams.position IS 'Место в турнире: пересчитывается отложенным триггером при фиксации транзакции, которая его изменила (NULL у неактивных команд)';
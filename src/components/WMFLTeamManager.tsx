@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from "@/components/ui/dialog";
@@ -39,10 +39,40 @@ interface WMFLTeam {
   away_losses: number;
   yellow_cards: number;
   red_cards: number;
+  tournament_id?: number;
   season?: string;
   is_active: boolean;
 }
 
+interface WMFLTeamChange extends WMFLTeam {
+  deleted: boolean;
+}
+
+interface WMFLTeamChanges {
+  changes: WMFLTeamChange[];
+  cursor: string;
+  has_more: boolean;
+}
+
+const LONG_POLL_SECONDS = 25;
+
+const compareStandings = (a: WMFLTeam, b: WMFLTeam) =>
+  (a.tournament_id ?? 0) - (b.tournament_id ?? 0) ||
+  (a.position ?? 0) - (b.position ?? 0) ||
+  a.id - b.id;
+
+const applyTeamChanges = (teams: WMFLTeam[], changes: WMFLTeamChange[]) => {
+  const byId = new Map(teams.map((team) => [team.id, team]));
+  for (const { deleted, ...team } of changes) {
+    if (deleted) {
+      byId.delete(team.id);
+    } else {
+      byId.set(team.id, team);
+    }
+  }
+  return Array.from(byId.values()).sort(compareStandings);
+};
+
 export const WMFLTeamManager = () => {
   const [teams, setTeams] = useState<WMFLTeam[]>([]);
   const [loading, setLoading] = useState(true);
@@ -51,6 +81,7 @@ export const WMFLTeamManager = () => {
   const [importDialogOpen, setImportDialogOpen] = useState(false);
   const [tournamentId, setTournamentId] = useState("1056456");
   const [importing, setImporting] = useState(false);
+  const changeCursor = useRef<string | null>(null);
 
   const [formData, setFormData] = useState({
     team_name: "",
@@ -71,6 +102,7 @@ export const WMFLTeamManager = () => {
       const response = await fetch(API_URL);
       if (!response.ok) throw new Error("Failed to fetch teams");
       const data = await response.json();
+      changeCursor.current = response.headers.get("X-Change-Cursor");
       setTeams(data);
     } catch (error) {
       toast.error("Ошибка загрузки команд");
@@ -80,8 +112,54 @@ export const WMFLTeamManager = () => {
     }
   };
 
+  const fetchChanges = async (wait = 0, signal?: AbortSignal) => {
+    let cursor = changeCursor.current;
+    if (cursor === null) throw new Error("Team list has no change cursor");
+
+    let hasMore = true;
+    while (hasMore) {
+      const params = new URLSearchParams({ changes_since: cursor, wait: String(wait) });
+      const response = await fetch(`${API_URL}?${params}`, { signal });
+      if (!response.ok) throw new Error("Failed to fetch team changes");
+      const data: WMFLTeamChanges = await response.json();
+      if (cursor !== changeCursor.current) return;
+      if (data.changes.length > 0) {
+        setTeams((current) => applyTeamChanges(current, data.changes));
+      }
+      cursor = changeCursor.current = data.cursor;
+      hasMore = data.has_more;
+      wait = 0;
+    }
+  };
+
+  const refreshTeams = async () => {
+    try {
+      await fetchChanges();
+    } catch (error) {
+      console.error(error);
+      fetchTeams();
+    }
+  };
+
   useEffect(() => {
-    fetchTeams();
+    const controller = new AbortController();
+
+    const watchChanges = async () => {
+      await fetchTeams();
+      while (!controller.signal.aborted) {
+        try {
+          await fetchChanges(LONG_POLL_SECONDS, controller.signal);
+        } catch (error) {
+          if (controller.signal.aborted) return;
+          console.error(error);
+          await new Promise((resolve) => setTimeout(resolve, 5000));
+          if (changeCursor.current === null) await fetchTeams();
+        }
+      }
+    };
+
+    watchChanges();
+    return () => controller.abort();
   }, []);
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -104,7 +182,7 @@ export const WMFLTeamManager = () => {
       toast.success(editingTeam ? "Команда обновлена" : "Команда добавлена");
       setIsDialogOpen(false);
       resetForm();
-      fetchTeams();
+      refreshTeams();
     } catch (error) {
       toast.error("Ошибка сохранения команды");
       console.error(error);
@@ -122,7 +200,7 @@ export const WMFLTeamManager = () => {
       if (!response.ok) throw new Error("Failed to delete team");
 
       toast.success("Команда удалена");
-      fetchTeams();
+      refreshTeams();
     } catch (error) {
       toast.error("Ошибка удаления команды");
       console.error(error);
@@ -178,7 +256,7 @@ export const WMFLTeamManager = () => {
       if (result.success && result.imported_count > 0) {
         toast.success(`Импортировано команд: ${result.imported_count}`);
         setImportDialogOpen(false);
-        fetchTeams();
+        refreshTeams();
       } else {
         toast.warning(result.message || "Не удалось импортировать команды");
       }
@@ -1,6 +1,8 @@
 import { useState, useEffect } from "react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
+import { ChartConfig, ChartContainer, ChartTooltip, ChartTooltipContent } from "@/components/ui/chart";
+import { CartesianGrid, Line, LineChart, XAxis, YAxis } from "recharts";
 import { toast } from "sonner";
 import Icon from "@/components/ui/icon";
 
@@ -13,8 +15,16 @@ interface SyncLog {
   status: string;
   message: string;
   teams_updated: number;
+  run_type?: "sync" | "import";
+  duration_ms?: number | null;
+  phase_timings?: Record<string, number> | null;
 }
 
+const latencyChartConfig = {
+  sync: { label: "Синхронизация, мс", color: "hsl(var(--primary))" },
+  import: { label: "Импорт, мс", color: "hsl(var(--muted-foreground))" },
+} satisfies ChartConfig;
+
 interface WMFLSyncPanelProps {
   onSyncComplete?: () => void;
 }
@@ -86,6 +96,15 @@ export const WMFLSyncPanel = ({ onSyncComplete }: WMFLSyncPanelProps) => {
     }
   };
 
+  const latencyData = logs
+    .filter((log) => log.duration_ms != null)
+    .slice()
+    .reverse()
+    .map((log) => ({
+      time: new Date(log.sync_time).toLocaleTimeString("ru-RU"),
+      [log.run_type || "sync"]: log.duration_ms,
+    }));
+
   return (
     <div className="space-y-4">
       <Card>
@@ -118,6 +137,29 @@ export const WMFLSyncPanel = ({ onSyncComplete }: WMFLSyncPanelProps) => {
         </CardContent>
       </Card>
 
+      {!loading && latencyData.length > 1 && (
+        <Card>
+          <CardHeader>
+            <CardTitle className="flex items-center gap-2">
+              <Icon name="Timer" size={20} />
+              Длительность запусков
+            </CardTitle>
+          </CardHeader>
+          <CardContent>
+            <ChartContainer config={latencyChartConfig} className="h-48 w-full">
+              <LineChart data={latencyData}>
+                <CartesianGrid vertical={false} />
+                <XAxis dataKey="time" tickLine={false} axisLine={false} />
+                <YAxis tickLine={false} axisLine={false} width={40} />
+                <ChartTooltip content={<ChartTooltipContent />} />
+                <Line dataKey="sync" stroke="var(--color-sync)" dot={false} connectNulls />
+                <Line dataKey="import" stroke="var(--color-import)" dot={false} connectNulls />
+              </LineChart>
+            </ChartContainer>
+          </CardContent>
+        </Card>
+      )}
+
       {!loading && logs.length > 0 && (
         <Card>
           <CardHeader>
@@ -156,6 +198,7 @@ export const WMFLSyncPanel = ({ onSyncComplete }: WMFLSyncPanelProps) => {
                       <p className="text-xs text-muted-foreground">
                         Турнир #{log.tournament_id} •{" "}
                         {new Date(log.sync_time).toLocaleString("ru-RU")}
+                        {log.duration_ms != null && ` • ${log.duration_ms} мс`}
                       </p>
                     </div>
                   </div>